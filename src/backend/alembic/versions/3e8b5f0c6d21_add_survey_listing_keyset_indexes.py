@@ -0,0 +1,30 @@
+"""add_survey_listing_keyset_indexes
+
+Revision ID: 3e8b5f0c6d21
+Revises: 7c2d9e4a1b35
+Create Date: 2026-10-18 11:04:52.918364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8b5f0c6d21'
+down_revision: Union[str, Sequence[str], None] = '7c2d9e4a1b35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_surveys_created_at_id', 'surveys', ['created_at', 'id'], unique=False)
+    op.create_index('ix_surveys_status_created_at_id', 'surveys', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_surveys_status_created_at_id', table_name='surveys')
+    op.drop_index('ix_surveys_created_at_id', table_name='surveys')
@@ -0,0 +1,70 @@
+"""add_survey_completions
+
+Revision ID: 5a1d7c3e9f42
+Revises: 3e8b5f0c6d21
+Create Date: 2026-10-18 14:27:09.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1d7c3e9f42'
+down_revision: Union[str, Sequence[str], None] = '3e8b5f0c6d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Анкет на одну транзакцию заполнения: длинная транзакция по всей таблице
+# answers в CockroachDB упирается в лимиты и конфликтует с живыми голосами
+BACKFILL_BATCH_SURVEYS = 100
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('survey_completions',
+    sa.Column('survey_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('survey_id', 'user_id')
+    )
+
+    # Заполняем из answers пачками по анкетам, каждая пачка — своя транзакция.
+    # ON CONFLICT делает шаг повторяемым: голоса, пришедшие через новый код во
+    # время миграции, не ломают заполнение.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last_id = None
+        while True:
+            if last_id is None:
+                rows = bind.execute(
+                    sa.text("SELECT id FROM surveys ORDER BY id LIMIT :limit"),
+                    {"limit": BACKFILL_BATCH_SURVEYS}
+                ).all()
+            else:
+                rows = bind.execute(
+                    sa.text("SELECT id FROM surveys WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                    {"last_id": last_id, "limit": BACKFILL_BATCH_SURVEYS}
+                ).all()
+            if not rows:
+                break
+            bind.execute(
+                sa.text(
+                    "INSERT INTO survey_completions (survey_id, user_id, completed_at) "
+                    "SELECT q.survey_id, a.user_id, min(a.answered_at) "
+                    "FROM answers a JOIN questions q ON q.id = a.question_id "
+                    "WHERE q.survey_id IN :survey_ids "
+                    "GROUP BY q.survey_id, a.user_id "
+                    "ON CONFLICT (survey_id, user_id) DO NOTHING"
+                ).bindparams(sa.bindparam("survey_ids", expanding=True)),
+                {"survey_ids": [row.id for row in rows]}
+            )
+            last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('survey_completions')
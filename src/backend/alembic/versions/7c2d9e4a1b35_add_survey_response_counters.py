@@ -0,0 +1,40 @@
+"""add_survey_response_counters
+
+Revision ID: 7c2d9e4a1b35
+Revises: be1e04b8791c
+Create Date: 2026-10-18 10:12:41.337210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9e4a1b35'
+down_revision: Union[str, Sequence[str], None] = 'be1e04b8791c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('survey_response_counters',
+    sa.Column('survey_id', sa.UUID(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['survey_id'], ['surveys.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('survey_id', 'shard')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Переносим несвёрнутые шарды в surveys, чтобы не потерять голоса
+    op.execute(
+        "UPDATE surveys SET responses_count = responses_count + s.total "
+        "FROM (SELECT survey_id, sum(count) AS total FROM survey_response_counters GROUP BY survey_id) AS s "
+        "WHERE surveys.id = s.survey_id"
+    )
+    op.drop_table('survey_response_counters')
@@ -0,0 +1,31 @@
+"""add_completion_idempotency_key
+
+Revision ID: 9b4e6f1a2c57
+Revises: 5a1d7c3e9f42
+Create Date: 2026-10-18 19:12:40.221873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4e6f1a2c57'
+down_revision: Union[str, Sequence[str], None] = '5a1d7c3e9f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable без значения по умолчанию — только метаданные, без перезаписи строк
+    op.add_column('survey_completions', sa.Column('idempotency_key', sa.String(length=32), nullable=True))
+    op.add_column('survey_completions', sa.Column('ballot_fingerprint', sa.String(length=24), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('survey_completions', 'ballot_fingerprint')
+    op.drop_column('survey_completions', 'idempotency_key')
@@ -0,0 +1,90 @@
+"""
+Benchmark: p99 latency of non-auth endpoints during a login storm
+
+Runs the app in-process (ASGI), keeps N concurrent clients logging in and
+measures latency of GET /api/surveys/{id} at the same time.
+
+Usage (from src/backend):
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_login_storm
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from httpx import AsyncClient, ASGITransport
+
+from benchmarks.common import create_bench_engine, seed_survey
+from main import app
+from src.auth.security import hashing_executor
+from src.database.connection import get_db
+
+USER = {"email": "storm@example.com", "username": "storm", "password": "stormpassword"}
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * pct))], 3) if samples else None
+
+
+async def probe(client, path, duration):
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get(path)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def login_loop(client, deadline, statuses):
+    login = {"email": USER["email"], "password": USER["password"]}
+    while time.perf_counter() < deadline:
+        response = await client.post("/api/auth/login", json=login)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def main(concurrency: int, duration: float):
+    engine, session_factory = await create_bench_engine()
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        async with session_factory() as db:
+            survey_id, _ = await seed_survey(db, questions=10, options=4)
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/api/auth/register", json=USER)
+            path = f"/api/surveys/{survey_id}"
+
+            idle = await probe(client, path, duration)
+
+            statuses = {}
+            deadline = time.perf_counter() + duration
+            storm = [asyncio.create_task(login_loop(client, deadline, statuses)) for _ in range(concurrency)]
+            during = await probe(client, path, duration)
+            await asyncio.gather(*storm)
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    print(json.dumps({
+        "login_concurrency": concurrency,
+        "duration_s": duration,
+        "idle": {"requests": len(idle), "p50_ms": percentile(idle, 0.5), "p99_ms": percentile(idle, 0.99)},
+        "storm": {"requests": len(during), "p50_ms": percentile(during, 0.5), "p99_ms": percentile(during, 0.99)},
+        "login_statuses": statuses,
+        "hashing_pool": hashing_executor.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.duration))
@@ -0,0 +1,72 @@
+"""
+Benchmark: per-request overhead of MetricsMiddleware
+
+Calls a trivial ASGI endpoint directly (no network, no DB) with and without
+the middleware and reports the difference in microseconds per request.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_metrics_overhead
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+
+from src.core.metrics import MetricsMiddleware
+
+
+def build_app(with_metrics: bool):
+    app = FastAPI()
+
+    @app.get("/api/surveys/{survey_id}")
+    async def endpoint(survey_id: str):
+        return {"id": survey_id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/surveys/42", "raw_path": b"/api/surveys/42",
+        "query_string": b"", "root_path": "", "headers": [], "server": ("bench", 80), "client": ("bench", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - started
+
+
+async def main(requests: int, rounds: int):
+    plain, instrumented = build_app(False), build_app(True)
+    await drive(plain, 1000)
+    await drive(instrumented, 1000)
+
+    plain_best = min([await drive(plain, requests) for _ in range(rounds)])
+    instrumented_best = min([await drive(instrumented, requests) for _ in range(rounds)])
+
+    print(json.dumps({
+        "requests": requests,
+        "plain_us_per_request": round(plain_best / requests * 1e6, 2),
+        "metrics_us_per_request": round(instrumented_best / requests * 1e6, 2),
+        "overhead_us_per_request": round((instrumented_best - plain_best) / requests * 1e6, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
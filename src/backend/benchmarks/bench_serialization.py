@@ -0,0 +1,82 @@
+"""
+Benchmark: CPU per response for survey detail and results serialization
+
+Compares the pydantic path (model_validate + model_dump_json, what FastAPI
+does for response_model) with the pre-encoded orjson path used by the API.
+No database is needed.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_serialization
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from src.core.serialization import dumps
+from src.database.models.definitions import compile_survey, encode_survey_detail
+from src.database.models.surveys import assemble_survey_results
+from src.models.poll import Survey, Question, QuestionOption
+from src.schemas.survey import SurveyFullResponse, SurveyResults
+
+SIZES = [(5, 5), (20, 5), (50, 8), (200, 10)]
+
+
+def build_compiled_survey(questions: int, options: int):
+    now = datetime.now(timezone.utc)
+    survey = Survey(
+        id=uuid.uuid4(), title="Bench survey", description="x" * 200, status="active",
+        created_by=1, created_at=now, updated_at=now, end_date=now + timedelta(days=7),
+        responses_count=1000, is_anonymous=False,
+    )
+    for q in range(questions):
+        question = Question(id=uuid.uuid4(), question_text=f"Question {q}", question_order=q)
+        for o in range(options):
+            question.options.append(QuestionOption(id=uuid.uuid4(), option_text=f"Option {o}", option_order=o))
+        survey.questions.append(question)
+    return compile_survey(survey)
+
+
+def per_call_us(fn, number: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return round((time.perf_counter() - started) / number * 1e6, 2)
+
+
+def main(number: int):
+    report = []
+    for questions, options in SIZES:
+        survey = build_compiled_survey(questions, options)
+        votes = {o.id: 7 for q in survey.questions for o in q.options}
+        results = assemble_survey_results(survey, votes, {}, 1000)
+
+        detail_pydantic = per_call_us(
+            lambda: SurveyFullResponse.model_validate(survey, from_attributes=True).model_dump_json(), number
+        )
+        detail_fast = per_call_us(lambda: encode_survey_detail(survey, 1000), number)
+        results_pydantic = per_call_us(lambda: SurveyResults.model_validate(results).model_dump_json(), number)
+        results_fast = per_call_us(lambda: dumps(results), number)
+
+        report.append({
+            "questions": questions,
+            "options_per_question": options,
+            "detail_bytes": len(encode_survey_detail(survey, 1000)),
+            "detail_pydantic_us": detail_pydantic,
+            "detail_fast_us": detail_fast,
+            "detail_saved_us": round(detail_pydantic - detail_fast, 2),
+            "results_pydantic_us": results_pydantic,
+            "results_fast_us": results_fast,
+            "results_saved_us": round(results_pydantic - results_fast, 2),
+        })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=500)
+    args = parser.parse_args()
+    main(args.number)
@@ -0,0 +1,163 @@
+"""
+Benchmark: cold start of a backend process
+
+Every sample runs in a fresh interpreter and measures
+  - import time of `main` (and the heaviest modules, from -X importtime),
+  - lifespan startup (engine, cache backend, background tasks),
+  - latency of the first and second request to /api/health/live and
+    /api/surveys/ (the first one pays for lazy engine/pool/session setup).
+
+With --serve the real server command is started instead and the time until
+/api/health/ready answers 200 is reported (includes the first DB round-trip).
+
+Usage (from src/backend):
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --serve "gunicorn main:app -c gunicorn.conf.py"
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import BENCH_DATABASE_URL, backend_dir, create_bench_engine, seed_survey
+
+# Выполняется в отдельном интерпретаторе: ничего из приложения в нём ещё не импортировано
+CHILD = r"""
+import asyncio, json, os, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from src.database.connection import get_db
+
+async def run():
+    engine = create_async_engine(os.environ["BENCH_DATABASE_URL"])
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    main.app.dependency_overrides[get_db] = override_get_db
+    result = {"import_ms": (imported - started) * 1000}
+    lifespan_started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        result["lifespan_ms"] = (time.perf_counter() - lifespan_started) * 1000
+        async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://bench") as client:
+            for name, path in (("live", "/api/health/live"), ("surveys", "/api/surveys/")):
+                for attempt in ("first", "second"):
+                    request_started = time.perf_counter()
+                    response = await client.get(path)
+                    assert response.status_code == 200, (path, response.status_code)
+                    result[f"{name}_{attempt}_ms"] = (time.perf_counter() - request_started) * 1000
+    await engine.dispose()
+    result["total_ms"] = (time.perf_counter() - started) * 1000
+    print(json.dumps(result))
+
+asyncio.run(run())
+"""
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def child_env():
+    env = dict(os.environ, BENCH_DATABASE_URL=BENCH_DATABASE_URL)
+    env.setdefault("RATE_LIMIT_ENABLED", "false")
+    return env
+
+
+def run_child():
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=backend_dir, env=child_env(),
+        capture_output=True, text=True, check=True
+    ).stdout
+    # lifespan печатает в stdout — результат последней строкой
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(top):
+    """Самые тяжёлые модули по cumulative времени импорта (только верхний уровень вложенности)"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=backend_dir, env=child_env(),
+        capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) <= 2:
+            modules.append((match.group(4), int(match.group(2)) / 1000))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return [{"module": name, "cumulative_ms": round(ms, 1)} for name, ms in modules[:top]]
+
+
+def time_to_ready(command, url, timeout):
+    started = time.perf_counter()
+    process = subprocess.Popen(shlex.split(command), cwd=backend_dir, env=child_env())
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return round((time.perf_counter() - started) * 1000, 1)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with {process.returncode}")
+            time.sleep(0.05)
+        return None
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def summarize(samples):
+    return {
+        key: {"median": round(statistics.median(s[key] for s in samples), 1),
+              "max": round(max(s[key] for s in samples), 1)}
+        for key in samples[0]
+    }
+
+
+async def prepare():
+    engine, session_factory = await create_bench_engine()
+    async with session_factory() as db:
+        for _ in range(20):
+            await seed_survey(db, questions=5, options=4)
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to report")
+    parser.add_argument("--serve", help="server command to time until /api/health/ready is 200")
+    parser.add_argument("--ready-url", default="http://127.0.0.1:8000/api/health/ready")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    if args.serve:
+        samples = [time_to_ready(args.serve, args.ready_url, args.timeout) for _ in range(args.runs)]
+        print(json.dumps({"command": args.serve, "time_to_ready_ms": samples}, indent=2))
+        return
+
+    asyncio.run(prepare())
+    samples = [run_child() for _ in range(args.runs)]
+    print(json.dumps({
+        "runs": args.runs,
+        "startup": summarize(samples),
+        "heaviest_imports": import_profile(args.top),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: survey results latency vs survey size
+
+Compares the old per-option COUNT loop with the single grouped aggregation
+used by get_survey_results.
+
+Usage (from src/backend):
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_survey_results
+"""
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import select, func
+
+from benchmarks.common import create_bench_engine, seed_survey, measure
+from src.database.models.surveys import get_survey_by_id, get_survey_results
+from src.models.poll import Answer
+
+SIZES = [(1, 4), (5, 5), (20, 5), (50, 8)]
+
+
+async def legacy_survey_results(db, survey_id):
+    """Старая реализация: отдельный COUNT на каждый вариант ответа"""
+    survey = await get_survey_by_id(db, survey_id, include_questions=True)
+    totals = {}
+    for question in survey.questions:
+        for option in question.options:
+            votes_result = await db.execute(
+                select(func.count(Answer.id)).where(Answer.option_id == option.id)
+            )
+            totals[option.id] = votes_result.scalar()
+    return totals
+
+
+async def main(iterations: int, voters: int):
+    engine, session_factory = await create_bench_engine()
+    report = []
+
+    try:
+        for questions, options in SIZES:
+            async with session_factory() as db:
+                survey_id, _ = await seed_survey(db, questions, options, voters)
+
+                legacy = await measure(lambda: legacy_survey_results(db, survey_id), iterations)
+                grouped = await measure(lambda: get_survey_results(db, survey_id), iterations)
+
+            report.append({
+                "questions": questions,
+                "options_per_question": options,
+                "voters": voters,
+                "legacy": legacy,
+                "grouped": grouped,
+                "speedup_p50": round(legacy["p50_ms"] / grouped["p50_ms"], 2) if grouped["p50_ms"] else None,
+            })
+    finally:
+        await engine.dispose()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--voters", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.voters))
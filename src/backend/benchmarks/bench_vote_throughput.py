@@ -0,0 +1,90 @@
+"""
+Benchmark: ballots/sec per worker for save_survey_answers
+
+Compares the ORM unit-of-work write path (a duplicate check joining answers
+with questions, one Answer object per option and a read-modify-write of
+responses_count) with the set-based path used by save_survey_answers. Each
+ballot is submitted by a distinct user from a pool of concurrent tasks
+sharing one event loop, like a single uvicorn worker.
+
+Usage (from src/backend):
+    TEST_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_vote_throughput
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from sqlalchemy import select, exists
+
+from benchmarks.common import create_bench_engine, seed_survey
+from src.database.models.surveys import save_survey_answers
+from src.models.poll import Survey, Question, Answer
+
+
+async def legacy_save_survey_answers(db, survey_id, user_id, answers):
+    """Старый путь записи: ORM-объекты и survey.responses_count += 1"""
+    survey = (await db.execute(select(Survey).where(Survey.id == survey_id))).scalar_one()
+    completed = await db.scalar(select(exists().where(
+        Answer.question_id == Question.id,
+        Question.survey_id == survey_id,
+        Answer.user_id == user_id
+    )))
+    if completed:
+        return {"error": -3}
+    for answer in answers:
+        for option_id in answer["option_ids"]:
+            db.add(Answer(question_id=answer["question_id"], option_id=option_id, user_id=user_id))
+    survey.responses_count += 1
+    await db.commit()
+    return {"error": 0}
+
+
+async def run(session_factory, submit, survey_id, layout, ballots, concurrency, first_user):
+    answers = [
+        {"question_id": question_id, "option_ids": [option_ids[0]]}
+        for question_id, option_ids in layout.items()
+    ]
+    users = iter(range(first_user, first_user + ballots))
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for user_id in users:
+            async with session_factory() as db:
+                result = await submit(db, survey_id, user_id, answers)
+                if result["error"] != 0:
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"ballots": ballots, "errors": errors, "seconds": round(elapsed, 3), "ballots_per_sec": round(ballots / elapsed, 1)}
+
+
+async def main(ballots: int, concurrency: int, questions: int):
+    engine, session_factory = await create_bench_engine()
+    try:
+        async with session_factory() as db:
+            survey_id, layout = await seed_survey(db, questions=questions, options=4)
+
+        legacy = await run(session_factory, legacy_save_survey_answers, survey_id, layout, ballots, concurrency, 1)
+        bulk = await run(session_factory, save_survey_answers, survey_id, layout, ballots, concurrency, ballots + 1)
+    finally:
+        await engine.dispose()
+
+    print(json.dumps({
+        "questions": questions,
+        "concurrency": concurrency,
+        "legacy_orm": legacy,
+        "set_based": bulk,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ballots", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.ballots, args.concurrency, args.questions))
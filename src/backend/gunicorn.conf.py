@@ -0,0 +1,71 @@
+"""
+Production-запуск: gunicorn master + UvicornWorker (по event loop на воркер)
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Число воркеров — WEB_CONCURRENCY или лимит CPU контейнера (cgroup), а не
+os.cpu_count() узла: pod с limits.cpu=2 на 32-ядерной ноде получает 2 воркера.
+Пул соединений, кэши, rate limiter и admission — у каждого воркера свои:
+соединений с БД на pod — workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+Подробнее — SERVING.md.
+"""
+import math
+import os
+
+
+def cpu_limit() -> float:
+    """Лимит CPU из cgroup v2/v1; без лимита — число ядер"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return float(os.cpu_count() or 1)
+
+
+def default_workers(cpus: float, max_workers: int) -> int:
+    # Async-воркер загружает ядро целиком; дробный лимит (500m) — один процесс
+    return max(1, min(max_workers, math.floor(cpus + 0.5)))
+
+
+WEB_CONCURRENCY_MAX = int(os.getenv("WEB_CONCURRENCY_MAX", "8"))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY") or 0) or default_workers(cpu_limit(), WEB_CONCURRENCY_MAX)
+
+# Приложение импортируется один раз в master, воркеры получают его через fork
+# (copy-on-write): старт воркера — без импорта. Безопасно, потому что при
+# импорте не открываются соединения, потоки и event loop — engine, пул bcrypt
+# и подписки кэша создаются в lifespan воркера.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+# Дольше keepalive ingress-nginx к upstream (60s), иначе гонка на закрытии даёт 502
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+# SSE-потоки закрываются в lifespan (live_results_hub.stop), остальное успевает за это время
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+# Heartbeat-файлы воркеров — в tmpfs: на overlayfs контейнера запись может тормозить
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Иначе все воркеры pod'а пропускали бы инвалидации кэша друг друга как «свои»
+    from src.core.cache import renew_replica_id
+
+    renew_replica_id()
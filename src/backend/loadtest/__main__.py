@@ -0,0 +1,72 @@
+"""
+Load-test CLI
+
+Usage (from src/backend):
+    python -m loadtest vote_burst --concurrency 200 --users 5000
+    python -m loadtest mixed --target http://localhost:8000 --duration 60 --output mixed.json
+    python -m loadtest live_results --target http://localhost:8000 --concurrency 3000
+
+Scenarios: auth_storm, vote_burst, results_poll, mixed, live_results (or "all";
+live_results needs an HTTP target and is skipped by "all" in-process).
+The database (LOADTEST_DATABASE_URL, falls back to TEST_DATABASE_URL) is
+used to seed a survey and users; for --target http://... it must be the
+same database the server uses, and SECRET_KEY must match the server's.
+The harness measures capacity, not the rate limiter: in-process runs
+disable it, and an HTTP target should run with RATE_LIMIT_ENABLED=false
+(all virtual users share one client address for login).
+In-process runs start the app lifespan, so VOTE_INGEST_MODE and
+CACHE_BACKEND from the environment apply to them as they do under uvicorn.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from benchmarks.common import BENCH_DATABASE_URL
+from loadtest.harness import SCENARIOS, run_scenario
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voting backend load test")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS) + ["all"])
+    parser.add_argument("--target", default="asgi", help='"asgi" (in-process) or a base URL such as http://localhost:8000')
+    parser.add_argument("--database-url", default=os.getenv("LOADTEST_DATABASE_URL", BENCH_DATABASE_URL))
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--reset-db", action="store_true", help="drop and recreate all tables before seeding")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.scenario == "all":
+        scenarios = [s for s in sorted(SCENARIOS) if args.target != "asgi" or s != "live_results"]
+    else:
+        scenarios = [args.scenario]
+    reports = []
+    for index, scenario in enumerate(scenarios):
+        reports.append(asyncio.run(run_scenario(
+            scenario,
+            database_url=args.database_url,
+            target=args.target,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            users=args.users,
+            questions=args.questions,
+            options=args.options,
+            reset_db=args.reset_db and index == 0,
+        )))
+
+    output = json.dumps(reports if len(reports) > 1 else reports[0], indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Async load-test harness for the voting backend
+
+Drives the FastAPI app either in-process (ASGI transport, with its lifespan
+running against the load-test database) or over HTTP against a local uvicorn, with survey data and users seeded straight into
+the local database. Results are plain dicts, ready to be dumped as JSON.
+"""
+import asyncio
+import random
+import sys
+import time
+from contextlib import AsyncExitStack, redirect_stdout
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import insert, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from benchmarks.common import seed_survey
+from src.auth.security import create_user_token, get_password_hash
+from src.database.connection import Base, InstrumentedAsyncQueuePool, bind_engine
+from src.models.user import User
+
+PASSWORD = "loadtest-password"
+
+
+@dataclass
+class EndpointStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def record(self, status: int, elapsed_ms: float) -> None:
+        self.latencies_ms.append(elapsed_ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self, seconds: float) -> dict:
+        samples = sorted(self.latencies_ms)
+        count = len(samples)
+
+        def pct(p):
+            return round(samples[min(count - 1, int(count * p))], 3) if count else None
+
+        return {
+            "requests": count,
+            "throughput_rps": round(count / seconds, 2) if seconds else None,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "latency_ms": {
+                "p50": pct(0.50),
+                "p90": pct(0.90),
+                "p99": pct(0.99),
+                "max": round(samples[-1], 3) if count else None,
+            },
+        }
+
+
+class LoadRun:
+    """Общий контекст прогона: клиент, статистика по эндпоинтам, засеянные данные"""
+
+    def __init__(self, client: AsyncClient):
+        self.client = client
+        self.stats: Dict[str, EndpointStats] = {}
+        self.survey_id = None
+        self.layout = {}
+        self.users: List[dict] = []
+
+    async def call(self, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception:
+            response, status = None, 599
+        self.stats.setdefault(name, EndpointStats()).record(status, (time.perf_counter() - started) * 1000)
+        return response
+
+    def ballot(self) -> dict:
+        return {
+            "survey_id": str(self.survey_id),
+            "answers": [
+                {"question_id": str(question_id), "option_ids": [str(random.choice(option_ids))]}
+                for question_id, option_ids in self.layout.items()
+            ],
+        }
+
+    def auth(self, user: dict) -> dict:
+        return {"Authorization": f"Bearer {user['token']}"}
+
+
+# ===== Seeding =====
+
+async def seed_users(db: AsyncSession, count: int, prefix: str) -> List[dict]:
+    """Пользователи одним INSERT; хэш пароля считаем один раз, токены выпускаем напрямую"""
+    if count <= 0:
+        return []
+    hashed = get_password_hash(PASSWORD)
+    rows = [
+        {"email": f"{prefix}-{i}@loadtest.local", "username": f"{prefix}-{i}", "hashed_password": hashed, "is_admin": False}
+        for i in range(count)
+    ]
+    await db.execute(insert(User), rows)
+    await db.commit()
+
+    result = await db.execute(select(User.id, User.email, User.username).where(User.username.like(f"{prefix}-%")))
+    return [
+        {"id": row.id, "email": row.email, "token": create_user_token(row.id, username=row.username, is_admin=False)}
+        for row in result.all()
+    ]
+
+
+# ===== Scenarios =====
+
+async def closed_loop(concurrency: int, duration: float, step: Callable[[int], Awaitable[bool]]) -> None:
+    """concurrency виртуальных пользователей выполняют step, пока не истечёт время или step не вернёт False"""
+    deadline = time.perf_counter() + duration
+
+    async def worker(index: int):
+        while time.perf_counter() < deadline:
+            if not await step(index):
+                return
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+
+async def scenario_auth_storm(run: LoadRun, concurrency: int, duration: float) -> None:
+    """Шторм логинов: половина запросов — неверный пароль"""
+    async def step(index):
+        user = run.users[index % len(run.users)]
+        password = PASSWORD if random.random() < 0.5 else "wrong-password"
+        await run.call("POST /auth/login", "POST", "/api/auth/login", json={"email": user["email"], "password": password})
+        return True
+
+    await closed_loop(concurrency, duration, step)
+
+
+async def scenario_vote_burst(run: LoadRun, concurrency: int, duration: float) -> None:
+    """Все пользователи голосуют в одну анкету как можно быстрее (по одному бюллетеню на пользователя)"""
+    voters = iter(run.users)
+    path = f"/api/surveys/{run.survey_id}/answer"
+
+    async def step(index):
+        user = next(voters, None)
+        if user is None:
+            return False
+        await run.call("POST /surveys/{id}/answer", "POST", path, json=run.ballot(), headers=run.auth(user))
+        return True
+
+    await closed_loop(concurrency, duration, step)
+
+
+async def scenario_results_poll(run: LoadRun, concurrency: int, duration: float) -> None:
+    """Дашборды опрашивают результаты"""
+    path = f"/api/surveys/{run.survey_id}/results"
+
+    async def step(index):
+        await run.call("GET /surveys/{id}/results", "GET", path)
+        return True
+
+    await closed_loop(concurrency, duration, step)
+
+
+async def scenario_mixed(run: LoadRun, concurrency: int, duration: float) -> None:
+    """Смешанный трафик: чтение списка/анкеты/результатов, голоса, логины"""
+    voters = iter(run.users)
+    survey = f"/api/surveys/{run.survey_id}"
+
+    async def step(index):
+        roll = random.random()
+        if roll < 0.15:
+            user = next(voters, None)
+            if user is not None:
+                await run.call("POST /surveys/{id}/answer", "POST", f"{survey}/answer", json=run.ballot(), headers=run.auth(user))
+                return True
+        if roll < 0.20:
+            user = random.choice(run.users)
+            await run.call("POST /auth/login", "POST", "/api/auth/login", json={"email": user["email"], "password": PASSWORD})
+        elif roll < 0.45:
+            await run.call("GET /surveys/", "GET", "/api/surveys/")
+        elif roll < 0.70:
+            await run.call("GET /surveys/{id}", "GET", survey)
+        else:
+            await run.call("GET /surveys/{id}/results", "GET", f"{survey}/results")
+        return True
+
+    await closed_loop(concurrency, duration, step)
+
+
+async def scenario_live_results(run: LoadRun, concurrency: int, duration: float) -> None:
+    """
+    concurrency подписчиков держат SSE-поток результатов, пока 10 пользователей голосуют.
+
+    Только против uvicorn (--target http://...): ASGI-транспорт httpx буферизует
+    тело ответа целиком и бесконечный поток не отдаёт.
+    """
+    path = f"/api/surveys/{run.survey_id}/results/stream"
+    deadline = time.perf_counter() + duration
+    events = run.stats.setdefault("SSE events received", EndpointStats())
+
+    async def subscriber():
+        started = time.perf_counter()
+        try:
+            async with run.client.stream("GET", path, timeout=None) as response:
+                run.stats.setdefault("GET /surveys/{id}/results/stream (first event)", EndpointStats())
+                first = True
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        if first:
+                            run.stats["GET /surveys/{id}/results/stream (first event)"].record(
+                                response.status_code, (time.perf_counter() - started) * 1000
+                            )
+                            first = False
+                        events.record(200, 0.0)
+                    if time.perf_counter() >= deadline:
+                        return
+                if response.status_code != 200:
+                    run.stats["GET /surveys/{id}/results/stream (first event)"].record(response.status_code, 0.0)
+        except Exception:
+            run.stats.setdefault("GET /surveys/{id}/results/stream (first event)", EndpointStats()).record(599, 0.0)
+
+    voters = iter(run.users)
+
+    async def vote(index):
+        user = next(voters, None)
+        if user is None:
+            return False
+        await run.call("POST /surveys/{id}/answer", "POST", f"/api/surveys/{run.survey_id}/answer", json=run.ballot(), headers=run.auth(user))
+        await asyncio.sleep(0.05)
+        return True
+
+    await asyncio.gather(
+        asyncio.wait_for(asyncio.gather(*(subscriber() for _ in range(concurrency))), duration + 30),
+        closed_loop(10, duration, vote),
+        return_exceptions=True
+    )
+
+
+SCENARIOS = {
+    "auth_storm": scenario_auth_storm,
+    "vote_burst": scenario_vote_burst,
+    "results_poll": scenario_results_poll,
+    "mixed": scenario_mixed,
+    "live_results": scenario_live_results,
+}
+
+
+async def run_scenario(
+    scenario: str,
+    database_url: str,
+    target: str = "asgi",
+    concurrency: int = 50,
+    duration: float = 15.0,
+    users: int = 500,
+    questions: int = 10,
+    options: int = 4,
+    reset_db: bool = False,
+) -> dict:
+    """Засевает данные, прогоняет сценарий и возвращает отчёт"""
+    engine = create_async_engine(
+        database_url, echo=False, poolclass=InstrumentedAsyncQueuePool, pool_size=max(5, min(concurrency, 50))
+    )
+    async with engine.begin() as conn:
+        if reset_db:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    try:
+        prefix = f"lt{int(time.time())}{random.randrange(1000)}"
+        async with session_factory() as db:
+            survey_id, layout = await seed_survey(db, questions=questions, options=options)
+            seeded_users = await seed_users(db, users, prefix)
+
+        async with AsyncExitStack() as stack:
+            if target == "asgi":
+                from main import app
+
+                # Приложение целиком, как под uvicorn: lifespan запускает очередь
+                # голосов (VOTE_INGEST_MODE=batched), свёртку счётчиков, live-хаб,
+                # health monitor и backend кэша — все на engine стенда
+                stack.callback(bind_engine, bind_engine(engine))
+                # lifespan печатает в stdout, а там отчёт CLI
+                stack.enter_context(redirect_stdout(sys.stderr))
+                await stack.enter_async_context(app.router.lifespan_context(app))
+                client = AsyncClient(transport=ASGITransport(app=app), base_url="http://loadtest", timeout=60)
+            else:
+                client = AsyncClient(base_url=target, timeout=60)
+
+            async with client:
+                run = LoadRun(client)
+                run.survey_id, run.layout, run.users = survey_id, layout, seeded_users
+
+                started = time.perf_counter()
+                await SCENARIOS[scenario](run, concurrency, duration)
+                elapsed = time.perf_counter() - started
+
+        # После shutdown: очередь голосов уже дописана
+        async with session_factory() as db:
+            answers_total = (await db.execute(
+                select(func.count()).select_from(Base.metadata.tables["answers"])
+            )).scalar()
+    finally:
+        await engine.dispose()
+
+    total = EndpointStats()
+    for stats in run.stats.values():
+        total.latencies_ms.extend(stats.latencies_ms)
+        total.errors += stats.errors
+        for status, count in stats.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+
+    return {
+        "scenario": scenario,
+        "target": target,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "users": users,
+            "questions": questions,
+            "options": options,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total": total.summary(elapsed),
+        "endpoints": {name: stats.summary(elapsed) for name, stats in sorted(run.stats.items())},
+        "answers_rows_after_run": answers_total,
+    }
@@ -1,11 +1,25 @@
 from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from src.api.auth import router as auth_router
 from src.api.polls import router as polls_router  
 from src.api.admin import router as admin_router
 from src.api.surveys import router as surveys_router
+from src.api.metrics import router as metrics_router
+from src.api.health import router as health_router
 from src.database import create_tables
+from src.auth.security import hashing_executor
+from src.core.cache_backends import get_cache_backend
+from src.database.connection import AsyncSessionLocal, get_engine, DB_POOL_SIZE, DB_MAX_OVERFLOW
+from src.core.metrics import MetricsMiddleware
+from src.core.rate_limit import RateLimitMiddleware
+from src.core.admission import AdmissionMiddleware, admission_controller, ADMISSION_MAX_LIMIT
+from src.core.query_accounting import QueryAccountingMiddleware, instrument_engine
+from src.database.models.counters import run_counter_fold_loop
+from src.database.models.ingest import vote_ingest_queue, VOTE_INGEST_MODE
+from src.database.models.live import live_results_hub
+from src.database.health import health_monitor
 
 
 
@@ -14,8 +28,26 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Application startup")
     # Таблицы уже созданы через Alembic, ничего не делаем
+    # Engine и пул — в процессе воркера (после fork при preload_app)
+    instrument_engine(get_engine())
+    cache_backend = get_cache_backend()
+    if cache_backend is not None:
+        await cache_backend.start()
+    fold_task = asyncio.create_task(run_counter_fold_loop(AsyncSessionLocal))
+    if VOTE_INGEST_MODE == "batched":
+        vote_ingest_queue.start(AsyncSessionLocal)
+    live_results_hub.start(AsyncSessionLocal)
+    await health_monitor.start()
     yield
     # Shutdown  
+    await health_monitor.stop()
+    await live_results_hub.stop()
+    await vote_ingest_queue.stop()
+    fold_task.cancel()
+    await asyncio.gather(fold_task, return_exceptions=True)
+    hashing_executor.shutdown()
+    if cache_backend is not None:
+        await cache_backend.close()
     print("🛑 Application shutdown")
 
 # Create main app without prefix
@@ -26,6 +58,14 @@ main_app = FastAPI(
     lifespan=lifespan
 )
 
+# Допуск к БД: адаптивный лимит не выше числа соединений пула, голоса первыми
+admission_controller.set_max_limit(ADMISSION_MAX_LIMIT or DB_POOL_SIZE + DB_MAX_OVERFLOW)
+main_app.add_middleware(AdmissionMiddleware)
+
+# Rate limiting — внутри CORS (у 429 есть CORS-заголовки), но до роутинга,
+# сессии БД и хэширования паролей
+main_app.add_middleware(RateLimitMiddleware)
+
 # Добавляем CORS middleware
 main_app.add_middleware(
     CORSMiddleware,
@@ -33,8 +73,14 @@ main_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Idempotent-Replayed", "X-Next-Cursor", "X-DB-Query-Count", "X-DB-Time-Ms"],
 )
 
+# Учёт SQL на запрос (время БД, заголовки вне prod, предупреждения о N+1)
+main_app.add_middleware(QueryAccountingMiddleware)
+# Метрики: латентность по маршрутам, in-flight
+main_app.add_middleware(MetricsMiddleware)
+
 # Create API router with /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -43,33 +89,16 @@ api_router.include_router(auth_router, prefix="/auth", tags=["auth"])
 api_router.include_router(polls_router, prefix="/polls", tags=["polls"])
 api_router.include_router(admin_router, prefix="/admin", tags=["admin"])
 api_router.include_router(surveys_router)
+api_router.include_router(health_router, prefix="/health", tags=["health"])
 
 @api_router.get("/")
 async def api_root():
     return {"message": "Poll App API is running!"}
 
-@api_router.get("/health")
-async def health_check():
-    """Health check endpoint with database connectivity test"""
-    from src.database.connection import get_db
-    from sqlalchemy import text
-    
-    db_status = "unknown"
-    try:
-        db = next(get_db())
-        # Test database connection
-        db.execute(text("SELECT 1"))
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"disconnected: {str(e)}"
-    
-    return {
-        "status": "healthy" if db_status == "connected" else "unhealthy",
-        "database": db_status
-    }
-
 # Mount API router to main app
 main_app.include_router(api_router)
+# /metrics — без /api: Prometheus опрашивает поды напрямую, мимо Ingress
+main_app.include_router(metrics_router)
 
 # Alias for uvicorn
 app = main_app
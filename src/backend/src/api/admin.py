@@ -1,4 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+
+from src.api.auth import get_current_principal
+from src.auth.security import hashing_executor
+from src.database.connection import get_db, get_pool_stats
+from src.auth.principal import Principal, principal_cache
+from src.database.models.definitions import survey_definitions_cache, touch_survey_definition
+from src.database.models.surveys import results_cache
+from src.database.models.idempotency import idempotency_cache
+from src.database.models.ingest import vote_ingest_queue
+from src.database.models.live import live_results_hub
+from src.core.rate_limit import rate_limiter
+from src.core.admission import admission_controller
 
 router = APIRouter()
 
@@ -16,4 +30,58 @@ async def admin_delete_poll(poll_id: int):
 
 @router.get("/stats")
 async def get_stats():
-    return {"stats": {"total_polls": 0, "total_votes": 0, "total_users": 0}}
\ No newline at end of file
+    return {"stats": {"total_polls": 0, "total_votes": 0, "total_users": 0}}
+
+@router.post("/surveys/{survey_id}/definition/invalidate")
+async def invalidate_survey_definition(
+    survey_id: UUID,
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """После правки вопросов/вариантов в БД: новая версия анкеты на всех репликах"""
+    if not principal.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    if not await touch_survey_definition(db, survey_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Survey with id {survey_id} not found")
+    return {"message": "Survey definition invalidated"}
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Счётчики кэшей (для подбора размеров и TTL): локальный уровень и общий backend"""
+    return {"caches": [cache.stats() for cache in (results_cache, survey_definitions_cache, principal_cache, idempotency_cache)]}
+
+
+@router.get("/hashing/stats")
+async def get_hashing_stats():
+    """Состояние пула bcrypt: загрузка, очередь, отказы"""
+    return hashing_executor.stats()
+
+
+@router.get("/ingest/stats")
+async def get_ingest_stats():
+    """Очередь пакетной записи голосов: размер пачек, задержка коммита, backlog"""
+    return vote_ingest_queue.stats()
+
+
+@router.get("/live/stats")
+async def get_live_stats():
+    """Live-результаты: каналы, подписчики, пересчёты агрегатов"""
+    return live_results_hub.stats()
+
+
+@router.get("/rate-limit/stats")
+async def get_rate_limit_stats():
+    """Rate limiting по классам маршрутов: ключи в памяти, пропущено, отклонено"""
+    return rate_limiter.stats()
+
+
+@router.get("/admission/stats")
+async def get_admission_stats():
+    """Допуск к БД: текущий лимит, занятые слоты, очередь, отказы"""
+    return admission_controller.stats()
+
+
+@router.get("/db/pool")
+async def get_db_pool_stats():
+    """Пул соединений: занятые, overflow, ожидание checkout"""
+    return get_pool_stats()
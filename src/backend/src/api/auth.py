@@ -1,37 +1,67 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.models.user import User
 
 from src.database.connection import get_db
 from src.database.models import get_user, register_user, authenticate_user
 from src.schemas.auth import UserCreate, UserLogin, UserResponse, Token
 from src.auth.security import (
+    AUTH_TOKEN_CLAIMS,
     create_user_token,
-    verify_token
+    decode_token
 )
+from src.auth.principal import Principal, get_cached_principal
+from src.core.metrics import record_result_code
 
 router = APIRouter()
 security = HTTPBearer()
 
-async def get_current_user(token: str = Depends(security), db: AsyncSession = Depends(get_db)):
-    """Получаем текущего пользователя по JWT токену"""
-    credentials_exception = HTTPException(
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def _load_principal(token: str, payload: dict, db: AsyncSession) -> Principal:
+
+    async def load():
+        user = await get_user(user_id=int(payload["sub"]), db=db)
+        return Principal.from_user(user) if user is not None else None
     
-    user_id = verify_token(token.credentials)
-    if user_id is None:
-        raise credentials_exception
+    principal = await get_cached_principal(token, payload, load)
+    
+    if principal is None:
+        raise _credentials_exception()
+    
+    return principal
+
+
+async def get_current_user(token: str = Depends(security), db: AsyncSession = Depends(get_db)) -> Principal:
+    """Получаем текущего пользователя по JWT токену (полный профиль, через кэш)"""
+    payload = decode_token(token.credentials)
+    if payload is None:
+        raise _credentials_exception()
     
-    user = await get_user(user_id=user_id, db=db)
+    return await _load_principal(token.credentials, payload, db)
+
+
+async def get_current_principal(token: str = Depends(security), db: AsyncSession = Depends(get_db)) -> Principal:
+    """Пользователь для горячих эндпоинтов: без БД, если нужные claims есть в токене"""
+    payload = decode_token(token.credentials)
+    if payload is None:
+        raise _credentials_exception()
     
-    if user is None:
-        raise credentials_exception
+    # Claims доверяем, только пока они включены: AUTH_TOKEN_CLAIMS=false
+    # отзывает доверие и к уже выданным токенам (например, после снятия админа)
+    if AUTH_TOKEN_CLAIMS:
+        principal = Principal.from_claims(payload)
+        if principal is not None:
+            return principal
     
-    return user
+    return await _load_principal(token.credentials, payload, db)
 
 @router.post("/register", response_model=Token)
 async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
@@ -39,6 +69,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     
     
     result = await register_user(user_data, db)
+    record_result_code("register_user", result.get("error"))
     if result.get("error") == -7:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -49,6 +80,12 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
+    elif result.get("error") == -9:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=result.get("message"),
+            headers={"Retry-After": "1"},
+        )
     elif result.get("error") == -1:  
         raise HTTPException(status_code=500, detail="Database error occurred")
     elif result.get("error") == 0:
@@ -61,7 +98,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         )
 
     
-    access_token = create_user_token(db_user_id)
+    access_token = create_user_token(db_user_id, username=user_data.username, is_admin=False)
 
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -74,6 +111,12 @@ async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db))
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    elif result.get("error") == -9:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=result.get("message"),
+            headers={"Retry-After": "1"},
+        )
     elif result.get("error") != 0: 
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -88,12 +131,16 @@ async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db))
             detail="Unexpected error occurred"
         )
     # Создаем токен
-    access_token = create_user_token(user_id)
+    access_token = create_user_token(
+        user_id,
+        username=result.get("username"),
+        is_admin=result.get("is_admin")
+    )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/verify")
-async def verify_current_user(current_user: User = Depends(get_current_user)):
+async def verify_current_user(current_user: Principal = Depends(get_current_user)):
     """Проверка токена и получение информации о пользователе"""
     return {
         "valid": True,
@@ -106,7 +153,7 @@ async def verify_current_user(current_user: User = Depends(get_current_user)):
     }
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(current_user: Principal = Depends(get_current_user)):
     """Получение профиля текущего пользователя"""
     return UserResponse(
         id=current_user.id,
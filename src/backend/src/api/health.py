@@ -0,0 +1,32 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from src.database.health import health_monitor
+
+router = APIRouter()
+
+
+@router.get("")
+async def health_check():
+    """Сводка последней фоновой проверки (для людей и дашбордов); всегда 200"""
+    state = health_monitor.readiness()
+    return {
+        **state.as_dict(),
+        "status": "healthy" if state.ready else "unhealthy",
+    }
+
+
+@router.get("/live")
+async def liveness():
+    """Liveness: процесс отвечает; БД не трогаем, иначе сбой БД перезапустит все pod'ы"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    """Readiness: результат фоновой проверки БД, пула и event loop; 503 — снять с трафика"""
+    state = health_monitor.readiness()
+    return JSONResponse(
+        state.as_dict(),
+        status_code=status.HTTP_200_OK if state.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Response
+
+from src.core.metrics import registry, CONTENT_TYPE_LATEST
+from src.auth.security import hashing_executor
+from src.auth.principal import principal_cache
+from src.database.connection import get_pool_stats
+from src.database.models.definitions import survey_definitions_cache
+from src.database.models.surveys import results_cache
+from src.database.models.idempotency import idempotency_cache
+from src.database.models.ingest import vote_ingest_queue
+from src.database.models.live import live_results_hub
+from src.core.rate_limit import rate_limiter
+from src.core.admission import admission_controller
+from src.database.health import health_monitor
+
+router = APIRouter()
+
+
+def _cache_samples():
+    for cache in (results_cache, survey_definitions_cache, principal_cache, idempotency_cache):
+        labels = {"cache": cache.name}
+        yield "app_cache_entries", "gauge", "Entries currently held by an in-process cache", labels, len(cache)
+        yield "app_cache_hits_total", "counter", "Cache hits", labels, cache.hits
+        yield "app_cache_misses_total", "counter", "Cache misses", labels, cache.misses
+        yield "app_cache_evictions_total", "counter", "Cache LRU evictions", labels, cache.evictions
+        yield "app_cache_remote_hits_total", "counter", "Local misses served by the shared cache backend", labels, cache.remote_hits
+        yield "app_cache_remote_errors_total", "counter", "Shared cache backend errors (treated as misses)", labels, cache.remote_errors
+        yield "app_cache_coalesced_total", "counter", "Cache misses that waited for an in-flight load", labels, cache.coalesced
+        yield "app_cache_invalidations_received_total", "counter", "Invalidations received from other replicas", labels, cache.invalidations_received
+
+
+def _pool_samples():
+    stats = get_pool_stats()
+    yield "db_pool_checked_out", "gauge", "Connections currently checked out", {}, stats["checked_out"]
+    yield "db_pool_overflow", "gauge", "Overflow connections currently open", {}, stats["overflow"]
+    yield "db_pool_checkouts_total", "counter", "Connection checkouts", {}, stats["checkouts"]
+    yield "db_pool_overflow_checkouts_total", "counter", "Checkouts served by overflow connections", {}, stats["overflow_checkouts"]
+    yield "db_pool_checkout_timeouts_total", "counter", "Checkouts that failed waiting for a connection", {}, stats["checkout_timeouts"]
+    yield "db_pool_checkout_errors_total", "counter", "Checkouts that failed opening a new connection", {}, stats["checkout_errors"]
+    yield "db_pool_max_checkout_wait_seconds", "gauge", "Longest wait for a pooled connection", {}, stats["max_checkout_wait_ms"] / 1000
+
+
+def _hashing_samples():
+    stats = hashing_executor.stats()
+    yield "auth_hashing_in_flight", "gauge", "bcrypt jobs running or queued", {}, stats["in_flight"]
+    yield "auth_hashing_queue_depth", "gauge", "bcrypt jobs waiting for a worker", {}, stats["queue_depth"]
+    yield "auth_hashing_rejected_total", "counter", "bcrypt jobs rejected because the pool was saturated", {}, stats["rejected"]
+
+
+def _ingest_samples():
+    stats = vote_ingest_queue.stats()
+    yield "vote_ingest_backlog", "gauge", "Ballots waiting for a batch commit", {}, stats["backlog"]
+    yield "vote_ingest_batches_total", "counter", "Committed ballot batches", {}, stats["batches"]
+    yield "vote_ingest_ballots_total", "counter", "Ballots processed by the batch writer", {}, stats["ballots"]
+    yield "vote_ingest_last_batch_size", "gauge", "Size of the most recent batch", {}, stats["last_batch_size"]
+
+
+def _live_samples():
+    stats = live_results_hub.stats()
+    yield "live_results_subscribers", "gauge", "Open live results streams", {}, stats["subscribers"]
+    yield "live_results_channels", "gauge", "Surveys with at least one live subscriber", {}, stats["channels"]
+    yield "live_results_rejected_total", "counter", "Live streams refused because of the subscriber limit", {}, stats["rejected"]
+    yield "live_results_refreshes_total", "counter", "Aggregate recomputations by live channels", {}, stats["refreshes"]
+    yield "live_results_publishes_total", "counter", "Changed results published to subscribers", {}, stats["publishes"]
+
+
+def _rate_limit_samples():
+    for route_class, stats in rate_limiter.stats().items():
+        labels = {"route_class": route_class}
+        yield "rate_limit_keys", "gauge", "Clients with a token bucket in memory", labels, stats["keys"]
+        yield "rate_limit_allowed_total", "counter", "Requests admitted by the rate limiter", labels, stats["allowed"]
+
+
+def _admission_samples():
+    stats = admission_controller.stats()
+    yield "admission_concurrency_limit", "gauge", "Current adaptive limit on concurrent DB-bound requests", {}, stats["limit"]
+    yield "admission_in_flight", "gauge", "DB-bound requests holding an admission slot", {}, stats["in_flight"]
+    yield "admission_queued", "gauge", "Requests waiting for an admission slot", {}, stats["queued"]
+    yield "admission_admitted_total", "counter", "Requests admitted by the admission controller", {}, stats["admitted"]
+    yield "admission_limit_decreases_total", "counter", "Limit cuts caused by rising DB latency", {}, stats["decreases"]
+    if stats["baseline_db_ms"] is not None:
+        yield "admission_baseline_db_seconds", "gauge", "Baseline per-request DB time used by the limiter", {}, stats["baseline_db_ms"] / 1000
+
+
+def _health_samples():
+    state = health_monitor.readiness()
+    yield "app_ready", "gauge", "1 if the last background health probe passed", {}, 1 if state.ready else 0
+    if state.db_latency_ms is not None:
+        yield "health_db_latency_seconds", "gauge", "Database round-trip measured by the health probe", {}, state.db_latency_ms / 1000
+    if state.loop_lag_ms is not None:
+        yield "event_loop_lag_seconds", "gauge", "How late the health probe timer fired", {}, state.loop_lag_ms / 1000
+
+
+for _collector in (
+    _cache_samples,
+    _pool_samples,
+    _hashing_samples,
+    _ingest_samples,
+    _live_samples,
+    _rate_limit_samples,
+    _admission_samples,
+    _health_samples
+):
+    registry.register_collector(_collector)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE_LATEST)
@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
 from src.database.connection import get_db
+from src.database.follower_reads import get_read_db
+from src.database.models.idempotency import IDEMPOTENCY_KEY_MAX_LENGTH, submit_idempotent
+from src.database.models.surveys import (
+    SURVEY_PAGE_SIZE,
+    SURVEY_PAGE_SIZE_MAX,
+    survey_list_etag,
+    survey_detail_etag
+)
 from src.database.models import (
     get_all_surveys,
-    get_survey_by_id,
+    get_compiled_survey,
+    encode_survey_detail,
+    get_survey_responses_count,
     check_user_completed_survey,
-    save_survey_answers,
-    get_survey_results as db_get_survey_results
+    submit_survey_ballot,
+    get_survey_results_json,
+    live_results_hub
 )
 from src.schemas.survey import (
     SurveyListResponse,
@@ -20,47 +32,86 @@ from src.schemas.survey import (
     SurveyCompleteResponse,
     SurveyResults
 )
-from src.api.auth import get_current_user
-from src.models.user import User
+from src.api.auth import get_current_principal
+from src.auth.principal import Principal
+from src.core.metrics import record_result_code
+from src.core.serialization import JSONBytesResponse
+from src.core.etag import etag_matches, not_modified
 
 router = APIRouter(prefix="/surveys", tags=["surveys"])
 
+# Клиент хранит ответ, но перепроверяет его ETag при каждом запросе
+CACHE_CONTROL = "no-cache"
+
 
 @router.get("/", response_model=List[SurveyListResponse])
 async def get_surveys_list(
+    response: Response,
     status_filter: str = None,
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(SURVEY_PAGE_SIZE, ge=1, le=SURVEY_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db("surveys_list"))
 ):
 
-    surveys = await get_all_surveys(db, status_filter)
+    try:
+        surveys, next_cursor = await get_all_surveys(db, status_filter, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Тело ответа остаётся списком; курсор следующей страницы — в заголовке
+    headers = {"Cache-Control": CACHE_CONTROL}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    
+    etag = survey_list_etag(surveys, status_filter, limit, cursor)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+    
+    response.headers.update(headers)
+    response.headers["ETag"] = etag
     return surveys
 
 
 @router.get("/{survey_id}", response_model=SurveyFullResponse)
 async def get_survey_detail(
     survey_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db("survey_detail"))
 ):
  
-    survey = await get_survey_by_id(db, survey_id, include_questions=True)
+    survey = await get_compiled_survey(db, survey_id)
+    # Определение берём из кэша, счётчик ответов — свежий
+    responses_count = await get_survey_responses_count(db, survey_id) if survey else None
     
-    if not survey:
+    if responses_count is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Survey with id {survey_id} not found"
         )
     
-    return survey
+    etag = survey_detail_etag(survey, responses_count)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, {"Cache-Control": CACHE_CONTROL})
+    
+    # Снимок уже проверен при компиляции: отдаём готовые байты в формате SurveyFullResponse
+    return JSONBytesResponse(
+        encode_survey_detail(survey, responses_count),
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
 
 
 @router.post("/{survey_id}/start", response_model=SurveyStartResponse)
 async def start_survey(
     survey_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
 
-    survey = await get_survey_by_id(db, survey_id)
+    survey = await get_compiled_survey(db, survey_id)
     
     if not survey:
         raise HTTPException(
@@ -92,7 +143,9 @@ async def start_survey(
 async def submit_survey_answers(
     survey_id: UUID,
     answers_data: SurveyAnswersSubmit,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
 
@@ -102,6 +155,12 @@ async def submit_survey_answers(
             detail="Survey ID in path and body do not match"
         )
     
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+        )
+    
     answers_list = [
         {
             "question_id": answer.question_id,
@@ -110,53 +169,121 @@ async def submit_survey_answers(
         for answer in answers_data.answers
     ]
     
-    result = await save_survey_answers(db, survey_id, current_user.id, answers_list)
+    replayed = False
+    if idempotency_key is None:
+        result = await submit_survey_ballot(db, survey_id, current_user.id, answers_list)
+    else:
+        result, replayed = await submit_idempotent(
+            current_user.id,
+            idempotency_key,
+            survey_id,
+            answers_list,
+            lambda idempotency: submit_survey_ballot(db, survey_id, current_user.id, answers_list, idempotency)
+        )
+    record_result_code("save_survey_answers_replayed" if replayed else "save_survey_answers", result["error"])
+    # Повтор отдаёт исходный ответ, включая ошибку; клиент отличает его по заголовку
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
     
     if result["error"] == -1:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=result["message"]
+            detail=result["message"],
+            headers=headers
         )
     elif result["error"] == -2:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["message"]
+            detail=result["message"],
+            headers=headers
         )
     elif result["error"] == -3:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["message"]
+            detail=result["message"],
+            headers=headers
         )
     elif result["error"] in [-4, -5, -6]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result["message"],
+            headers=headers
+        )
+    elif result["error"] == -12:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail=result["message"]
         )
+    elif result["error"] == -10:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=result["message"],
+            headers={"Retry-After": "1"}
+        )
     elif result["error"] == -99:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=result["message"]
         )
     
+    if headers:
+        response.headers.update(headers)
     return SurveyCompleteResponse(
         survey_id=survey_id,
         message=result["message"],
-        completed_at=datetime.now()
+        completed_at=result.get("completed_at") or datetime.now()
     )
 
 
 @router.get("/{survey_id}/results", response_model=SurveyResults)
 async def get_survey_results_endpoint(
     survey_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db("survey_results"))
 ):
   
-    results = await db_get_survey_results(db, survey_id)
+    etag, results = await get_survey_results_json(db, survey_id, if_none_match)
     
-    if not results:
+    if etag is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Survey with id {survey_id} not found"
+        )
+    
+    if results is None:
+        return not_modified(etag, {"Cache-Control": CACHE_CONTROL})
+    
+    return JSONBytesResponse(results, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+@router.get("/{survey_id}/results/stream", response_class=StreamingResponse)
+async def stream_survey_results(
+    survey_id: UUID,
+    db: AsyncSession = Depends(get_db)
+):
+    """Live-результаты (text/event-stream): snapshot, затем delta по мере коммита голосов"""
+
+    if not await get_compiled_survey(db, survey_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Survey with id {survey_id} not found"
         )
     
-    return results
+    if not live_results_hub.running or not live_results_hub.admit():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Live results are unavailable, poll /results instead",
+            headers={"Retry-After": "5"}
+        )
+    
+    # Сессия запроса здесь закрывается: поток читает БД только через канал реплики
+    await db.close()
+    
+    return StreamingResponse(
+        live_results_hub.stream(survey_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx ingress не должен буферизовать поток
+            "X-Accel-Buffering": "no"
+        }
+    )
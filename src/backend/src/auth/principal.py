@@ -0,0 +1,75 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import hashlib
+import os
+import time
+
+from src.core.cache import BinaryCodec, SharedCache
+
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Проверенный пользователь запроса; email/created_at есть только после чтения из БД"""
+    id: int
+    username: str
+    is_admin: bool
+    email: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            is_admin=bool(user.is_admin),
+            email=user.email,
+            created_at=user.created_at
+        )
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["Principal"]:
+        if "username" not in payload or "is_admin" not in payload:
+            return None
+        return cls(
+            id=int(payload["sub"]),
+            username=payload["username"],
+            is_admin=bool(payload["is_admin"])
+        )
+
+
+def _principal_from_primitive(data: Dict[str, Any]) -> Principal:
+    created_at = data.get("created_at")
+    return Principal(**{**data, "created_at": datetime.fromisoformat(created_at) if created_at else None})
+
+
+# Ключ — sha256 токена (сам токен нигде не храним), запись живёт не
+# дольше exp токена и не дольше PRINCIPAL_CACHE_TTL_SECONDS
+principal_cache = SharedCache(
+    name="principals",
+    max_entries=PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS,
+    codec=BinaryCodec(asdict, _principal_from_primitive)
+)
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def principal_ttl(payload: dict) -> float:
+    remaining = float(payload.get("exp", 0)) - time.time()
+    return min(PRINCIPAL_CACHE_TTL_SECONDS, remaining)
+
+
+async def get_cached_principal(
+    token: str,
+    payload: dict,
+    loader: Callable[[], Awaitable[Optional[Principal]]]
+) -> Optional[Principal]:
+    """Principal из кэша или loader() (одна загрузка на токен при одновременных запросах)"""
+    return await principal_cache.get_or_load(token_digest(token), loader, ttl_seconds=principal_ttl(payload))
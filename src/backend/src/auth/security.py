@@ -1,12 +1,18 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
+import time
 
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Класть username/is_admin в токен, чтобы горячие эндпоинты не ходили в users.
+# Флаг же решает, доверять ли claims: выключение отзывает их и у выданных токенов
+AUTH_TOKEN_CLAIMS = os.getenv("AUTH_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -16,6 +22,115 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+
+# bcrypt отпускает GIL, поэтому отдельный пул потоков разгружает event loop.
+# Размер пула и очереди ограничены: при перегрузке лучше быстро отказать,
+# чем копить логины, которые всё равно не уложатся в таймауты клиента.
+HASHING_POOL_WORKERS = int(os.getenv("HASHING_POOL_WORKERS", "2"))
+HASHING_POOL_MAX_QUEUE = int(os.getenv("HASHING_POOL_MAX_QUEUE", "16"))
+
+
+class HashingPoolSaturated(Exception):
+    """Пул хэширования занят и очередь заполнена"""
+
+
+class HashingExecutor:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = None
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def run(self, fn, *args):
+        # Счётчики меняются только из потока event loop, блокировки не нужны
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HashingPoolSaturated()
+
+        self.in_flight += 1
+        self.submitted += 1
+        submitted_at = time.perf_counter()
+
+        def timed_call():
+            started_at = time.perf_counter()
+            result = fn(*args)
+            return result, started_at - submitted_at, time.perf_counter() - started_at
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_executor().submit(timed_call)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        # Слот освобождается, когда bcrypt закончил в потоке, а не когда ушёл
+        # ожидающий запрос: отменённый клиентом запрос оставляет работу в пуле
+        future.add_done_callback(lambda _: self._release(loop))
+        result, waited, ran = await asyncio.wrap_future(future)
+
+        self.completed += 1
+        self.queue_wait_seconds += waited
+        self.run_seconds += ran
+        return result
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Колбэк вызывается в потоке пула: счётчик меняем в потоке event loop
+        try:
+            loop.call_soon_threadsafe(self._decrement_in_flight)
+        except RuntimeError:
+            # loop уже закрыт (остановка процесса)
+            pass
+
+    def _decrement_in_flight(self) -> None:
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_wait_ms": round(self.queue_wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+hashing_executor = HashingExecutor(HASHING_POOL_WORKERS, HASHING_POOL_MAX_QUEUE)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password в пуле хэширования; HashingPoolSaturated при перегрузке"""
+    return await hashing_executor.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash в пуле хэширования; HashingPoolSaturated при перегрузке"""
+    return await hashing_executor.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -27,19 +142,30 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def create_user_token(user_id: int) -> str:
+def create_user_token(user_id: int, username: str = None, is_admin: bool = None) -> str:
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    data = {"sub": str(user_id)}
+    if AUTH_TOKEN_CLAIMS and username is not None:
+        data["username"] = username
+        data["is_admin"] = bool(is_admin)
     return create_access_token(
-        data={"sub": str(user_id)}, 
+        data=data, 
         expires_delta=access_token_expires
     )
 
-def verify_token(token: str):
+def decode_token(token: str):
+    """Проверяет подпись и срок токена; возвращает payload или None"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id_str: str = payload.get("sub")
-        if user_id_str is None:
+        if payload.get("sub") is None:
             return None
-        return int(user_id_str)  
+        int(payload["sub"])
+        return payload
     except (JWTError, ValueError):
-        return None
\ No newline at end of file
+        return None
+
+def verify_token(token: str):
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return int(payload["sub"])
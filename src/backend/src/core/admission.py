@@ -0,0 +1,242 @@
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import asyncio
+import os
+import re
+
+from src.core.metrics import registry, Counter
+from src.core.query_accounting import current_request_db
+
+
+# Адаптивный лимит одновременных запросов к БД (AIMD) с приоритетами.
+# Лимит не выше pool_size + max_overflow: лишние запросы ждут не в пуле
+# SQLAlchemy (до DB_POOL_TIMEOUT, в порядке прихода), а в короткой очереди
+# здесь — голоса первыми — или сразу получают 503.
+# Сигнал — время SQL на запрос (current_request_db): окно из
+# ADMISSION_WINDOW_SAMPLES запросов медленнее базовой линии в
+# ADMISSION_LATENCY_TOLERANCE раз — лимит * ADMISSION_BACKOFF; окно в норме
+# и лимит был занят целиком — лимит + 1.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+# 0 — по пулу соединений (pool_size + max_overflow), задаётся в main.py
+ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", "0"))
+ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", "2"))
+ADMISSION_WINDOW_SAMPLES = int(os.getenv("ADMISSION_WINDOW_SAMPLES", "50"))
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))
+# Ниже этого времени SQL на запрос лимит не снижаем, как бы ни выросло отношение
+ADMISSION_LATENCY_FLOOR_MS = float(os.getenv("ADMISSION_LATENCY_FLOOR_MS", "20"))
+ADMISSION_BACKOFF = float(os.getenv("ADMISSION_BACKOFF", "0.8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "200"))
+
+# (класс, приоритет, доля лимита, ожидание в очереди, мс, метод, путь);
+# меньший приоритет обслуживается раньше, доля < 1 оставляет запас голосам
+ROUTE_PRIORITIES: Tuple[Tuple[str, int, float, float, str, re.Pattern], ...] = (
+    ("vote", 0, 1.0, 500, "POST", re.compile(r"^/api/surveys/[^/]+/(answer|start)$")),
+    ("results", 1, 0.9, 100, "GET", re.compile(r"^/api/surveys/[^/]+/results$")),
+    ("list", 2, 0.75, 50, "GET", re.compile(r"^/api/surveys(/|/[^/]+)?$")),
+)
+
+SHED_REQUESTS = registry.register(Counter(
+    "http_admission_shed_total", "Requests rejected with 503 by the admission controller", ("route_class", "reason")
+))
+
+
+class _Waiter:
+    __slots__ = ("share", "future")
+
+    def __init__(self, share: float, future: asyncio.Future):
+        self.share = share
+        self.future = future
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = ADMISSION_MIN_LIMIT,
+        window_samples: int = ADMISSION_WINDOW_SAMPLES,
+        tolerance: float = ADMISSION_LATENCY_TOLERANCE,
+        latency_floor_ms: float = ADMISSION_LATENCY_FLOOR_MS,
+        backoff: float = ADMISSION_BACKOFF,
+        max_queue: int = ADMISSION_MAX_QUEUE
+    ):
+        self.min_limit = min_limit
+        self.window_samples = window_samples
+        self.tolerance = tolerance
+        self.latency_floor = latency_floor_ms / 1000
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.set_max_limit(max_limit)
+
+        self.in_flight = 0
+        self._queues: Dict[int, Deque[_Waiter]] = {}
+        self.queued = 0
+
+        # Базовая линия — лучшее среднее окна; медленно подтягивается вверх,
+        # чтобы постоянный рост данных не держал лимит на минимуме
+        self.baseline: Optional[float] = None
+        self._window_total = 0.0
+        self._window_count = 0
+        self._window_peak = 0
+
+        self.admitted = 0
+        self.shed = 0
+        self.increases = 0
+        self.decreases = 0
+
+    def set_max_limit(self, max_limit: int) -> None:
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(self.max_limit)
+
+    def _capacity(self, share: float) -> int:
+        return max(1, int(self.limit * share))
+
+    def _has_waiters(self, priority: int) -> bool:
+        return any(self._queues.get(p) for p in range(priority + 1))
+
+    async def acquire(self, priority: int, share: float, max_wait: float) -> Optional[str]:
+        """Слот для запроса; None — допущен, иначе причина отказа (queue_full/timeout)"""
+        if self.in_flight < self._capacity(share) and not self._has_waiters(priority):
+            self._admit()
+            return None
+        if self.queued >= self.max_queue:
+            return "queue_full"
+
+        waiter = _Waiter(share, asyncio.get_running_loop().create_future())
+        queue = self._queues.setdefault(priority, deque())
+        queue.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait({waiter.future}, timeout=max_wait)
+        except asyncio.CancelledError:
+            # Клиент ушёл, а слот уже выдан — возвращаем его
+            if waiter.future.done():
+                self.release(None)
+            raise
+        finally:
+            admitted = waiter.future.done()
+            if not admitted:
+                queue.remove(waiter)
+                self.queued -= 1
+                waiter.future.cancel()
+        return None if admitted else "timeout"
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        self.admitted += 1
+        self._window_peak = max(self._window_peak, self.in_flight)
+
+    def release(self, db_seconds: Optional[float]) -> None:
+        self.in_flight -= 1
+        if db_seconds is not None:
+            self._observe(db_seconds)
+        self._wake()
+
+    def _wake(self) -> None:
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            while queue and self.in_flight < self._capacity(queue[0].share):
+                waiter = queue.popleft()
+                self.queued -= 1
+                self._admit()
+                waiter.future.set_result(True)
+            if queue:
+                # Старший приоритет ждёт — младшие не обгоняют
+                return
+
+    def _observe(self, db_seconds: float) -> None:
+        self._window_total += db_seconds
+        self._window_count += 1
+        if self._window_count < self.window_samples:
+            return
+
+        average = self._window_total / self._window_count
+        peak = self._window_peak
+        self._window_total = 0.0
+        self._window_count = 0
+        self._window_peak = self.in_flight
+
+        if self.baseline is None or average < self.baseline:
+            self.baseline = average
+        else:
+            self.baseline += (average - self.baseline) * 0.01
+
+        if average > max(self.baseline * self.tolerance, self.latency_floor):
+            self.limit = max(float(self.min_limit), self.limit * self.backoff)
+            self.decreases += 1
+        elif peak >= int(self.limit) and self.limit < self.max_limit:
+            self.limit = min(float(self.max_limit), self.limit + 1)
+            self.increases += 1
+            self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "baseline_db_ms": round(self.baseline * 1000, 3) if self.baseline is not None else None,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+admission_controller = AdmissionController(max_limit=ADMISSION_MAX_LIMIT)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware перед маршрутами, работающими с БД: слот по приоритету
+    класса или быстрый 503 с Retry-After. Должен быть внутри
+    QueryAccountingMiddleware — время SQL запроса берётся оттуда.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission_controller, enabled: bool = ADMISSION_ENABLED):
+        self.app = app
+        self.controller = controller
+        self.enabled = enabled
+
+    @staticmethod
+    def classify(method: str, path: str) -> Optional[Tuple[str, int, float, float]]:
+        for name, priority, share, max_wait_ms, route_method, pattern in ROUTE_PRIORITIES:
+            if method == route_method and pattern.match(path):
+                return name, priority, share, max_wait_ms / 1000
+        return None
+
+    async def __call__(self, scope, receive, send):
+        route = self.classify(scope["method"], scope["path"]) if scope["type"] == "http" and self.enabled else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        name, priority, share, max_wait = route
+        reason = await self.controller.acquire(priority, share, max_wait)
+        if reason is not None:
+            self.controller.shed += 1
+            SHED_REQUESTS.inc(name, reason)
+            body = b'{"detail":"Server is overloaded, retry later"}'
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        stats = current_request_db.get()
+        statements_before = stats.statements if stats is not None else 0
+        seconds_before = stats.seconds if stats is not None else 0.0
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Без SQL (кэш, 304) запрос ничего не говорит о нагрузке на БД
+            sample = None
+            if stats is not None and stats.statements > statements_before:
+                sample = stats.seconds - seconds_before
+            self.controller.release(sample)
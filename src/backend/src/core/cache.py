@@ -0,0 +1,397 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+import orjson
+
+from src.core.cache_backends import (
+    CACHE_COMPRESS_MIN_BYTES,
+    CACHE_KEY_PREFIX,
+    CACHE_TOMBSTONE_SECONDS,
+    CacheBackend,
+    get_cache_backend
+)
+
+logger = logging.getLogger("cache")
+
+
+class LRUTTLCache:
+    """
+    Ограниченный по размеру кэш процесса: LRU-вытеснение + TTL на запись.
+
+    Счётчики hits/misses/evictions/expirations нужны, чтобы подбирать
+    max_entries и ttl под реальную нагрузку.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, name: str = "cache"):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class BinaryCodec:
+    """
+    Значение <-> компактные байты для общего кэша: to_primitive даёт то, что
+    умеет orjson, тело больше CACHE_COMPRESS_MIN_BYTES сжимается zlib.
+    Первый байт — формат: b"j" (orjson) или b"z" (zlib(orjson)).
+    """
+
+    def __init__(
+        self,
+        to_primitive: Callable[[Any], Any],
+        from_primitive: Callable[[Any], Any],
+        compress_min_bytes: int = CACHE_COMPRESS_MIN_BYTES
+    ):
+        self.to_primitive = to_primitive
+        self.from_primitive = from_primitive
+        self.compress_min_bytes = compress_min_bytes
+
+    def encode(self, value: Any) -> bytes:
+        raw = orjson.dumps(self.to_primitive(value))
+        if len(raw) >= self.compress_min_bytes:
+            return b"z" + zlib.compress(raw, 1)
+        return b"j" + raw
+
+    def decode(self, data: bytes) -> Any:
+        raw = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+        return self.from_primitive(orjson.loads(raw))
+
+
+# Идентификатор процесса в сообщениях инвалидации: свои сообщения пропускаем
+REPLICA_ID = uuid.uuid4().hex[:12]
+
+
+def renew_replica_id() -> str:
+    """После fork (gunicorn preload_app): у каждого воркера свой id"""
+    global REPLICA_ID
+    REPLICA_ID = uuid.uuid4().hex[:12]
+    return REPLICA_ID
+
+
+# Метка удаления в L2: b"-" + время удаления (time.time()); кодек пишет
+# значения с префиксом b"j" или b"z"
+_TOMBSTONE = b"-"
+
+
+def _deleted_at(data: Optional[bytes]) -> Optional[float]:
+    if data is None or data[:1] != _TOMBSTONE:
+        return None
+    try:
+        return float(data[1:])
+    except ValueError:
+        return float("inf")
+
+
+def _key_str(key: Hashable) -> str:
+    return key.hex() if isinstance(key, bytes) else str(key)
+
+
+class SharedCache:
+    """
+    Двухуровневый кэш: L1 — LRUTTLCache процесса (объекты, без сериализации),
+    L2 — общий backend (CACHE_BACKEND), значения в виде BinaryCodec-байтов.
+
+    delete() заменяет ключ в L2 меткой удаления со временем и рассылает
+    инвалидацию: другие реплики выбрасывают его из L1. Загрузка пишет в L2,
+    только если ключа нет (SET NX) или метка старше начала загрузки: значение,
+    прочитанное другой репликой до delete(), не вернётся в L2 после него,
+    даже если сообщение об инвалидации ещё не дошло. get_or_load() сводит одновременные промахи по ключу к одной
+    загрузке (single-flight). Ошибки backend не ломают запрос: считаются и
+    ведут себя как промах. remote_ttl_seconds — отдельный (меньший) TTL для L2.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        ttl_seconds: float,
+        codec: BinaryCodec,
+        backend: Optional[CacheBackend] = None,
+        origin: Optional[str] = None,
+        remote_ttl_seconds: Optional[float] = None
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.remote_ttl_seconds = remote_ttl_seconds
+        self.codec = codec
+        self.local = LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds, name=name)
+        self.backend = backend if backend is not None else get_cache_backend()
+        # None — текущий REPLICA_ID процесса (читается при каждом сообщении)
+        self._origin = origin
+        # Поколение ключа растёт при каждой инвалидации (своей или чужой):
+        # загрузка, начатая до инвалидации, не кладёт устаревшее значение.
+        # Хранится только для ключей с идущими чтениями (_readers) — словарь
+        # не растёт с числом когда-либо инвалидированных ключей
+        self._generations: Dict[str, int] = {}
+        self._readers: Dict[str, int] = {}
+        self._flights: Dict[str, asyncio.Future] = {}
+        # Подписчики на инвалидации от других реплик: key, None — возможен пропуск
+        self._invalidation_listeners: List[Callable[[Optional[str]], None]] = []
+
+        self.remote_hits = 0
+        self.remote_misses = 0
+        self.remote_errors = 0
+        self.coalesced = 0
+        self.invalidations_received = 0
+
+        if self.backend is not None:
+            self.backend.add_listener(self._on_invalidation)
+
+    @property
+    def origin(self) -> str:
+        return self._origin or REPLICA_ID
+
+    @property
+    def hits(self) -> int:
+        return self.local.hits
+
+    @property
+    def misses(self) -> int:
+        return self.local.misses
+
+    @property
+    def evictions(self) -> int:
+        return self.local.evictions
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    def _remote_key(self, key: str) -> str:
+        return f"{CACHE_KEY_PREFIX}:{self.name}:{key}"
+
+    async def _remote(self, operation: Awaitable) -> Any:
+        try:
+            return await operation
+        except Exception as e:
+            self.remote_errors += 1
+            logger.warning("cache %s: backend error: %s", self.name, e)
+            return None
+
+    def _drop_local(self, key: str) -> None:
+        if key in self._readers:
+            self._generations[key] = self._generations.get(key, 0) + 1
+        self.local.delete(key)
+
+    def _begin_read(self, key: str) -> int:
+        self._readers[key] = self._readers.get(key, 0) + 1
+        return self._generations.get(key, 0)
+
+    def _end_read(self, key: str) -> None:
+        readers = self._readers.pop(key) - 1
+        if readers:
+            self._readers[key] = readers
+        else:
+            self._generations.pop(key, None)
+
+    def add_invalidation_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        self._invalidation_listeners.append(listener)
+
+    def _on_invalidation(self, message: Optional[bytes]) -> None:
+        # None — backend переподключился и мог пропустить сообщения: сбрасываем L1
+        if message is None:
+            self.local.clear()
+            key = None
+        else:
+            origin, name, key = message.decode().split("|", 2)
+            if origin == self.origin or name != self.name:
+                return
+            self.invalidations_received += 1
+            self._drop_local(key)
+        for listener in self._invalidation_listeners:
+            listener(key)
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        key = _key_str(key)
+        value = self.local.get(key)
+        if value is not None or self.backend is None:
+            return value
+
+        generation = self._begin_read(key)
+        try:
+            data = await self._remote(self.backend.get(self._remote_key(key)))
+            if data is None or data[:1] == _TOMBSTONE:
+                self.remote_misses += 1
+                return None
+            self.remote_hits += 1
+            value = self.codec.decode(data)
+            if self._generations.get(key, 0) == generation:
+                self.local.set(key, value)
+            return value
+        finally:
+            self._end_read(key)
+
+    def _remote_ttl(self, ttl_seconds: Optional[float]) -> float:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if self.remote_ttl_seconds is not None:
+            ttl = min(ttl, self.remote_ttl_seconds)
+        return ttl
+
+    async def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        key = _key_str(key)
+        self.local.set(key, value, ttl_seconds)
+        ttl = self._remote_ttl(ttl_seconds)
+        if self.backend is not None and ttl > 0:
+            await self._remote(self.backend.set(self._remote_key(key), self.codec.encode(value), ttl))
+
+    async def _set_loaded(self, key: str, value: Any, ttl_seconds: Optional[float], started: float) -> None:
+        """Значение загрузки, начатой в started (time.time()): не поверх более позднего delete()"""
+        self.local.set(key, value, ttl_seconds)
+        ttl = self._remote_ttl(ttl_seconds)
+        if self.backend is None or ttl <= 0:
+            return
+        remote_key = self._remote_key(key)
+        deleted_at = _deleted_at(await self._remote(self.backend.get(remote_key)))
+        if deleted_at is not None and deleted_at >= started:
+            return
+        # Старая метка — перезаписываем; живое значение другой реплики — не трогаем
+        encoded = self.codec.encode(value)
+        await self._remote(self.backend.set(remote_key, encoded, ttl, if_absent=deleted_at is None))
+
+    async def delete(self, key: Hashable) -> None:
+        """Инвалидирует ключ во всех репликах"""
+        key = _key_str(key)
+        self._drop_local(key)
+        if self.backend is not None:
+            tombstone = _TOMBSTONE + repr(time.time()).encode()
+            await self._remote(self.backend.set(self._remote_key(key), tombstone, CACHE_TOMBSTONE_SECONDS))
+            await self._remote(self.backend.publish(f"{self.origin}|{self.name}|{key}".encode()))
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        ttl_seconds: Optional[float] = None
+    ) -> Optional[Any]:
+        """Значение из кэша или из loader(); None от loader не кэшируется"""
+        value = await self.get(key)
+        if value is not None:
+            return value
+        return await self.load(key, loader, ttl_seconds)
+
+    async def load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Optional[Any]]],
+        ttl_seconds: Optional[float] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Optional[Any]:
+        """
+        loader() после промаха: одновременные вызовы по ключу ждут одну загрузку.
+        cacheable(value) — False: значение отдаётся ожидающим, но не кэшируется.
+        """
+        skey = _key_str(key)
+        flight = self._flights.get(skey)
+        if flight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                # Отменили запрос-загрузчик, а не нас — грузим сами
+                if not flight.cancelled():
+                    raise
+                return await self.load(key, loader, ttl_seconds, cacheable)
+
+        flight = self._flights[skey] = asyncio.get_running_loop().create_future()
+        generation = self._begin_read(skey)
+        started = time.time()
+        try:
+            try:
+                value = await loader()
+            except asyncio.CancelledError:
+                flight.cancel()
+                raise
+            except Exception as e:
+                flight.set_exception(e)
+                flight.exception()  # ожидающих может не быть — не пишем "exception was never retrieved"
+                raise
+            finally:
+                self._flights.pop(skey, None)
+
+            flight.set_result(value)
+            if (
+                value is not None
+                and (cacheable is None or cacheable(value))
+                and self._generations.get(skey, 0) == generation
+            ):
+                await self._set_loaded(skey, value, ttl_seconds, started)
+            return value
+        finally:
+            self._end_read(skey)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.local.stats()
+        stats.update({
+            "backend": type(self.backend).__name__ if self.backend is not None else "local",
+            "remote_hits": self.remote_hits,
+            "remote_misses": self.remote_misses,
+            "remote_errors": self.remote_errors,
+            "coalesced": self.coalesced,
+            "invalidations_received": self.invalidations_received,
+        })
+        return stats
@@ -0,0 +1,174 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+
+
+# Общий уровень кэша для нескольких реплик.
+#   local  — только кэш процесса (по умолчанию, как в dev/docker-compose)
+#   memory — MemoryCacheBackend: общий уровень внутри процесса; тот же путь
+#            сериализации и инвалидации, что в prod, без внешнего сервиса
+#   redis  — RedisCacheBackend: любой сервер с протоколом Redis (Redis, Valkey, KeyDB)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "voting")
+CACHE_REMOTE_TIMEOUT_MS = float(os.getenv("CACHE_REMOTE_TIMEOUT_MS", "100"))
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "512"))
+# Сколько живёт метка удаления в L2: дольше самой долгой загрузки — значение,
+# прочитанное до инвалидации, не запишется поверх неё
+CACHE_TOMBSTONE_SECONDS = float(os.getenv("CACHE_TOMBSTONE_SECONDS", "10"))
+CACHE_INVALIDATION_CHANNEL = f"{CACHE_KEY_PREFIX}:invalidate"
+
+logger = logging.getLogger("cache")
+
+# Слушатель инвалидаций: bytes — сообщение, None — сбросить всё (сообщения могли потеряться)
+InvalidationListener = Callable[[Optional[bytes]], None]
+
+
+class CacheBackend:
+    """Байтовое key-value хранилище с TTL и широковещательной инвалидацией"""
+
+    def __init__(self):
+        self._listeners: List[InvalidationListener] = []
+
+    def add_listener(self, listener: InvalidationListener) -> None:
+        self._listeners.append(listener)
+
+    def _dispatch(self, message: Optional[bytes]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                logger.warning("cache invalidation listener failed: %s", e)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float, if_absent: bool = False) -> None:
+        """if_absent — только если ключа нет (SET NX)"""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def publish(self, message: bytes) -> None:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        """Подписка на инвалидации (вызывается в lifespan)"""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self):
+        super().__init__()
+        self._data: Dict[str, Tuple[bytes, float]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float, if_absent: bool = False) -> None:
+        if if_absent and await self.get(key) is not None:
+            return
+        self._data[key] = (value, time.monotonic() + ttl_seconds)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def publish(self, message: bytes) -> None:
+        self._dispatch(message)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis-протокол через redis.asyncio. Команды — с коротким таймаутом
+    (CACHE_REMOTE_TIMEOUT_MS); подписка на канал инвалидаций — отдельным
+    соединением без таймаута чтения, с переподключением.
+    """
+
+    def __init__(self, url: str, channel: str = CACHE_INVALIDATION_CHANNEL, timeout_ms: float = CACHE_REMOTE_TIMEOUT_MS):
+        super().__init__()
+        # Зависимость нужна только при CACHE_BACKEND=redis
+        import redis.asyncio as redis
+
+        timeout = timeout_ms / 1000
+        self.url = url
+        self.channel = channel
+        self._redis = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._subscriber = redis.Redis.from_url(url, socket_connect_timeout=max(timeout, 1.0))
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float, if_absent: bool = False) -> None:
+        await self._redis.set(key, value, px=max(1, int(ttl_seconds * 1000)), nx=if_absent)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def publish(self, message: bytes) -> None:
+        await self._redis.publish(self.channel, message)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        connected_before = False
+        while True:
+            pubsub = self._subscriber.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if connected_before:
+                    self._dispatch(None)
+                connected_before = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("cache invalidation subscription lost: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._redis.aclose()
+        await self._subscriber.aclose()
+
+
+_backend: Optional[CacheBackend] = None
+_backend_created = False
+
+
+def get_cache_backend() -> Optional[CacheBackend]:
+    """Backend процесса по CACHE_BACKEND; None — общего уровня нет"""
+    global _backend, _backend_created
+    if not _backend_created:
+        _backend_created = True
+        if CACHE_BACKEND == "memory":
+            _backend = MemoryCacheBackend()
+        elif CACHE_BACKEND == "redis":
+            _backend = RedisCacheBackend(CACHE_REDIS_URL)
+        elif CACHE_BACKEND != "local":
+            raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+    return _backend
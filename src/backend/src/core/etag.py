@@ -0,0 +1,33 @@
+from hashlib import blake2b
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+
+
+# Сильные ETag из дешёвых маркеров версии (id, updated_at, счётчики), а не
+# из хэша тела: сравнить тег можно до сборки и сериализации ответа.
+
+
+def make_etag(*parts: Any) -> str:
+    digest = blake2b("|".join(str(part) for part in parts).encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка If-None-Match (слабое сравнение, RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """304 без тела; заголовки — те же, что были бы у ответа 200"""
+    return Response(status_code=304, headers={**(headers or {}), "ETag": etag})
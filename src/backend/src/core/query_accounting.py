@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+import json
+import logging
+import os
+import re
+import time
+
+from src.core.metrics import REQUEST_DB_TIME
+
+
+# Учёт SQL на запрос: число выражений, время в БД и повторы одного и того
+# же (нормализованного) выражения — так N+1 виден в логах и заголовках
+# ответа, а не только при чтении кода.
+APP_ENV = os.getenv("APP_ENV", "dev")
+QUERY_HEADERS_ENABLED = os.getenv("QUERY_HEADERS_ENABLED", "true" if APP_ENV != "prod" else "false").lower() in ("1", "true", "yes")
+QUERY_REPEAT_WARN_THRESHOLD = int(os.getenv("QUERY_REPEAT_WARN_THRESHOLD", "10"))
+
+logger = logging.getLogger("query_accounting")
+
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|\$\d+|\?|%s|\b\d+\b|'(?:[^']|'')*'")
+_REPEATED_GROUP_RE = re.compile(r"(\([?, ]*\))(?:\s*,\s*\([?, ]*\))+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Заменяет параметры и литералы на ?, сворачивает VALUES/IN-списки"""
+    normalized = _PLACEHOLDER_RE.sub("?", statement)
+    normalized = _WHITESPACE_RE.sub(" ", normalized)
+    normalized = re.sub(r"\?(?:\s*,\s*\?)+", "?", normalized)
+    normalized = _REPEATED_GROUP_RE.sub(r"\1", normalized)
+    return normalized.strip()
+
+
+class RequestDbStats:
+    __slots__ = ("statements", "seconds", "by_statement")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        # Ключ — текст выражения как его отдал SQLAlchemy (с плейсхолдерами);
+        # нормализуем только при разборе подозрительных запросов
+        self.by_statement: Dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        self.by_statement[statement] = self.by_statement.get(statement, 0) + 1
+
+    def repeated_statements(self, threshold: int) -> Dict[str, int]:
+        if self.statements <= threshold:
+            return {}
+        grouped: Dict[str, int] = {}
+        for statement, count in self.by_statement.items():
+            key = normalize_statement(statement)
+            grouped[key] = grouped.get(key, 0) + count
+        return {statement: count for statement, count in grouped.items() if count > threshold}
+
+
+# Статистика БД текущего запроса. Greenlet, в котором async engine выполняет
+# выражения, разделяет контекст с задачей запроса, поэтому события engine
+# видят то же значение.
+current_request_db: ContextVar[Optional[RequestDbStats]] = ContextVar("current_request_db", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """Подписывает engine на события выполнения для учёта SQL по запросам"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    # Время начала — в контексте выполнения, а не в conn.info: контекст живёт
+    # одно выражение, и упавшее выражение ничего не оставляет на соединении пула
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    def _record(context, statement: str) -> None:
+        started = getattr(context, "_query_started", None)
+        stats = current_request_db.get()
+        if started is not None and stats is not None:
+            stats.record(statement, time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _record(context, statement)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        # Упавшее выражение тоже ходило в БД: учитываем его время
+        if exception_context.statement is not None:
+            _record(exception_context.execution_context, exception_context.statement)
+
+
+@contextmanager
+def count_queries():
+    """Считает SQL внутри блока (для тестов и скриптов): with count_queries() as stats: ..."""
+    stats = RequestDbStats()
+    token = current_request_db.set(stats)
+    try:
+        yield stats
+    finally:
+        current_request_db.reset(token)
+
+
+class QueryAccountingMiddleware:
+    """
+    ASGI middleware: число SQL-выражений и время БД на запрос.
+
+    Вне prod добавляет заголовки X-DB-Query-Count / X-DB-Time-Ms; если одно
+    нормализованное выражение выполнено больше QUERY_REPEAT_WARN_THRESHOLD
+    раз, пишет структурированное предупреждение.
+    """
+
+    def __init__(self, app, headers: bool = QUERY_HEADERS_ENABLED, threshold: int = QUERY_REPEAT_WARN_THRESHOLD):
+        self.app = app
+        self.headers = headers
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Внешний count_queries() (тесты) имеет приоритет
+        stats = current_request_db.get()
+        token = None
+        if stats is None:
+            stats = RequestDbStats()
+            token = current_request_db.set(stats)
+
+        async def send_wrapper(message):
+            if self.headers and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.statements).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.seconds * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                current_request_db.reset(token)
+
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            if stats.statements:
+                REQUEST_DB_TIME.observe(stats.seconds, route_path)
+
+            for statement, count in stats.repeated_statements(self.threshold).items():
+                logger.warning(json.dumps({
+                    "event": "repeated_statement",
+                    "method": scope["method"],
+                    "route": route_path,
+                    "count": count,
+                    "threshold": self.threshold,
+                    "request_statements": stats.statements,
+                    "statement": statement[:500],
+                }))
@@ -0,0 +1,224 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+import math
+import os
+import re
+import time
+
+from src.core.metrics import registry, Counter
+
+
+# Token bucket по классам маршрутов, до роутинга: отклонённый запрос не
+# открывает сессию БД и не доходит до bcrypt. Ключ — id пользователя из
+# проверенного токена, иначе IP клиента (auth — всегда IP).
+#   RATE_LIMIT_<CLASS>_RATE  — токенов в секунду (средняя скорость)
+#   RATE_LIMIT_<CLASS>_BURST — ёмкость ведра (допустимый всплеск)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Сколько доверенных прокси (Ingress) дописывают X-Forwarded-For; 0 — адрес сокета
+RATE_LIMIT_FORWARDED_HOPS = int(os.getenv("RATE_LIMIT_FORWARDED_HOPS", "0"))
+
+# (класс, метод, путь)
+ROUTE_CLASSES: Tuple[Tuple[str, Tuple[str, ...], re.Pattern], ...] = (
+    ("auth", ("POST",), re.compile(r"^/api/auth/(login|register)$")),
+    ("vote", ("POST",), re.compile(r"^/api/surveys/[^/]+/(answer|start)$")),
+    ("read", ("GET", "HEAD"), re.compile(r"^/api/surveys(/.*)?$")),
+)
+
+_DEFAULT_LIMITS = {
+    "auth": (0.5, 10),
+    "vote": (2, 10),
+    "read": (20, 60),
+}
+
+RATE_LIMITED = registry.register(Counter(
+    "http_rate_limited_total", "Requests rejected with 429 by the rate limiter", ("route_class",)
+))
+
+
+def _limit_from_env(route_class: str) -> Tuple[float, float]:
+    rate, burst = _DEFAULT_LIMITS[route_class]
+    prefix = f"RATE_LIMIT_{route_class.upper()}"
+    return float(os.getenv(f"{prefix}_RATE", str(rate))), float(os.getenv(f"{prefix}_BURST", str(burst)))
+
+
+class TokenBucketStore:
+    """
+    Ведра по ключу в двух поколениях dict: (токены, время обновления).
+
+    Ведро, которого не трогали burst / rate секунд, снова полное — хранить его
+    незачем. Раз в этот период старшее поколение выбрасывается целиком, а
+    ключи, к которым обращались, переезжают в младшее: очистка без таймеров
+    и обхода всех ключей. При max_keys поколения сдвигаются досрочно (ведра
+    старшего поколения при этом сбрасываются в полные).
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_seconds = burst / rate
+        self._current: Dict[str, Tuple[float, float]] = {}
+        self._previous: Dict[str, Tuple[float, float]] = {}
+        self._rotated_at = time.monotonic()
+
+        self.allowed = 0
+        self.rejected = 0
+        self.early_rotations = 0
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
+
+    def _rotate(self, now: float) -> None:
+        self._previous, self._current = self._current, {}
+        self._rotated_at = now
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """Списывает токен; 0 — запрос пропущен, иначе секунд до следующего токена"""
+        if now is None:
+            now = time.monotonic()
+        elapsed = now - self._rotated_at
+        if elapsed >= self.idle_seconds:
+            # Прошло два периода — и младшее поколение целиком из полных вёдер
+            if elapsed >= 2 * self.idle_seconds:
+                self._current = {}
+            self._rotate(now)
+        elif len(self) >= self.max_keys:
+            self.early_rotations += 1
+            self._rotate(now)
+
+        entry = self._current.get(key)
+        if entry is None:
+            entry = self._previous.pop(key, None)
+        if entry is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+
+        if tokens >= 1:
+            self._current[key] = (tokens - 1, now)
+            self.allowed += 1
+            return 0.0
+        self._current[key] = (tokens, now)
+        self.rejected += 1
+        return (1 - tokens) / self.rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "keys": len(self),
+            "max_keys": self.max_keys,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "early_rotations": self.early_rotations,
+        }
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, float]],
+        route_classes: Iterable[Tuple[str, Tuple[str, ...], re.Pattern]] = ROUTE_CLASSES,
+        max_keys: int = RATE_LIMIT_MAX_KEYS
+    ):
+        self.route_classes = tuple(route_classes)
+        self.stores = {
+            name: TokenBucketStore(rate, burst, max_keys)
+            for name, (rate, burst) in limits.items()
+            if rate > 0
+        }
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        for name, methods, pattern in self.route_classes:
+            if method in methods and pattern.match(path):
+                return name if name in self.stores else None
+        return None
+
+    def acquire(self, route_class: str, key: str) -> float:
+        return self.stores[route_class].acquire(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: store.stats() for name, store in self.stores.items()}
+
+
+rate_limiter = RateLimiter({name: _limit_from_env(name) for name in _DEFAULT_LIMITS})
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_ip(scope, forwarded_hops: int = RATE_LIMIT_FORWARDED_HOPS) -> str:
+    if forwarded_hops > 0:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            # Правые forwarded_hops адресов дописали наши прокси; левее — то, что прислал клиент
+            hops = [hop.strip() for hop in forwarded.split(",")]
+            return hops[max(0, len(hops) - forwarded_hops)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _token_subject(scope) -> Optional[str]:
+    authorization = _header(scope, b"authorization")
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    # Импорт здесь: core не зависит от auth при загрузке модуля
+    from src.auth.security import decode_token
+
+    payload = decode_token(authorization[7:].strip())
+    return payload["sub"] if payload is not None else None
+
+
+class RateLimitMiddleware:
+    """ASGI middleware: 429 с Retry-After, когда ведро ключа пусто"""
+
+    def __init__(
+        self,
+        app,
+        limiter: RateLimiter = rate_limiter,
+        enabled: bool = RATE_LIMIT_ENABLED,
+        forwarded_hops: int = RATE_LIMIT_FORWARDED_HOPS
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.enabled = enabled
+        self.forwarded_hops = forwarded_hops
+
+    def client_key(self, scope, route_class: str) -> str:
+        if route_class != "auth":
+            subject = _token_subject(scope)
+            if subject is not None:
+                return f"u:{subject}"
+        return f"ip:{client_ip(scope, self.forwarded_hops)}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.limiter.classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.limiter.acquire(route_class, self.client_key(scope, route_class))
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMITED.inc(route_class)
+        body = b'{"detail":"Too many requests"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
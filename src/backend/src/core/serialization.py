@@ -0,0 +1,43 @@
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+import orjson
+from fastapi import Response
+
+
+# Быстрый путь ответа: данные уже проверены (снимок анкеты, агрегаты из БД),
+# поэтому вместо повторной валидации через pydantic сразу кодируем в байты.
+# OPT_UTC_Z даёт "...Z" для UTC, как pydantic, — формат ответа не меняется.
+JSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value: Any) -> Any:
+    # orjson кодирует нативно только точный uuid.UUID; драйверы отдают подклассы
+    # (asyncpg — pgproto.UUID). Decimal — агрегаты NUMERIC (sum по bigint)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Кодирует в JSON-байты (UUID и datetime — нативно, подклассы UUID и Decimal — через _default)"""
+    return orjson.dumps(value, default=_default, option=JSON_OPTIONS)
+
+
+def splice_object(head: bytes, name: str, encoded: bytes) -> bytes:
+    """Дописывает в закодированный объект head поле name с уже готовым JSON encoded"""
+    separator = b"," if head != b"{}" else b""
+    return head[:-1] + separator + dumps(name) + b":" + encoded + b"}"
+
+
+class JSONBytesResponse(Response):
+    """Ответ с готовыми JSON-байтами: без jsonable_encoder и повторной валидации"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
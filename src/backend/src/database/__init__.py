@@ -1,4 +1,4 @@
-from .connection import engine, get_db, Base
+from .connection import get_engine, get_db, Base
 
 async def create_tables():
     pass 
\ No newline at end of file
@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
+import time
 
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "26257")
@@ -16,6 +18,32 @@ ASYNC_DATABASE_URL = f"postgresql+psycopg://{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NA
 SYNC_DATABASE_URL = f"postgresql+psycopg2://{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=disable"
 
 
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+# Пул соединений. Значения по умолчанию рассчитаны на 3 реплики бэкенда
+# против одного узла CockroachDB: (pool_size + max_overflow) * реплики
+# должно оставаться заметно ниже лимита соединений кластера.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", "true")
+DB_ECHO = _env_bool("DB_ECHO", "false")
+# Настройки сессии CockroachDB, через ";": "statement_timeout=5s;application_name=voting-backend"
+DB_SESSION_SETTINGS = os.getenv("DB_SESSION_SETTINGS", "application_name=voting-backend")
+
+
+def parse_session_settings(raw: str) -> dict:
+    settings = {}
+    for item in raw.split(";"):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            settings[name.strip()] = value.strip()
+    return settings
+
+
 import sqlalchemy.dialects.postgresql.base as pg_base
 original_get_server_version_info = pg_base.PGDialect._get_server_version_info
 
@@ -27,22 +55,148 @@ def _get_server_version_info(self, connection):
 
 pg_base.PGDialect._get_server_version_info = _get_server_version_info
 
-engine = create_async_engine(
-    ASYNC_DATABASE_URL, 
-    echo=True
-)
 
-sync_engine = create_engine(SYNC_DATABASE_URL, echo=True)
+class PoolStats:
+    """Счётчики пула соединений для подбора pool_size/max_overflow"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.max_checkout_wait_seconds = 0.0
+        self.checkout_timeouts = 0
+        # Ошибки открытия нового соединения (отказ, аутентификация) — не насыщение пула
+        self.checkout_errors = 0
+        self.overflow_checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def as_dict(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checkouts": self.checkouts,
+            "avg_checkout_wait_ms": round(self.checkout_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_checkout_wait_ms": round(self.max_checkout_wait_seconds * 1000, 3),
+            "checkout_timeouts": self.checkout_timeouts,
+            "checkout_errors": self.checkout_errors,
+            "overflow_checkouts": self.overflow_checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который измеряет ожидание свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.checkout_timeouts += 1
+            raise
+        except Exception:
+            pool_stats.checkout_errors += 1
+            raise
+        waited = time.perf_counter() - started
+        pool_stats.checkouts += 1
+        pool_stats.checkout_wait_seconds += waited
+        pool_stats.max_checkout_wait_seconds = max(pool_stats.max_checkout_wait_seconds, waited)
+        if self.checkedout() > self.size():
+            pool_stats.overflow_checkouts += 1
+        return connection
+
+
+def _connect_args() -> dict:
+    settings = parse_session_settings(DB_SESSION_SETTINGS)
+    if not settings:
+        return {}
+    # Передаются при установке соединения, без лишнего round-trip на SET
+    return {"options": " ".join(f"-c {name}={value}" for name, value in settings.items())}
+
+
+def _on_connect(dbapi_connection, connection_record):
+    pool_stats.connects += 1
+
+
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.invalidations += 1
+
+
+# Async engine создаётся при первом обращении, а не при импорте: модели
+# импортируют Alembic, скрипты и тесты, которым он не нужен, а под gunicorn
+# с preload_app engine и пул появляются уже в воркере, после fork
+_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            echo=DB_ECHO,
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            connect_args=_connect_args()
+        )
+        event.listen(_engine.sync_engine, "connect", _on_connect)
+        event.listen(_engine.sync_engine, "invalidate", _on_invalidate)
+        AsyncSessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def bind_engine(engine):
+    """Подменяет engine приложения (нагрузочный стенд); возвращает прежний для восстановления"""
+    global _engine
+    previous, _engine = _engine, engine
+    AsyncSessionLocal.configure(bind=engine)
+    return previous
+
+
+def __getattr__(name):
+    # Совместимость: from src.database.connection import engine / sync_engine
+    if name == "engine":
+        return get_engine()
+    if name == "sync_engine":
+        return get_sync_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_pool_stats() -> dict:
+    return pool_stats.as_dict(get_engine().sync_engine.pool)
+
+
+_sync_engine = None
+
+def get_sync_engine():
+    """Синхронный engine (psycopg2) — только для Alembic и скриптов, создаётся по требованию"""
+    global _sync_engine
+    if _sync_engine is None:
+        _sync_engine = create_engine(SYNC_DATABASE_URL, echo=DB_ECHO, pool_pre_ping=True)
+    return _sync_engine
+
 
+# bind задаёт get_engine()
 AsyncSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+    class_=AsyncSession, expire_on_commit=False
 )
 
 Base = declarative_base()
 
 async def get_db():
+    get_engine()
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
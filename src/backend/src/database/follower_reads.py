@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+from weakref import WeakKeyDictionary
+import logging
+import os
+import time
+
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.metrics import registry, Counter
+from src.core.query_accounting import current_request_db
+from src.database.connection import get_db
+
+
+# Чтения списка, анкеты и результатов в CockroachDB идут со сдвигом в прошлое
+# (AS OF SYSTEM TIME): не конкурируют с записью голосов за те же строки (нет
+# ожидания intent'ов и retry) и при сдвиге не меньше закрытого timestamp
+# обслуживаются ближайшей репликой диапазона, а не leaseholder'ом.
+# Бюджет устаревания — на класс маршрута, FOLLOWER_READ_<ROUTE>_STALENESS_SECONDS;
+# 0 — всегда свежее чтение.
+FOLLOWER_READS_ENABLED = os.getenv("FOLLOWER_READS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Сдвиг follower_read_timestamp() при настройках кластера по умолчанию
+# (kv.closed_timestamp.target_duration=3s): бюджет от этого значения —
+# чтение с follower'а, меньше — точный сдвиг, но с leaseholder'а
+FOLLOWER_READ_LAG_SECONDS = float(os.getenv("FOLLOWER_READ_LAG_SECONDS", "4.8"))
+# Запас к окну «недавней записи» на задержку инвалидации между репликами
+FOLLOWER_READ_WRITE_MARGIN_SECONDS = float(os.getenv("FOLLOWER_READ_WRITE_MARGIN_SECONDS", "1"))
+RECENT_WRITES_MAX_ENTRIES = int(os.getenv("FOLLOWER_READ_RECENT_WRITES_MAX_ENTRIES", "10000"))
+
+READ_ROUTES = ("surveys_list", "survey_detail", "survey_results")
+READ_STALENESS: Dict[str, float] = {
+    route: float(os.getenv(f"FOLLOWER_READ_{route.upper()}_STALENESS_SECONDS", default))
+    for route, default in zip(READ_ROUTES, ("10", "5", "5"))
+}
+
+READ_SESSIONS = registry.register(Counter(
+    "db_read_sessions_total", "Read-only request sessions by route and read mode", ("route", "mode")
+))
+
+logger = logging.getLogger("follower_reads")
+
+
+class RecentWrites:
+    """
+    Время последней записи по анкете (монотонные часы процесса). Анкета,
+    изменённая в пределах окна, читается свежей: иначе снимок в прошлом не
+    увидит только что принятый голос, а кэш результатов сохранит старые данные.
+    """
+
+    def __init__(self, max_entries: int = RECENT_WRITES_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._writes: "OrderedDict[str, float]" = OrderedDict()
+        # Пропуск инвалидаций (переподключение backend'а): свежие чтения для всех
+        self._all_until = 0.0
+
+    def note(self, survey_id, now: Optional[float] = None) -> None:
+        key = str(survey_id)
+        self._writes[key] = time.monotonic() if now is None else now
+        self._writes.move_to_end(key)
+        if len(self._writes) > self.max_entries:
+            self._writes.popitem(last=False)
+
+    def note_all(self, window: float) -> None:
+        self._all_until = time.monotonic() + window
+
+    def on_invalidation(self, key: Optional[str]) -> None:
+        if key is None:
+            self.note_all(max(READ_STALENESS.values(), default=0.0) + FOLLOWER_READ_WRITE_MARGIN_SECONDS)
+        else:
+            self.note(key)
+
+    def modified_within(self, survey_id, seconds: float, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if now < self._all_until:
+            return True
+        written = self._writes.get(str(survey_id))
+        return written is not None and now - written < seconds
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+
+recent_survey_writes = RecentWrites()
+
+
+def as_of_clause(staleness: float) -> str:
+    if staleness >= FOLLOWER_READ_LAG_SECONDS:
+        return "follower_read_timestamp()"
+    return f"'-{staleness:g}s'"
+
+
+# Проверка версии — один раз на engine, отдельным соединением: SET TRANSACTION
+# AS OF SYSTEM TIME должен быть первым оператором транзакции запроса
+_cockroach_engines: "WeakKeyDictionary" = WeakKeyDictionary()
+
+
+async def is_cockroach(db: AsyncSession) -> bool:
+    bind = db.bind
+    if bind is None:
+        return False
+    engine = bind.sync_engine
+    supported = _cockroach_engines.get(engine)
+    if supported is None:
+        # Разовая проверка не относится к запросу: не попадает в его учёт SQL
+        token = current_request_db.set(None)
+        try:
+            async with bind.connect() as conn:
+                version = (await conn.execute(text("SELECT version()"))).scalar()
+        except Exception as e:
+            logger.warning("follower reads: version check failed: %s", e)
+            return False
+        finally:
+            current_request_db.reset(token)
+        supported = _cockroach_engines[engine] = "CockroachDB" in (version or "")
+    return supported
+
+
+async def begin_read(db: AsyncSession, route: str, survey_id=None) -> str:
+    """
+    Начинает транзакцию чтения для маршрута; возвращает режим:
+    follower / fresh (бюджет 0 или не CockroachDB) / recent_write.
+    Сессия должна быть без открытой транзакции.
+    """
+    staleness = READ_STALENESS.get(route, 0.0) if FOLLOWER_READS_ENABLED else 0.0
+    if staleness <= 0 or db.in_transaction() or not await is_cockroach(db):
+        mode = "fresh"
+    elif survey_id is not None and recent_survey_writes.modified_within(
+        survey_id, max(staleness, FOLLOWER_READ_LAG_SECONDS) + FOLLOWER_READ_WRITE_MARGIN_SECONDS
+    ):
+        mode = "recent_write"
+    else:
+        # Транзакция с AS OF SYSTEM TIME — только для чтения
+        try:
+            await db.execute(text(f"SET TRANSACTION AS OF SYSTEM TIME {as_of_clause(staleness)}"))
+            mode = "follower"
+        except Exception as e:
+            # Например, follower_read_timestamp() без лицензии: больше не пробуем
+            logger.warning("follower reads disabled: %s", e)
+            _cockroach_engines[db.bind.sync_engine] = False
+            await db.rollback()
+            mode = "fresh"
+    READ_SESSIONS.inc(route, mode)
+    return mode
+
+
+def get_read_db(route: str):
+    """
+    Зависимость FastAPI для маршрутов только на чтение, рядом с get_db:
+    та же сессия, но в транзакции в прошлом, если бюджет маршрута позволяет.
+    survey_id берётся из пути, если он там есть.
+    """
+
+    async def dependency(request: Request, db: AsyncSession = Depends(get_db)):
+        survey_id = request.path_params.get("survey_id")
+        await begin_read(db, route, survey_id)
+        yield db
+
+    return dependency
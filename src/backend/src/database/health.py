@@ -0,0 +1,157 @@
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import text
+
+from src.database.connection import DB_MAX_OVERFLOW, DB_POOL_SIZE, get_engine, get_pool_stats
+
+
+# Пробы kubelet/Docker не ходят в БД: фоновая задача раз в
+# HEALTH_PROBE_INTERVAL_SECONDS проверяет round-trip до БД, занятость пула и
+# задержку event loop, а /health/ready отдаёт готовый результат. Pod снимается
+# с трафика после HEALTH_UNREADY_AFTER плохих проверок подряд — раньше, чем
+# запросы начнут падать по таймаутам пула.
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "2"))
+HEALTH_DB_TIMEOUT_SECONDS = float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "1"))
+HEALTH_DB_LATENCY_MAX_MS = float(os.getenv("HEALTH_DB_LATENCY_MAX_MS", "250"))
+HEALTH_LOOP_LAG_MAX_MS = float(os.getenv("HEALTH_LOOP_LAG_MAX_MS", "200"))
+HEALTH_UNREADY_AFTER = int(os.getenv("HEALTH_UNREADY_AFTER", "2"))
+
+logger = logging.getLogger("health")
+
+
+@dataclass(frozen=True)
+class HealthState:
+    ready: bool
+    status: str
+    checked_at: Optional[float] = None
+    db_latency_ms: Optional[float] = None
+    db_error: Optional[str] = None
+    pool_utilization: Optional[float] = None
+    loop_lag_ms: Optional[float] = None
+    problems: Tuple[str, ...] = field(default=())
+
+    def as_dict(self) -> Dict[str, Any]:
+        age = round(time.monotonic() - self.checked_at, 3) if self.checked_at is not None else None
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "checked_seconds_ago": age,
+            "database": {"latency_ms": self.db_latency_ms, "error": self.db_error},
+            "pool_utilization": self.pool_utilization,
+            "event_loop_lag_ms": self.loop_lag_ms,
+            "problems": list(self.problems),
+        }
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        interval_seconds: float = HEALTH_PROBE_INTERVAL_SECONDS,
+        db_timeout_seconds: float = HEALTH_DB_TIMEOUT_SECONDS,
+        db_latency_max_ms: float = HEALTH_DB_LATENCY_MAX_MS,
+        loop_lag_max_ms: float = HEALTH_LOOP_LAG_MAX_MS,
+        unready_after: int = HEALTH_UNREADY_AFTER
+    ):
+        self.interval = interval_seconds
+        self.db_timeout = db_timeout_seconds
+        self.db_latency_max_ms = db_latency_max_ms
+        self.loop_lag_max_ms = loop_lag_max_ms
+        self.unready_after = unready_after
+        self.state = HealthState(ready=False, status="starting")
+        self.failures = 0
+        self.probes = 0
+        self._checkout_timeouts = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def is_stale(self) -> bool:
+        """Проверки перестали выполняться (задача упала или loop завис)"""
+        checked_at = self.state.checked_at
+        return checked_at is None or time.monotonic() - checked_at > max(3 * self.interval, self.db_timeout + self.interval)
+
+    def readiness(self) -> HealthState:
+        if self.state.ready and self.is_stale():
+            return replace(self.state, ready=False, status="stale")
+        return self.state
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Сначала unready — новые запросы уходят на другие pod'ы, пока идёт shutdown"""
+        self.state = HealthState(ready=False, status="stopping", checked_at=time.monotonic())
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _check_db(self) -> Tuple[Optional[float], Optional[str]]:
+        started = time.perf_counter()
+        try:
+            async with get_engine().connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), self.db_timeout)
+        except asyncio.TimeoutError:
+            return None, f"timeout after {self.db_timeout}s"
+        except Exception as e:
+            return None, str(e) or type(e).__name__
+        return round((time.perf_counter() - started) * 1000, 3), None
+
+    async def probe(self, loop_lag_ms: float) -> HealthState:
+        try:
+            db_latency_ms, db_error = await asyncio.wait_for(self._check_db(), self.db_timeout * 2)
+        except asyncio.TimeoutError:
+            # Ожидание соединения из пула тоже упирается в таймаут
+            db_latency_ms, db_error = None, "timeout waiting for a connection"
+        pool = get_pool_stats()
+        utilization = round(pool["checked_out"] / (DB_POOL_SIZE + DB_MAX_OVERFLOW), 3)
+        # Полный пул под нагрузкой — норма (admission держит лимит у размера
+        # пула); насыщение — когда запросы не дождались соединения
+        checkout_timeouts = pool["checkout_timeouts"] - self._checkout_timeouts
+        self._checkout_timeouts = pool["checkout_timeouts"]
+
+        problems = []
+        if db_error is not None:
+            problems.append("database_unreachable")
+        elif db_latency_ms > self.db_latency_max_ms:
+            problems.append("database_slow")
+        if checkout_timeouts > 0:
+            problems.append("pool_saturated")
+        if loop_lag_ms > self.loop_lag_max_ms:
+            problems.append("event_loop_lagging")
+
+        self.probes += 1
+        self.failures = self.failures + 1 if problems else 0
+        ready = self.failures < self.unready_after and (self.state.ready or not problems)
+        return HealthState(
+            ready=ready,
+            status="ready" if ready else "unready",
+            checked_at=time.monotonic(),
+            db_latency_ms=db_latency_ms,
+            db_error=db_error,
+            pool_utilization=utilization,
+            loop_lag_ms=round(loop_lag_ms, 3),
+            problems=tuple(problems)
+        )
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop_lag_ms = 0.0
+        while True:
+            try:
+                self.state = await self.probe(loop_lag_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("health probe failed: %s", e)
+            # Задержка loop — насколько sleep проснулся позже, чем просили
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            loop_lag_ms = max(0.0, (loop.time() - started - self.interval) * 1000)
+
+
+health_monitor = HealthMonitor()
@@ -4,6 +4,15 @@ from .surveys import (
     get_survey_by_id,
     check_user_completed_survey,
     save_survey_answers,
-    get_survey_results
+    get_survey_results,
+    get_survey_results_json,
+    get_survey_responses_count
 )
-
+from .definitions import (
+    get_compiled_survey,
+    invalidate_compiled_survey,
+    touch_survey_definition,
+    encode_survey_detail
+)
+from .ingest import submit_survey_ballot, vote_ingest_queue
+from .live import live_results_hub
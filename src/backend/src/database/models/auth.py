@@ -5,8 +5,9 @@ from src.schemas.auth import UserCreate, UserLogin, UserResponse, Token
 
 
 from src.auth.security import (
-    verify_password, 
-    get_password_hash, 
+    verify_password_async,
+    get_password_hash_async,
+    HashingPoolSaturated,
 )
 
 async def get_user( user_id: int, db: AsyncSession  ):
@@ -25,7 +26,7 @@ async def register_user(user_data: UserCreate, db: AsyncSession):
         if result.scalar_one_or_none():
             return {"error": -7, "message": "Username already taken"}
 
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         db_user = User(
             email=user_data.email,
             username=user_data.username,
@@ -37,6 +38,9 @@ async def register_user(user_data: UserCreate, db: AsyncSession):
         await db.refresh(db_user)
         return {"error": 0, "message": "User registered successfully", "user": db_user.id}
     
+    except HashingPoolSaturated:
+        await db.rollback()
+        return {"error": -9, "message": "Authentication service is busy"}
     except Exception as e:
         await db.rollback()
         return {"error": -1, "message": f"Database error: {str(e)}"}
@@ -46,10 +50,18 @@ async def authenticate_user(user_credentials: UserLogin, db: AsyncSession):
         result = await db.execute(select(User).where(User.email == user_credentials.email))
         user = result.scalar_one_or_none()
         
-        if not user or not verify_password(user_credentials.password, user.hashed_password):
+        if not user or not await verify_password_async(user_credentials.password, user.hashed_password):
             return {"error": -8, "message": "Incorrect email or password"}
         
-        return {"error": 0, "message": "Authentication successful", "user": user.id}
+        return {
+            "error": 0,
+            "message": "Authentication successful",
+            "user": user.id,
+            "username": user.username,
+            "is_admin": bool(user.is_admin)
+        }
     
+    except HashingPoolSaturated:
+        return {"error": -9, "message": "Authentication service is busy"}
     except Exception as e:
         return {"error": -1, "message": f"Database error: {str(e)}"}
\ No newline at end of file
@@ -0,0 +1,121 @@
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional
+from uuid import UUID
+import asyncio
+import logging
+import os
+import random
+
+from src.models.poll import Survey, SurveyResponseCounter
+
+
+# Каждый голос увеличивает случайный из N шардов (survey_id, shard), поэтому
+# писатели популярной анкеты не выстраиваются в очередь за одной строкой
+# surveys. Фоновая задача периодически переносит накопленное в
+# surveys.responses_count; читатели суммируют колонку и шарды.
+RESPONSE_COUNTER_SHARDS = int(os.getenv("RESPONSE_COUNTER_SHARDS", "16"))
+RESPONSE_COUNTER_FOLD_SECONDS = float(os.getenv("RESPONSE_COUNTER_FOLD_SECONDS", "30"))
+# Анкет на одну транзакцию свёртки
+RESPONSE_COUNTER_FOLD_BATCH = int(os.getenv("RESPONSE_COUNTER_FOLD_BATCH", "100"))
+
+logger = logging.getLogger("counters")
+
+
+async def increment_response_counter(db: AsyncSession, survey_id: UUID, amount: int = 1) -> None:
+    """Увеличивает случайный шард; коммит — на вызывающей стороне"""
+    stmt = pg_insert(SurveyResponseCounter).values(
+        survey_id=survey_id,
+        shard=random.randrange(RESPONSE_COUNTER_SHARDS),
+        count=amount
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SurveyResponseCounter.survey_id, SurveyResponseCounter.shard],
+        set_={"count": SurveyResponseCounter.count + stmt.excluded.count}
+    )
+    await db.execute(stmt)
+
+
+def total_responses_expression():
+    """responses_count + сумма шардов, для использования внутри select(...)"""
+    shards_sum = (
+        select(func.coalesce(func.sum(SurveyResponseCounter.count), 0))
+        .where(SurveyResponseCounter.survey_id == Survey.id)
+        .scalar_subquery()
+    )
+    return Survey.responses_count + shards_sum
+
+
+async def fold_response_counters(
+    db: AsyncSession,
+    batch_size: int = RESPONSE_COUNTER_FOLD_BATCH
+) -> Dict[UUID, int]:
+    """
+    Переносит шарды в surveys.responses_count пачками по batch_size анкет,
+    транзакция на пачку.
+
+    Строки surveys пачки блокируются FOR NO KEY UPDATE SKIP LOCKED: анкеты,
+    которые сейчас сворачивает другой воркер или реплика, пропускаются, а не
+    ждут. NO KEY — не конфликтует с FOR KEY SHARE, которую берут вставки
+    голосов (answers, survey_completions) по внешним ключам.
+    DELETE ... RETURNING забирает ровно те значения, которые были удалены,
+    поэтому голоса, пришедшие во время свёртки, останутся в новых шардах.
+    """
+    folded: Dict[UUID, int] = {}
+    last: Optional[UUID] = None
+    while True:
+        candidates = select(SurveyResponseCounter.survey_id).distinct()
+        if last is not None:
+            candidates = candidates.where(SurveyResponseCounter.survey_id > last)
+        survey_ids = (
+            await db.execute(candidates.order_by(SurveyResponseCounter.survey_id).limit(batch_size))
+        ).scalars().all()
+        if not survey_ids:
+            await db.commit()
+            return folded
+        last = survey_ids[-1]
+
+        locked = (
+            await db.execute(
+                select(Survey.id)
+                .where(Survey.id.in_(survey_ids))
+                .with_for_update(skip_locked=True, key_share=True)
+            )
+        ).scalars().all()
+        if locked:
+            result = await db.execute(
+                delete(SurveyResponseCounter)
+                .where(SurveyResponseCounter.survey_id.in_(locked))
+                .returning(SurveyResponseCounter.survey_id, SurveyResponseCounter.count)
+            )
+            batch: Dict[UUID, int] = {}
+            for survey_id, count in result.all():
+                batch[survey_id] = batch.get(survey_id, 0) + count
+
+            for survey_id, count in batch.items():
+                # updated_at не трогаем: это не изменение определения анкеты
+                await db.execute(
+                    update(Survey)
+                    .where(Survey.id == survey_id)
+                    .values(
+                        responses_count=Survey.responses_count + count,
+                        updated_at=Survey.updated_at
+                    )
+                )
+            folded.update(batch)
+        await db.commit()
+
+
+async def run_counter_fold_loop(session_factory) -> None:
+    """Фоновая свёртка шардов; запускается в lifespan приложения"""
+    while True:
+        # Разброс: воркеры, стартовавшие вместе, не сворачивают одновременно
+        await asyncio.sleep(RESPONSE_COUNTER_FOLD_SECONDS * random.uniform(0.8, 1.2))
+        try:
+            async with session_factory() as db:
+                await fold_response_counters(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("response counter fold failed: %s", e)
@@ -0,0 +1,330 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType, SimpleNamespace
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+from uuid import UUID
+import os
+import time
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from src.core.cache import BinaryCodec, SharedCache
+from src.core.serialization import dumps, splice_object
+from src.database.follower_reads import recent_survey_writes
+from src.models.poll import Survey, Question
+
+
+# Скомпилированное определение анкеты живёт в кэше реплики. Раз в
+# SURVEY_DEFINITION_RECHECK_SECONDS (и на каждой записи голоса) сверяем
+# surveys.updated_at и status одним узким запросом по PK и перечитываем анкету
+# только если она действительно изменилась. Правки вопросов и вариантов
+# updated_at не меняют — после них вызывается touch_survey_definition.
+SURVEY_DEFINITION_RECHECK_SECONDS = float(os.getenv("SURVEY_DEFINITION_RECHECK_SECONDS", "30"))
+SURVEY_DEFINITION_CACHE_TTL_SECONDS = float(os.getenv("SURVEY_DEFINITION_CACHE_TTL_SECONDS", "3600"))
+SURVEY_DEFINITION_CACHE_MAX_ENTRIES = int(os.getenv("SURVEY_DEFINITION_CACHE_MAX_ENTRIES", "512"))
+
+
+@dataclass(frozen=True)
+class CompiledOption:
+    id: UUID
+    option_text: str
+    option_order: int
+
+
+@dataclass(frozen=True)
+class CompiledQuestion:
+    id: UUID
+    question_text: str
+    question_order: int
+    allow_multiple_answers: bool
+    options: Tuple[CompiledOption, ...]
+    option_ids: FrozenSet[UUID]
+
+
+@dataclass(frozen=True)
+class CompiledSurvey:
+    """Неизменяемый снимок анкеты: вопросы и варианты уже отсортированы"""
+    id: UUID
+    title: str
+    description: Optional[str]
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime]
+    end_date: datetime
+    is_anonymous: bool
+    responses_count: int
+    questions: Tuple[CompiledQuestion, ...]
+    questions_by_id: Mapping[UUID, CompiledQuestion] = field(compare=False, repr=False)
+    # Вопросы в формате SurveyFullResponse, закодированные один раз на снимок
+    questions_json: bytes = field(default=b"[]", compare=False, repr=False)
+
+
+@dataclass
+class _CacheEntry:
+    survey: CompiledSurvey
+    checked_at: float
+
+
+def _plain_uuid(value: UUID) -> UUID:
+    # Драйверы отдают свои подклассы (asyncpg.pgproto.UUID): снимок не
+    # зависит от драйвера сессии, кодируется и кэшируется одинаково
+    return value if type(value) is UUID else UUID(str(value))
+
+
+def compile_survey(survey: Survey) -> CompiledSurvey:
+    questions = tuple(
+        CompiledQuestion(
+            id=_plain_uuid(question.id),
+            question_text=question.question_text,
+            question_order=question.question_order,
+            allow_multiple_answers=question.allow_multiple_answers,
+            options=tuple(
+                CompiledOption(
+                    id=_plain_uuid(option.id),
+                    option_text=option.option_text,
+                    option_order=option.option_order
+                )
+                for option in sorted(question.options, key=lambda o: o.option_order)
+            ),
+            option_ids=frozenset(_plain_uuid(option.id) for option in question.options)
+        )
+        for question in sorted(survey.questions, key=lambda q: q.question_order)
+    )
+
+    return CompiledSurvey(
+        id=_plain_uuid(survey.id),
+        title=survey.title,
+        description=survey.description,
+        status=survey.status,
+        created_at=survey.created_at,
+        updated_at=survey.updated_at,
+        end_date=survey.end_date,
+        is_anonymous=survey.is_anonymous,
+        responses_count=survey.responses_count,
+        questions=questions,
+        questions_by_id=MappingProxyType({q.id: q for q in questions}),
+        questions_json=encode_questions(questions)
+    )
+
+
+def encode_questions(questions: Tuple[CompiledQuestion, ...]) -> bytes:
+    # Порядок полей — как у QuestionResponse / QuestionOptionResponse
+    return dumps([
+        {
+            "question_text": question.question_text,
+            "question_order": question.question_order,
+            "allow_multiple_answers": question.allow_multiple_answers,
+            "id": question.id,
+            "options": [
+                {
+                    "option_text": option.option_text,
+                    "option_order": option.option_order,
+                    "id": option.id
+                }
+                for option in question.options
+            ]
+        }
+        for question in questions
+    ])
+
+
+def encode_survey_detail(survey: CompiledSurvey, responses_count: int) -> bytes:
+    """
+    JSON ответа GET /surveys/{id} (SurveyFullResponse) без pydantic.
+
+    Кодируется только шапка анкеты со свежим счётчиком; вопросы берутся
+    готовыми байтами из снимка.
+    """
+    head = dumps({
+        "title": survey.title,
+        "description": survey.description,
+        "id": survey.id,
+        "status": survey.status,
+        "created_at": survey.created_at,
+        "end_date": survey.end_date,
+        "responses_count": responses_count,
+        "is_anonymous": survey.is_anonymous
+    })
+    return splice_object(head, "questions", survey.questions_json)
+
+
+async def _load_compiled_survey(db: AsyncSession, survey_id: UUID) -> Optional[CompiledSurvey]:
+    result = await db.execute(
+        select(Survey)
+        .where(Survey.id == survey_id)
+        .options(selectinload(Survey.questions).selectinload(Question.options))
+        # Перезагрузка после изменения: объекты, уже загруженные сессией, тоже обновляются
+        .execution_options(populate_existing=True)
+    )
+    survey = result.scalar_one_or_none()
+    if survey is None:
+        return None
+    return compile_survey(survey)
+
+
+def _entry_to_primitive(entry: _CacheEntry) -> Dict[str, Any]:
+    survey = entry.survey
+    return {
+        "id": survey.id,
+        "title": survey.title,
+        "description": survey.description,
+        "status": survey.status,
+        "created_at": survey.created_at,
+        "updated_at": survey.updated_at,
+        "end_date": survey.end_date,
+        "is_anonymous": survey.is_anonymous,
+        "responses_count": survey.responses_count,
+        "questions": [
+            {
+                "id": question.id,
+                "question_text": question.question_text,
+                "question_order": question.question_order,
+                "allow_multiple_answers": question.allow_multiple_answers,
+                "options": [
+                    {"id": option.id, "option_text": option.option_text, "option_order": option.option_order}
+                    for option in question.options
+                ]
+            }
+            for question in survey.questions
+        ]
+    }
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _entry_from_primitive(data: Dict[str, Any]) -> _CacheEntry:
+    # compile_survey читает только атрибуты — собираем ему ORM-подобное дерево
+    survey = SimpleNamespace(**{
+        **data,
+        "id": UUID(data["id"]),
+        "created_at": _parse_datetime(data["created_at"]),
+        "updated_at": _parse_datetime(data["updated_at"]),
+        "end_date": _parse_datetime(data["end_date"]),
+        "questions": [
+            SimpleNamespace(**{
+                **question,
+                "id": UUID(question["id"]),
+                "options": [
+                    SimpleNamespace(**{**option, "id": UUID(option["id"])})
+                    for option in question["options"]
+                ]
+            })
+            for question in data["questions"]
+        ]
+    })
+    # Перепроверка updated_at для копии из общего кэша отсчитывается от момента чтения
+    return _CacheEntry(survey=compile_survey(survey), checked_at=time.monotonic())
+
+
+survey_definitions_cache = SharedCache(
+    name="survey_definitions",
+    max_entries=SURVEY_DEFINITION_CACHE_MAX_ENTRIES,
+    ttl_seconds=SURVEY_DEFINITION_CACHE_TTL_SECONDS,
+    codec=BinaryCodec(_entry_to_primitive, _entry_from_primitive),
+    # Копия из L2 считается сверенной в момент чтения: дольше интервала перепроверки не храним
+    remote_ttl_seconds=SURVEY_DEFINITION_RECHECK_SECONDS
+)
+survey_definitions_cache.add_invalidation_listener(recent_survey_writes.on_invalidation)
+
+
+async def get_compiled_survey(
+    db: AsyncSession,
+    survey_id: UUID,
+    fresh: bool = False
+) -> Optional[CompiledSurvey]:
+    """
+    Возвращает скомпилированную анкету из кэша (процесса, затем общего).
+
+    В установившемся режиме запросов к БД нет; после интервала перепроверки
+    выполняется один SELECT updated_at, status, полная перезагрузка — только
+    при изменении. fresh=True — путь записи: сверка сразу, без интервала,
+    чтобы закрытая анкета не принимала голоса до следующей перепроверки.
+    """
+
+    async def load() -> Optional[_CacheEntry]:
+        survey = await _load_compiled_survey(db, survey_id)
+        if survey is None:
+            return None
+        return _CacheEntry(survey=survey, checked_at=time.monotonic())
+
+    entry = await survey_definitions_cache.get_or_load(survey_id, load)
+    if entry is None:
+        return None
+
+    now = time.monotonic()
+    if not fresh and now - entry.checked_at < SURVEY_DEFINITION_RECHECK_SECONDS:
+        return entry.survey
+
+    result = await db.execute(select(Survey.updated_at, Survey.status).where(Survey.id == survey_id))
+    row = result.first()
+    if row is None:
+        await survey_definitions_cache.delete(survey_id)
+        return None
+    # status сверяется отдельно: UPDATE в обход ORM не трогает updated_at
+    if row.updated_at == entry.survey.updated_at and row.status == entry.survey.status:
+        entry.checked_at = now
+        return entry.survey
+
+    # Определение изменилось: сбрасываем копии во всех репликах и перечитываем
+    await survey_definitions_cache.delete(survey_id)
+    entry = await survey_definitions_cache.load(survey_id, load)
+    return entry.survey if entry else None
+
+
+async def invalidate_compiled_survey(survey_id: UUID) -> None:
+    """После изменения анкеты: сброс копий во всех репликах, чтения — свежие"""
+    recent_survey_writes.note(survey_id)
+    await survey_definitions_cache.delete(survey_id)
+
+
+async def touch_survey_definition(db: AsyncSession, survey_id: UUID) -> bool:
+    """
+    После правки вопросов или вариантов (SQL, миграция данных): поднимает
+    surveys.updated_at — перепроверка на любой реплике увидит изменение и без
+    общего кэша — и сбрасывает копии. False, если анкеты нет.
+    """
+    result = await db.execute(
+        update(Survey).where(Survey.id == survey_id).values(updated_at=func.now()).returning(Survey.id)
+    )
+    found = result.first() is not None
+    await db.commit()
+    if found:
+        await invalidate_compiled_survey(survey_id)
+    return found
+
+
+def validate_ballot(
+    survey: CompiledSurvey,
+    answers: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Проверяет бюллетень по снимку анкеты; возвращает ошибку или None"""
+    for answer in answers:
+        question_id = answer["question_id"]
+        option_ids = answer["option_ids"]
+
+        question = survey.questions_by_id.get(question_id)
+
+        if not question:
+            return {
+                "error": -4,
+                "message": f"Question {question_id} not found in survey"
+            }
+
+        if len(option_ids) > 1 and not question.allow_multiple_answers:
+            return {
+                "error": -5,
+                "message": f"Question {question_id} does not allow multiple answers"
+            }
+
+        for option_id in option_ids:
+            if option_id not in question.option_ids:
+                return {
+                    "error": -6,
+                    "message": f"Option {option_id} does not belong to question {question_id}"
+                }
+
+    return None
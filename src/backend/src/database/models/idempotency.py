@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+from datetime import datetime
+from hashlib import blake2b
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from uuid import UUID
+import os
+
+from src.core.cache import BinaryCodec, SharedCache
+
+
+# Idempotency-Key для отправки бюллетеня: повтор с тем же ключом (ретрай
+# ingress, клиент переотправил после таймаута) получает исходный ответ.
+# Источник истины — хэш ключа и отпечаток бюллетеня в строке
+# survey_completions (пишутся в транзакции голоса): повтор на любой реплике
+# или воркере упирается в конфликт отметки и получает сохранённый исход.
+# Кэш ниже — быстрый путь: повтор, попавший в тот же процесс (или в общий
+# кэш), отвечает без проверки бюллетеня и без обращения к БД.
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "50000"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_KEY_REUSED_MESSAGE = "Idempotency-Key was already used with a different request"
+
+# Не сохраняем: временные отказы (очередь полна, ошибка БД) — повтор должен
+# выполниться заново; -3 — это может быть наш же запрос, который ещё не
+# сохранил результат на другой реплике, а повтор уже дошёл до БД; -12 из
+# отметки о прохождении — отпечаток в кэше был бы нашим, а не исходным.
+_NOT_STORED = frozenset({-3, -10, -12, -99})
+
+
+@dataclass(frozen=True)
+class StoredOutcome:
+    fingerprint: str
+    error: int
+    message: str
+    completed_at: datetime
+
+
+def _outcome_to_primitive(outcome: StoredOutcome) -> List[Any]:
+    return [outcome.fingerprint, outcome.error, outcome.message, outcome.completed_at]
+
+
+def _outcome_from_primitive(data: List[Any]) -> StoredOutcome:
+    fingerprint, error, message, completed_at = data
+    return StoredOutcome(fingerprint, error, message, datetime.fromisoformat(completed_at))
+
+
+idempotency_cache = SharedCache(
+    name="idempotency",
+    max_entries=IDEMPOTENCY_MAX_ENTRIES,
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    codec=BinaryCodec(_outcome_to_primitive, _outcome_from_primitive)
+)
+
+
+def idempotency_key_hash(key: str) -> str:
+    # Ключ клиента — произвольная строка до 255 символов: храним хэш (32 hex)
+    return blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def idempotency_cache_key(user_id: int, key: str) -> str:
+    return f"{user_id}:{idempotency_key_hash(key)}"
+
+
+def ballot_fingerprint(survey_id: UUID, answers: List[Dict[str, Any]]) -> str:
+    """Отпечаток бюллетеня без учёта порядка вопросов и вариантов"""
+    parts = sorted(
+        f"{answer['question_id']}:{','.join(sorted(str(o) for o in answer['option_ids']))}"
+        for answer in answers
+    )
+    return blake2b(f"{survey_id}|{'|'.join(parts)}".encode(), digest_size=12).hexdigest()
+
+
+async def submit_idempotent(
+    user_id: int,
+    key: str,
+    survey_id: UUID,
+    answers: List[Dict[str, Any]],
+    submit: Callable[[Tuple[str, str]], Awaitable[Dict[str, Any]]]
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Выполняет submit((хэш ключа, отпечаток)) не более одного раза на ключ;
+    возвращает (результат, повтор ли). submit сохраняет пару в отметке о
+    прохождении и при конфликте отметки сам отдаёт сохранённый исход
+    ("replayed"). Тот же ключ с другим бюллетенем — ошибка -12. Одновременные
+    запросы с одним ключом в процессе ждут одно выполнение.
+    """
+    cache_key = idempotency_cache_key(user_id, key)
+    fingerprint = ballot_fingerprint(survey_id, answers)
+    executed = False
+    replayed_by_db = False
+
+    async def run() -> StoredOutcome:
+        nonlocal executed, replayed_by_db
+        executed = True
+        result = await submit((idempotency_key_hash(key), fingerprint))
+        replayed_by_db = bool(result.get("replayed"))
+        return StoredOutcome(
+            fingerprint, result["error"], result["message"], result.get("completed_at") or datetime.now()
+        )
+
+    outcome = await idempotency_cache.get(cache_key)
+    if outcome is None:
+        outcome = await idempotency_cache.load(
+            cache_key, run, cacheable=lambda value: value.error not in _NOT_STORED
+        )
+
+    if outcome.fingerprint != fingerprint:
+        return {"error": -12, "message": IDEMPOTENCY_KEY_REUSED_MESSAGE}, False
+    replayed = not executed or replayed_by_db
+    return {"error": outcome.error, "message": outcome.message, "completed_at": outcome.completed_at}, replayed
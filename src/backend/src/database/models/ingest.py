@@ -0,0 +1,283 @@
+from dataclasses import dataclass
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+import asyncio
+import logging
+import os
+import time
+
+from src.database.models.counters import increment_response_counter
+from src.database.models.surveys import (
+    check_ballot,
+    claim_survey_completions,
+    completion_conflicts,
+    build_answer_rows,
+    invalidate_survey_results,
+    save_survey_answers
+)
+from src.models.poll import Answer
+
+
+# Режим пакетной записи голосов для пиковых нагрузок ("голосуем сейчас" на
+# 10k человек). Запрос проверяет бюллетень, кладёт его в очередь процесса и
+# ждёт коммита своей пачки: клиент получает ответ только после того, как
+# голос записан в БД, но одна транзакция обслуживает до VOTE_BATCH_MAX_SIZE
+# бюллетеней.
+VOTE_INGEST_MODE = os.getenv("VOTE_INGEST_MODE", "direct")  # direct | batched
+VOTE_BATCH_MAX_SIZE = int(os.getenv("VOTE_BATCH_MAX_SIZE", "200"))
+VOTE_BATCH_MAX_DELAY_MS = float(os.getenv("VOTE_BATCH_MAX_DELAY_MS", "20"))
+VOTE_QUEUE_MAX_BACKLOG = int(os.getenv("VOTE_QUEUE_MAX_BACKLOG", "10000"))
+
+logger = logging.getLogger("ingest")
+
+
+@dataclass
+class _QueuedBallot:
+    survey_id: UUID
+    user_id: int
+    rows: List[Dict[str, Any]]
+    future: asyncio.Future
+    idempotency: Optional[Tuple[str, str]] = None
+
+
+class BallotIngestQueue:
+    def __init__(self, max_batch: int, max_delay_ms: float, max_backlog: int):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.max_backlog = max_backlog
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._session_factory = None
+        # (survey_id, user_id) бюллетеней в очереди и в незакоммиченной пачке
+        self._pending: Set[Tuple[UUID, int]] = set()
+
+        self.batches = 0
+        self.ballots = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.last_batch_size = 0
+        self.max_batch_seen = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу, дописав всё, что уже в очереди"""
+        if self._task is None:
+            return
+        # None — сигнал остановки: задача допишет накопленное и выйдет
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def submit(
+        self,
+        db: AsyncSession,
+        survey_id: UUID,
+        user_id: int,
+        answers: List[Dict[str, Any]],
+        idempotency: Optional[Tuple[str, str]] = None
+    ) -> Dict[str, Any]:
+        key = (survey_id, user_id)
+        # Дубликат внутри очереди/текущей пачки ловим до похода в БД
+        if key in self._pending:
+            self.duplicates += 1
+            return {"error": -3, "message": "You have already completed this survey"}
+
+        error = await check_ballot(db, survey_id, user_id, answers)
+        # Транзакция запроса больше не нужна: пока бюллетень ждёт пачку, его
+        # соединение должно быть в пуле — иначе при pool_size ожидающих
+        # голосов _flush не получит соединение для коммита
+        await db.rollback()
+        if error:
+            return error
+
+        if key in self._pending:
+            self.duplicates += 1
+            return {"error": -3, "message": "You have already completed this survey"}
+
+        if self.backlog >= self.max_backlog:
+            self.rejected += 1
+            return {"error": -10, "message": "Vote queue is full, retry later"}
+
+        ballot = _QueuedBallot(
+            survey_id=survey_id,
+            user_id=user_id,
+            rows=build_answer_rows(user_id, answers),
+            future=asyncio.get_running_loop().create_future(),
+            idempotency=idempotency
+        )
+        self._pending.add(key)
+        self._queue.put_nowait(ballot)
+        # shield: отмена запроса клиентом не должна терять уже принятый голос
+        return await asyncio.shield(ballot.future)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    ballot = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if ballot is None:
+                    stopping = True
+                    break
+                batch.append(ballot)
+            await self._flush_safely(batch)
+
+        # Остановка: всё, что успели положить после сигнала, тоже записываем
+        while not self._queue.empty():
+            batch = []
+            while len(batch) < self.max_batch and not self._queue.empty():
+                ballot = self._queue.get_nowait()
+                if ballot is not None:
+                    batch.append(ballot)
+            await self._flush_safely(batch)
+
+    async def _flush_safely(self, batch: List[_QueuedBallot]) -> None:
+        # Сбой одной пачки не останавливает очередь: иначе следующие голоса ждут вечно
+        try:
+            await self._flush(batch)
+        except Exception as e:
+            logger.error("vote batch flush failed: %s", e)
+
+    async def _flush(self, batch: List[_QueuedBallot]) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        results = [{"error": -99, "message": "Vote batch was not committed"}] * len(batch)
+        try:
+            async with self._session_factory() as db:
+                try:
+                    results = await self._commit_batch(db, batch)
+                except Exception:
+                    await db.rollback()
+                    results = await self._commit_one_by_one(db, batch)
+        except Exception as e:
+            results = [{"error": -99, "message": f"Database error: {str(e)}"}] * len(batch)
+        finally:
+            for ballot in batch:
+                self._pending.discard((ballot.survey_id, ballot.user_id))
+
+        try:
+            # Сначала инвалидация: ответивший клиент не должен прочитать старые результаты
+            for survey_id in {b.survey_id for b, r in zip(batch, results) if r["error"] == 0}:
+                try:
+                    await invalidate_survey_results(survey_id)
+                except Exception as e:
+                    # Голоса уже в БД: результаты догонят по TTL кэша
+                    logger.warning("results invalidation failed for %s: %s", survey_id, e)
+        finally:
+            # Ожидающие запросы получают ответ при любом исходе пачки
+            for ballot, result in zip(batch, results):
+                if not ballot.future.done():
+                    ballot.future.set_result(result)
+
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.ballots += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        self.flush_seconds += elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    async def _commit_batch(self, db: AsyncSession, batch: List[_QueuedBallot]) -> List[Dict[str, Any]]:
+        # Отметки о прохождении — одной вставкой на пачку; конфликт по ключу
+        # означает, что голос уже пришёл (в том числе через другую реплику)
+        pairs = [(b.survey_id, b.user_id) for b in batch]
+        keys = {pair: b.idempotency for pair, b in zip(pairs, batch) if b.idempotency}
+        claimed = await claim_survey_completions(db, pairs, keys)
+        conflicts = await completion_conflicts(db, [pair for pair in pairs if pair not in claimed], keys)
+        results, rows, per_survey = [], [], {}
+        for pair, ballot in zip(pairs, batch):
+            if pair not in claimed:
+                self.duplicates += 1
+                results.append(conflicts[pair])
+                continue
+            rows.extend(ballot.rows)
+            per_survey[ballot.survey_id] = per_survey.get(ballot.survey_id, 0) + 1
+            results.append({"error": 0, "message": "Survey completed successfully"})
+
+        if rows:
+            await db.execute(insert(Answer).values(rows))
+        for survey_id, amount in per_survey.items():
+            await increment_response_counter(db, survey_id, amount)
+        await db.commit()
+        return results
+
+    async def _commit_one_by_one(self, db: AsyncSession, batch: List[_QueuedBallot]) -> List[Dict[str, Any]]:
+        """Пачка упала целиком — пишем по одному, чтобы ошибка одного бюллетеня не задела остальных"""
+        results = []
+        for ballot in batch:
+            try:
+                results.append((await self._commit_batch(db, [ballot]))[0])
+            except Exception as e:
+                await db.rollback()
+                results.append({"error": -99, "message": f"Database error: {str(e)}"})
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": VOTE_INGEST_MODE,
+            "running": self.running,
+            "backlog": self.backlog,
+            "max_backlog": self.max_backlog,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+            "batches": self.batches,
+            "ballots": self.ballots,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_seen,
+            "avg_batch_size": round(self.ballots / self.batches, 2) if self.batches else 0.0,
+            "avg_flush_ms": round(self.flush_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+        }
+
+
+vote_ingest_queue = BallotIngestQueue(
+    max_batch=VOTE_BATCH_MAX_SIZE,
+    max_delay_ms=VOTE_BATCH_MAX_DELAY_MS,
+    max_backlog=VOTE_QUEUE_MAX_BACKLOG
+)
+
+
+async def submit_survey_ballot(
+    db: AsyncSession,
+    survey_id: UUID,
+    user_id: int,
+    answers: List[Dict[str, Any]],
+    idempotency: Optional[Tuple[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Точка входа для API: пакетная запись, если очередь запущена, иначе прямая.
+    idempotency — (хэш Idempotency-Key, отпечаток бюллетеня) для отметки о прохождении.
+    """
+    if vote_ingest_queue.running:
+        return await vote_ingest_queue.submit(db, survey_id, user_id, answers, idempotency)
+    return await save_survey_answers(db, survey_id, user_id, answers, idempotency)
@@ -0,0 +1,294 @@
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Mapping, Optional
+from uuid import UUID
+import asyncio
+import contextvars
+import logging
+import os
+
+from src.core.serialization import dumps
+from src.database.models.definitions import CompiledSurvey, get_compiled_survey
+from src.database.models.surveys import (
+    assemble_survey_results,
+    get_survey_vote_counts,
+    get_survey_responses_count,
+    results_listeners
+)
+
+
+# Live-результаты (SSE). На реплику — один канал на анкету: фоновая задача
+# канала пересчитывает агрегаты (сразу после локального коммита голоса, но не
+# чаще LIVE_RESULTS_MIN_INTERVAL_MS, и раз в LIVE_RESULTS_POLL_SECONDS ради
+# голосов с других реплик) и будит всех подписчиков одним Event.
+# Подписчик хранит только ссылку на последнее отправленное состояние: медленный
+# клиент получает одно свёрнутое изменение от него до текущего, без очереди.
+LIVE_RESULTS_POLL_SECONDS = float(os.getenv("LIVE_RESULTS_POLL_SECONDS", "2"))
+LIVE_RESULTS_MIN_INTERVAL_MS = float(os.getenv("LIVE_RESULTS_MIN_INTERVAL_MS", "250"))
+LIVE_RESULTS_HEARTBEAT_SECONDS = float(os.getenv("LIVE_RESULTS_HEARTBEAT_SECONDS", "15"))
+LIVE_RESULTS_MAX_SUBSCRIBERS = int(os.getenv("LIVE_RESULTS_MAX_SUBSCRIBERS", "5000"))
+
+logger = logging.getLogger("live_results")
+
+
+@dataclass(frozen=True)
+class ResultsState:
+    version: int
+    survey: CompiledSurvey
+    votes: Mapping[UUID, int]
+    respondents: Mapping[UUID, int]
+    total_responses: int
+
+
+def encode_event(event: str, event_id: int, payload: Any) -> bytes:
+    # orjson не вставляет переводы строк, поэтому data умещается в одну строку
+    return b"event: " + event.encode() + b"\nid: " + str(event_id).encode() + b"\ndata: " + dumps(payload) + b"\n\n"
+
+
+def snapshot_event(state: ResultsState) -> bytes:
+    return encode_event("snapshot", state.version, assemble_survey_results(
+        state.survey, state.votes, state.respondents, state.total_responses
+    ))
+
+
+def results_delta(old: ResultsState, new: ResultsState) -> Dict[str, Any]:
+    """Изменения между двумя состояниями: только затронутые варианты и вопросы"""
+    options = []
+    questions = []
+    for question in new.survey.questions:
+        changed = False
+        total_answers = 0
+        for option in question.options:
+            count = new.votes.get(option.id, 0)
+            before = old.votes.get(option.id, 0)
+            total_answers += count
+            if count != before:
+                changed = True
+                options.append({
+                    "option_id": option.id,
+                    "question_id": question.id,
+                    "votes_count": count,
+                    "delta": count - before
+                })
+        respondents = new.respondents.get(question.id, 0)
+        if changed or respondents != old.respondents.get(question.id, 0):
+            questions.append({
+                "question_id": question.id,
+                "total_answers": total_answers,
+                "respondents_count": respondents
+            })
+    return {
+        "survey_id": new.survey.id,
+        "total_responses": new.total_responses,
+        "questions": questions,
+        "options": options
+    }
+
+
+def change_event(old: ResultsState, new: ResultsState) -> bytes:
+    # Изменилось определение анкеты — дельта по старым вариантам бессмысленна
+    if old.survey.updated_at != new.survey.updated_at:
+        return snapshot_event(new)
+    return encode_event("delta", new.version, results_delta(old, new))
+
+
+class _SurveyChannel:
+    def __init__(self, survey_id: UUID):
+        self.survey_id = survey_id
+        self.state: Optional[ResultsState] = None
+        self.previous: Optional[ResultsState] = None
+        # Событие previous -> state, кодируется один раз на всех подписчиков
+        self.last_event: Optional[bytes] = None
+        self.closed = False
+        self.subscribers = 0
+        self.ready = asyncio.Event()
+        self.wake = asyncio.Event()
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, state: Optional[ResultsState]) -> None:
+        if state is None:
+            self.closed = True
+        else:
+            self.last_event = change_event(self.state, state) if self.state is not None else None
+            self.previous, self.state = self.state, state
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def event_since(self, sent: ResultsState) -> bytes:
+        if sent is self.previous and self.last_event is not None:
+            return self.last_event
+        return change_event(sent, self.state)
+
+
+class LiveResultsHub:
+    def __init__(
+        self,
+        poll_seconds: float,
+        min_interval_ms: float,
+        heartbeat_seconds: float,
+        max_subscribers: int
+    ):
+        self.poll_seconds = poll_seconds
+        self.min_interval = min_interval_ms / 1000
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self._session_factory = None
+        self._channels: Dict[UUID, _SurveyChannel] = {}
+
+        self.subscribers = 0
+        self.rejected = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.publishes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._session_factory is not None
+
+    def admit(self) -> bool:
+        """Мягкий лимит подписчиков на процесс; False — отказать клиенту (503)"""
+        if self.subscribers >= self.max_subscribers:
+            self.rejected += 1
+            return False
+        return True
+
+    def start(self, session_factory) -> None:
+        self._session_factory = session_factory
+        results_listeners.append(self.notify)
+
+    async def stop(self) -> None:
+        """Закрывает все потоки (иначе graceful shutdown ждёт клиентов) и каналы"""
+        if self.notify in results_listeners:
+            results_listeners.remove(self.notify)
+        self._session_factory = None
+        channels = list(self._channels.values())
+        self._channels.clear()
+        for channel in channels:
+            channel.publish(None)
+            channel.ready.set()
+            if channel.task is not None:
+                channel.task.cancel()
+        await asyncio.gather(*(c.task for c in channels if c.task is not None), return_exceptions=True)
+
+    def notify(self, survey_id: UUID) -> None:
+        """Голос закоммичен в этом процессе — пересчитать результаты канала"""
+        channel = self._channels.get(survey_id)
+        if channel is not None:
+            channel.wake.set()
+
+    async def stream(self, survey_id: UUID) -> AsyncIterator[bytes]:
+        """SSE-поток: snapshot, затем delta-события и heartbeat-комментарии"""
+        channel = self._subscribe(survey_id)
+        try:
+            yield f"retry: {int(self.poll_seconds * 1000)}\n\n".encode()
+            await channel.ready.wait()
+            sent = channel.state
+            if channel.closed or sent is None:
+                return
+            yield snapshot_event(sent)
+
+            while True:
+                changed = channel.changed
+                if channel.state is sent and not channel.closed:
+                    try:
+                        await asyncio.wait_for(changed.wait(), self.heartbeat_seconds)
+                    except asyncio.TimeoutError:
+                        yield b": ping\n\n"
+                        continue
+                if channel.closed:
+                    return
+                # Отправляем всё, что накопилось с прошлого события, одним сообщением
+                state = channel.state
+                yield channel.event_since(sent)
+                sent = state
+        finally:
+            self._unsubscribe(channel)
+
+    def _subscribe(self, survey_id: UUID) -> _SurveyChannel:
+        channel = self._channels.get(survey_id)
+        if channel is None or channel.closed:
+            channel = self._channels[survey_id] = _SurveyChannel(survey_id)
+            # Свой контекст: SQL канала не учитывается в запросе первого подписчика
+            channel.task = asyncio.create_task(self._run_channel(channel), context=contextvars.Context())
+        channel.subscribers += 1
+        self.subscribers += 1
+        return channel
+
+    def _unsubscribe(self, channel: _SurveyChannel) -> None:
+        channel.subscribers -= 1
+        self.subscribers -= 1
+        if channel.subscribers == 0:
+            if self._channels.get(channel.survey_id) is channel:
+                del self._channels[channel.survey_id]
+            if channel.task is not None:
+                channel.task.cancel()
+
+    async def _load_state(self, channel: _SurveyChannel) -> Optional[ResultsState]:
+        async with self._session_factory() as db:
+            survey = await get_compiled_survey(db, channel.survey_id)
+            if survey is None:
+                return None
+            votes, respondents = await get_survey_vote_counts(db, channel.survey_id)
+            total_responses = await get_survey_responses_count(db, channel.survey_id)
+
+        current = channel.state
+        if (
+            current is not None
+            and current.survey is survey
+            and current.votes == votes
+            and current.respondents == respondents
+            and current.total_responses == total_responses
+        ):
+            return current
+        version = current.version + 1 if current is not None else 1
+        return ResultsState(version, survey, votes, respondents, total_responses)
+
+    async def _run_channel(self, channel: _SurveyChannel) -> None:
+        loop = asyncio.get_running_loop()
+        while not channel.closed:
+            channel.wake.clear()
+            started = loop.time()
+            try:
+                state = await self._load_state(channel)
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning("live results refresh failed for %s: %s", channel.survey_id, e)
+                if channel.state is None:
+                    # Первое состояние не получено — закрываем потоки, клиенты переподключатся
+                    channel.publish(None)
+                    channel.ready.set()
+                    return
+            else:
+                self.refreshes += 1
+                # None — анкету удалили: канал закрывается
+                if state is None or state is not channel.state:
+                    self.publishes += 1
+                    channel.publish(state)
+                channel.ready.set()
+
+            # Всплеск голосов сворачивается в одно обновление за интервал
+            await asyncio.sleep(max(0.0, self.min_interval - (loop.time() - started)))
+            try:
+                await asyncio.wait_for(channel.wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "channels": len(self._channels),
+            "subscribers": self.subscribers,
+            "max_subscribers": self.max_subscribers,
+            "rejected": self.rejected,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "publishes": self.publishes,
+        }
+
+
+live_results_hub = LiveResultsHub(
+    poll_seconds=LIVE_RESULTS_POLL_SECONDS,
+    min_interval_ms=LIVE_RESULTS_MIN_INTERVAL_MS,
+    heartbeat_seconds=LIVE_RESULTS_HEARTBEAT_SECONDS,
+    max_subscribers=LIVE_RESULTS_MAX_SUBSCRIBERS
+)
@@ -1,25 +1,152 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, insert, func, union_all, cast, null, distinct, tuple_
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert as pg_insert
 from sqlalchemy.orm import selectinload
-from typing import List, Optional, Dict, Any
+from typing import Callable, Iterable, List, Optional, Dict, Any, Set, Tuple
 from uuid import UUID
+from datetime import datetime
+import base64
+import os
+import uuid
 
-from src.models.poll import Survey, Question, QuestionOption, Answer
+from src.core.cache import BinaryCodec, SharedCache
+from src.core.etag import etag_matches, make_etag
+from src.core.serialization import dumps
+from src.database.models.definitions import CompiledSurvey, get_compiled_survey, validate_ballot
+from src.database.models.counters import increment_response_counter, total_responses_expression
+from src.database.models.idempotency import IDEMPOTENCY_KEY_REUSED_MESSAGE
+from src.database.follower_reads import recent_survey_writes
+from src.models.poll import Survey, Question, QuestionOption, Answer, SurveyCompletion
+
+
+# Кэш результатов по survey_id. После каждого коммита голоса ключ
+# инвалидируется во всех репликах (invalidate_survey_results), так что
+# читатели сразу видят новые данные; TTL ограничивает устаревание, если
+# сообщение об инвалидации потерялось или общего кэша нет.
+RESULTS_CACHE_TTL_SECONDS = float(os.getenv("RESULTS_CACHE_TTL_SECONDS", "5"))
+RESULTS_CACHE_MAX_ENTRIES = int(os.getenv("RESULTS_CACHE_MAX_ENTRIES", "1024"))
+
+# Подписчики на коммит голоса (live-результаты); вызываются из invalidate_survey_results
+results_listeners: List[Callable[[UUID], None]] = []
+
+
+class _ResultsEntry:
+    """Результаты в кэше: dict, ETag и (по первому запросу) JSON-байты"""
+    __slots__ = ("data", "etag", "_encoded")
+
+    def __init__(self, data: Dict[str, Any], etag: str):
+        self.data = data
+        self.etag = etag
+        self._encoded: Optional[bytes] = None
+
+    @property
+    def encoded(self) -> bytes:
+        if self._encoded is None:
+            self._encoded = dumps(self.data)
+        return self._encoded
+
+
+results_cache = SharedCache(
+    name="survey_results",
+    max_entries=RESULTS_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESULTS_CACHE_TTL_SECONDS,
+    codec=BinaryCodec(
+        lambda entry: {"etag": entry.etag, "data": entry.data},
+        lambda data: _ResultsEntry(data["data"], data["etag"])
+    )
+)
+# Голос в другой реплике: следующие чтения анкеты здесь — без сдвига в прошлое
+results_cache.add_invalidation_listener(recent_survey_writes.on_invalidation)
+
+SURVEY_PAGE_SIZE = int(os.getenv("SURVEY_PAGE_SIZE", "50"))
+SURVEY_PAGE_SIZE_MAX = int(os.getenv("SURVEY_PAGE_SIZE_MAX", "100"))
+
+# Колонки, нужные SurveyListResponse: полные ORM-сущности списку не нужны
+SURVEY_LIST_COLUMNS = (
+    Survey.id,
+    Survey.title,
+    Survey.description,
+    Survey.status,
+    Survey.created_at,
+    Survey.end_date,
+    Survey.responses_count,
+    Survey.is_anonymous,
+    Survey.updated_at,
+)
+
+
+async def invalidate_survey_results(survey_id: UUID) -> None:
+    """Инвалидирует закэшированные результаты анкеты во всех репликах (после коммита голоса)"""
+    recent_survey_writes.note(survey_id)
+    await results_cache.delete(survey_id)
+    for listener in results_listeners:
+        listener(survey_id)
+
+
+def survey_list_etag(rows: List[Any], *request_parts: Any) -> str:
+    """ETag страницы списка по маркерам версии строк, без сериализации тела"""
+    return make_etag("list", *request_parts, *(
+        (row.id, row.updated_at, row.status, row.responses_count) for row in rows
+    ))
+
+
+def survey_detail_etag(survey: CompiledSurvey, responses_count: int) -> str:
+    return make_etag("survey", survey.id, survey.updated_at, responses_count)
+
+
+def survey_results_etag(survey: CompiledSurvey, responses_count: int) -> str:
+    return make_etag("results", survey.id, survey.updated_at, responses_count)
+
+
+def encode_survey_cursor(created_at: datetime, survey_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{survey_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_survey_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Разбирает курсор страницы; ValueError, если он повреждён"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, survey_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(survey_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
 
 
 async def get_all_surveys(
     db: AsyncSession,
-    status_filter: Optional[str] = None
-) -> List[Survey]:
-    query = select(Survey)
+    status_filter: Optional[str] = None,
+    limit: int = SURVEY_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Страница списка анкет по ключу (created_at, id) от новых к старым.
+
+    Возвращает строки с колонками SURVEY_LIST_COLUMNS и курсор следующей
+    страницы (None, если это последняя).
+    """
+    limit = max(1, min(limit, SURVEY_PAGE_SIZE_MAX))
+    query = select(*SURVEY_LIST_COLUMNS)
     
     if status_filter:
         query = query.where(Survey.status == status_filter)
     
-    query = query.order_by(Survey.created_at.desc())
+    if cursor:
+        created_at, survey_id = decode_survey_cursor(cursor)
+        query = query.where(tuple_(Survey.created_at, Survey.id) < tuple_(created_at, survey_id))
+    
+    # На одну строку больше, чтобы понять, есть ли следующая страница
+    query = query.order_by(Survey.created_at.desc(), Survey.id.desc()).limit(limit + 1)
     
     result = await db.execute(query)
-    return result.scalars().all()
+    rows = result.all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_survey_cursor(rows[-1].created_at, rows[-1].id)
+    
+    return rows, next_cursor
 
 
 async def get_survey_by_id(
@@ -45,80 +172,173 @@ async def get_survey_by_id(
     return survey
 
 
+async def get_survey_responses_count(
+    db: AsyncSession,
+    survey_id: UUID
+) -> Optional[int]:
+    result = await db.execute(
+        select(total_responses_expression()).where(Survey.id == survey_id)
+    )
+    return result.scalar_one_or_none()
+
+
 async def check_user_completed_survey(
     db: AsyncSession,
     survey_id: UUID,
     user_id: UUID
 ) -> bool:
+    # Поиск по первичному ключу survey_completions, без join по answers
     result = await db.execute(
-        select(Answer)
-        .join(Question)
-        .where(Question.survey_id == survey_id)
-        .where(Answer.user_id == user_id)
-        .limit(1)
+        select(SurveyCompletion.user_id)
+        .where(SurveyCompletion.survey_id == survey_id)
+        .where(SurveyCompletion.user_id == user_id)
     )
     
-    return result.scalar_one_or_none() is not None
+    return result.first() is not None
 
 
-async def save_survey_answers(
+# (хэш Idempotency-Key, отпечаток бюллетеня) по паре (survey_id, user_id)
+CompletionKeys = Dict[Tuple[UUID, int], Tuple[str, str]]
+
+
+async def claim_survey_completions(
+    db: AsyncSession,
+    pairs: Iterable[Tuple[UUID, int]],
+    idempotency: Optional[CompletionKeys] = None
+) -> Set[Tuple[UUID, int]]:
+    """
+    Вставляет отметки о прохождении в текущей транзакции; возвращает только
+    новые пары (survey_id, user_id). Остальные уже проходили анкету — это и
+    есть гарантия «не более одного бюллетеня», без предварительного SELECT.
+    Ключ идемпотентности пишется в ту же строку (см. completion_conflicts).
+    """
+    idempotency = idempotency or {}
+    rows = []
+    for survey_id, user_id in pairs:
+        key_hash, fingerprint = idempotency.get((survey_id, user_id), (None, None))
+        rows.append({
+            "survey_id": survey_id, "user_id": user_id,
+            "idempotency_key": key_hash, "ballot_fingerprint": fingerprint
+        })
+    if not rows:
+        return set()
+    result = await db.execute(
+        pg_insert(SurveyCompletion)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[SurveyCompletion.survey_id, SurveyCompletion.user_id])
+        .returning(SurveyCompletion.survey_id, SurveyCompletion.user_id)
+    )
+    return {(row.survey_id, row.user_id) for row in result.all()}
+
+
+async def completion_conflicts(
+    db: AsyncSession,
+    pairs: Iterable[Tuple[UUID, int]],
+    idempotency: Optional[CompletionKeys] = None
+) -> Dict[Tuple[UUID, int], Dict[str, Any]]:
+    """
+    Исход для пар, не прошедших claim_survey_completions. Повтор с тем же
+    ключом и бюллетенем получает исходный успех ("replayed"), тот же ключ с
+    другим бюллетенем — -12, остальные — -3. Строки читаются только для пар
+    с ключом: без Idempotency-Key лишнего запроса нет.
+    """
+    pairs = list(pairs)
+    outcomes = {pair: {"error": -3, "message": "You have already completed this survey"} for pair in pairs}
+    keyed = [pair for pair in pairs if idempotency and pair in idempotency]
+    if not keyed:
+        return outcomes
+
+    result = await db.execute(
+        select(
+            SurveyCompletion.survey_id, SurveyCompletion.user_id, SurveyCompletion.completed_at,
+            SurveyCompletion.idempotency_key, SurveyCompletion.ballot_fingerprint
+        )
+        .where(tuple_(SurveyCompletion.survey_id, SurveyCompletion.user_id).in_(keyed))
+    )
+    for row in result.all():
+        pair = (row.survey_id, row.user_id)
+        key_hash, fingerprint = idempotency[pair]
+        if row.idempotency_key != key_hash:
+            continue
+        if row.ballot_fingerprint != fingerprint:
+            outcomes[pair] = {"error": -12, "message": IDEMPOTENCY_KEY_REUSED_MESSAGE}
+        else:
+            outcomes[pair] = {
+                "error": 0, "message": "Survey completed successfully",
+                "completed_at": row.completed_at, "replayed": True
+            }
+    return outcomes
+
+
+async def check_ballot(
     db: AsyncSession,
     survey_id: UUID,
     user_id: UUID,
     answers: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """
+    Проверки бюллетеня перед записью; возвращает ошибку или None.
+
+    Повторное прохождение (-3) здесь не проверяется: его отсекает вставка
+    в survey_completions при записи. Статус — свежий (чтение по PK), вопросы
+    и варианты — из снимка.
+    """
+    survey = await get_compiled_survey(db, survey_id, fresh=True)
+    
+    if not survey:
+        return {"error": -1, "message": f"Survey with id {survey_id} not found"}
+    
+    if survey.status != "active":
+        return {"error": -2, "message": f"Survey is not active (status: {survey.status})"}
+    
+    return validate_ballot(survey, answers)
+
+
+def build_answer_rows(
+    user_id: UUID,
+    answers: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": uuid.uuid4(),
+            "question_id": answer["question_id"],
+            "option_id": option_id,
+            "user_id": user_id
+        }
+        for answer in answers
+        for option_id in answer["option_ids"]
+    ]
+
+
+async def save_survey_answers(
+    db: AsyncSession,
+    survey_id: UUID,
+    user_id: UUID,
+    answers: List[Dict[str, Any]],
+    idempotency: Optional[Tuple[str, str]] = None
 ) -> Dict[str, Any]:
 
     try:
-        survey = await get_survey_by_id(db, survey_id, include_questions=True)
-        
-        if not survey:
-            return {"error": -1, "message": f"Survey with id {survey_id} not found"}
-        
-        if survey.status != "active":
-            return {"error": -2, "message": f"Survey is not active (status: {survey.status})"}
-        
-        if await check_user_completed_survey(db, survey_id, user_id):
-            return {"error": -3, "message": "You have already completed this survey"}
+        error = await check_ballot(db, survey_id, user_id, answers)
+        if error:
+            return error
         
-        questions_dict = {q.id: q for q in survey.questions}
+        pair = (survey_id, user_id)
+        keys = {pair: idempotency} if idempotency else None
+        if not await claim_survey_completions(db, [pair], keys):
+            outcome = (await completion_conflicts(db, [pair], keys))[pair]
+            await db.rollback()
+            return outcome
         
-        for answer in answers:
-            question_id = answer["question_id"]
-            option_ids = answer["option_ids"]
-            
-            question = questions_dict.get(question_id)
-            
-            if not question:
-                return {
-                    "error": -4,
-                    "message": f"Question {question_id} not found in survey"
-                }
-            
-            if len(option_ids) > 1 and not question.allow_multiple_answers:
-                return {
-                    "error": -5,
-                    "message": f"Question {question_id} does not allow multiple answers"
-                }
-            
-            valid_option_ids = {opt.id for opt in question.options}
-            for option_id in option_ids:
-                if option_id not in valid_option_ids:
-                    return {
-                        "error": -6,
-                        "message": f"Option {option_id} does not belong to question {question_id}"
-                    }
-            
-            for option_id in option_ids:
-                db_answer = Answer(
-                    question_id=question_id,
-                    option_id=option_id,
-                    user_id=user_id
-                )
-                db.add(db_answer)
+        # Весь бюллетень — один многострочный INSERT вместо ORM-объекта на вариант
+        answer_rows = build_answer_rows(user_id, answers)
+        if answer_rows:
+            await db.execute(insert(Answer).values(answer_rows))
         
-        survey.responses_count += 1
+        await increment_response_counter(db, survey_id)
         
         await db.commit()
+        await invalidate_survey_results(survey_id)
         
         return {"error": 0, "message": "Survey completed successfully"}
     
@@ -127,28 +347,68 @@ async def save_survey_answers(
         return {"error": -99, "message": f"Database error: {str(e)}"}
 
 
-async def get_survey_results(
+async def get_survey_vote_counts(
     db: AsyncSession,
     survey_id: UUID
-) -> Optional[Dict[str, Any]]:
+) -> Tuple[Dict[UUID, int], Dict[UUID, int]]:
+    """
+    Считает голоса одним запросом: (option_id -> votes) и (question_id -> respondents).
 
-    survey = await get_survey_by_id(db, survey_id, include_questions=True)
-    
-    if not survey:
-        return None
-    
+    Первая часть UNION группирует answers по вариантам (LEFT JOIN, поэтому
+    варианты без голосов тоже попадают в выборку с нулём), вторая считает
+    уникальных респондентов по каждому вопросу.
+    """
+    option_votes = (
+        select(
+            QuestionOption.question_id.label("question_id"),
+            QuestionOption.id.label("option_id"),
+            func.count(Answer.id).label("votes")
+        )
+        .join(Question, Question.id == QuestionOption.question_id)
+        .outerjoin(Answer, Answer.option_id == QuestionOption.id)
+        .where(Question.survey_id == survey_id)
+        .group_by(QuestionOption.question_id, QuestionOption.id)
+    )
+
+    question_respondents = (
+        select(
+            Answer.question_id.label("question_id"),
+            cast(null(), PG_UUID(as_uuid=True)).label("option_id"),
+            func.count(distinct(Answer.user_id)).label("votes")
+        )
+        .join(Question, Question.id == Answer.question_id)
+        .where(Question.survey_id == survey_id)
+        .group_by(Answer.question_id)
+    )
+
+    result = await db.execute(union_all(option_votes, question_respondents))
+
+    votes_by_option: Dict[UUID, int] = {}
+    respondents_by_question: Dict[UUID, int] = {}
+    for question_id, option_id, votes in result.all():
+        if option_id is None:
+            respondents_by_question[question_id] = votes
+        else:
+            votes_by_option[option_id] = votes
+
+    return votes_by_option, respondents_by_question
+
+
+def assemble_survey_results(
+    survey: CompiledSurvey,
+    votes_by_option: Dict[UUID, int],
+    respondents_by_question: Dict[UUID, int],
+    responses_count: int
+) -> Dict[str, Any]:
+    """Собирает ответ SurveyResults из снимка анкеты и агрегатов (без БД)"""
     questions_results = []
     
-    for question in sorted(survey.questions, key=lambda q: q.question_order):
+    for question in survey.questions:
         option_results = []
         total_answers = 0
         
-        for option in sorted(question.options, key=lambda o: o.option_order):
-            votes_result = await db.execute(
-                select(func.count(Answer.id))
-                .where(Answer.option_id == option.id)
-            )
-            votes_count = votes_result.scalar()
+        for option in question.options:
+            votes_count = votes_by_option.get(option.id, 0)
             total_answers += votes_count
             
             option_results.append({
@@ -168,12 +428,83 @@ async def get_survey_results(
             "question_id": str(question.id),
             "question_text": question.question_text,
             "total_answers": total_answers,
+            "respondents_count": respondents_by_question.get(question.id, 0),
             "options": option_results
         })
     
     return {
         "survey_id": str(survey.id),
         "survey_title": survey.title,
-        "total_responses": survey.responses_count,
+        "total_responses": responses_count,
         "questions": questions_results
     }
+
+
+async def _get_results_entry(
+    db: AsyncSession,
+    survey_id: UUID,
+    if_none_match: Optional[str] = None
+) -> Tuple[Optional[str], Optional[_ResultsEntry]]:
+    """
+    (etag, entry). entry is None, если анкеты нет (etag тоже None) или если
+    тег клиента из if_none_match актуален — тогда голоса не считаются.
+    """
+
+    cached = await results_cache.get(survey_id)
+    if cached is not None:
+        if etag_matches(if_none_match, cached.etag):
+            return cached.etag, None
+        return cached.etag, cached
+
+    survey = await get_compiled_survey(db, survey_id)
+    
+    if not survey:
+        return None, None
+    
+    # Счётчик ответов — маркер версии результатов: каждый голос увеличивает
+    # его в той же транзакции, что и вставку ответов. Актуальный тег клиента —
+    # 304 без подсчёта голосов.
+    if if_none_match is not None:
+        etag = survey_results_etag(survey, await get_survey_responses_count(db, survey_id))
+        if etag_matches(if_none_match, etag):
+            return etag, None
+    
+    async def load() -> _ResultsEntry:
+        # Счётчик и ETag — внутри загрузки, под тем же поколением кэша, что и
+        # агрегаты; счётчик читается первым: голос, закоммиченный между
+        # запросами, даст тег старше данных (лишний 200), а не новее (304 на
+        # устаревшие результаты)
+        responses_count = await get_survey_responses_count(db, survey_id)
+        votes_by_option, respondents_by_question = await get_survey_vote_counts(db, survey_id)
+        return _ResultsEntry(
+            assemble_survey_results(survey, votes_by_option, respondents_by_question, responses_count),
+            survey_results_etag(survey, responses_count)
+        )
+    
+    # Одновременные промахи (дашборды после голоса) считают агрегаты один раз;
+    # если голос закоммитят во время подсчёта, результат в кэш не попадёт.
+    entry = await results_cache.load(survey_id, load)
+    return entry.etag, entry
+
+
+async def get_survey_results(
+    db: AsyncSession,
+    survey_id: UUID
+) -> Optional[Dict[str, Any]]:
+    _, entry = await _get_results_entry(db, survey_id)
+    return entry.data if entry else None
+
+
+async def get_survey_results_json(
+    db: AsyncSession,
+    survey_id: UUID,
+    if_none_match: Optional[str] = None
+) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    Результаты в виде готового JSON: (etag, body).
+
+    (None, None) — анкеты нет; (etag, None) — тег клиента актуален (304).
+    Байты кэшируются вместе с результатами.
+    """
+    etag, entry = await _get_results_entry(db, survey_id, if_none_match)
+    return etag, entry.encoded if entry else None
@@ -1,4 +1,4 @@
 from .user import User
-from .poll import Survey, Question, QuestionOption, Answer
+from .poll import Survey, Question, QuestionOption, Answer, SurveyResponseCounter, SurveyCompletion
 
-__all__ = ["User", "Survey", "Question", "QuestionOption", "Answer"]
+__all__ = ["User", "Survey", "Question", "QuestionOption", "Answer", "SurveyResponseCounter", "SurveyCompletion"]
@@ -30,6 +30,9 @@ class Survey(Base):
         Index('ix_surveys_status', 'status'),
         Index('ix_surveys_created_by', 'created_by'),
         Index('ix_surveys_end_date', 'end_date'),
+        # keyset-пагинация списка: (created_at, id) и с фильтром по статусу
+        Index('ix_surveys_created_at_id', 'created_at', 'id'),
+        Index('ix_surveys_status_created_at_id', 'status', 'created_at', 'id'),
     )
 
 
@@ -88,3 +91,25 @@ class Answer(Base):
         Index('ix_answers_option_id', 'option_id'),
         UniqueConstraint('question_id', 'user_id', 'option_id', name='uq_answers_question_user_option'),
     )
+
+
+class SurveyResponseCounter(Base):
+    """Шард счётчика ответов: голоса пишут в случайный шард, а не в строку surveys"""
+    __tablename__ = "survey_response_counters"
+    
+    survey_id = Column(UUID(as_uuid=True), ForeignKey('surveys.id', ondelete='CASCADE'), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+
+class SurveyCompletion(Base):
+    """Отметка о прохождении анкеты: первичный ключ даёт не более одного бюллетеня на пользователя"""
+    __tablename__ = "survey_completions"
+    
+    survey_id = Column(UUID(as_uuid=True), ForeignKey('surveys.id', ondelete='CASCADE'), primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    completed_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Idempotency-Key бюллетеня (хэш) и отпечаток ответов: повтор с тем же
+    # ключом на любой реплике получает исходный ответ, а не "already completed"
+    idempotency_key = Column(String(32), nullable=True)
+    ballot_fingerprint = Column(String(24), nullable=True)
@@ -99,6 +99,7 @@ class QuestionResult(BaseModel):
     question_id: UUID
     question_text: str
     total_answers: int
+    respondents_count: int = 0  # уникальные пользователи, ответившие на вопрос
     options: List[OptionResult]
 
 
@@ -0,0 +1,79 @@
+"""
+Microbenchmark fixture with baseline comparison
+
+Each benchmark measures the median time per call over several rounds and
+compares it with tests/benchmarks/baseline.json (committed). A benchmark
+without a baseline entry fails, so a new benchmark must come with its
+baseline. Re-record the baseline on the reference machine (CI runner) with:
+
+    pytest tests/benchmarks --run-benchmarks --benchmark-update-baseline
+"""
+import json
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+
+_measured = {}
+
+
+def _load_baseline():
+    if BASELINE_FILE.exists():
+        return json.loads(BASELINE_FILE.read_text())
+    return {}
+
+
+def _time_per_call(fn, number: int, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return statistics.median(samples)
+
+
+@pytest.fixture
+def perf(request):
+    """perf(fn, number=..., rounds=...) — меряет fn и сверяет с базовой линией"""
+    config = request.config
+    name = request.node.name
+    baseline = _load_baseline()
+
+    def run(fn, number: int = 200, rounds: int = 7):
+        # Прогрев: импорты, кэши pydantic/jose
+        for _ in range(max(1, number // 10)):
+            fn()
+        median_us = _time_per_call(fn, number, rounds) * 1e6
+        _measured[name] = {"median_us": round(median_us, 3)}
+
+        if config.getoption("--benchmark-update-baseline"):
+            return median_us
+
+        reference = baseline.get(name)
+        if reference is None:
+            pytest.fail(
+                f"no baseline for {name} (measured {median_us:.1f} us): "
+                f"record it with --benchmark-update-baseline"
+            )
+
+        threshold = config.getoption("--benchmark-threshold")
+        limit = reference["median_us"] * (1 + threshold / 100)
+        assert median_us <= limit, (
+            f"{name}: {median_us:.1f} us per call, baseline {reference['median_us']:.1f} us, "
+            f"allowed +{threshold:.0f}% ({limit:.1f} us)"
+        )
+        return median_us
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not session.config.getoption("--benchmark-update-baseline", default=False) or not _measured:
+        return
+    baseline = _load_baseline()
+    baseline.update(_measured)
+    BASELINE_FILE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
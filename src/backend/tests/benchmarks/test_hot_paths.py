@@ -0,0 +1,83 @@
+"""
+Microbenchmarks for backend hot paths (auth, vote validation, results, serialization)
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.auth.security import create_user_token, verify_token
+from src.core.serialization import dumps
+from src.database.models.definitions import compile_survey, encode_survey_detail, validate_ballot
+from src.database.models.surveys import assemble_survey_results
+from src.models.poll import Survey, Question, QuestionOption
+from src.schemas.survey import SurveyFullResponse, SurveyResults
+
+pytestmark = pytest.mark.benchmark
+
+
+def build_compiled_survey(questions: int, options: int):
+    """Анкета в памяти, без БД"""
+    now = datetime.now(timezone.utc)
+    survey = Survey(
+        id=uuid.uuid4(), title="Benchmark survey", description="x" * 200, status="active",
+        created_by=1, created_at=now, updated_at=now, end_date=now + timedelta(days=7),
+        responses_count=1000, is_anonymous=False,
+    )
+    for q in range(questions):
+        question = Question(
+            id=uuid.uuid4(), question_text=f"Question {q} " + "y" * 80,
+            question_order=q, allow_multiple_answers=(q % 3 == 0),
+        )
+        for o in range(options):
+            question.options.append(QuestionOption(id=uuid.uuid4(), option_text=f"Option {o}", option_order=o))
+        survey.questions.append(question)
+    return compile_survey(survey)
+
+
+@pytest.fixture(scope="module")
+def large_survey():
+    return build_compiled_survey(questions=50, options=6)
+
+
+def test_create_user_token(perf):
+    perf(lambda: create_user_token(12345, username="bench", is_admin=False))
+
+
+def test_verify_token(perf):
+    token = create_user_token(12345)
+    assert verify_token(token) == 12345
+    perf(lambda: verify_token(token))
+
+
+def test_validate_ballot(perf, large_survey):
+    answers = [
+        {"question_id": q.id, "option_ids": [q.options[0].id, q.options[1].id] if q.allow_multiple_answers else [q.options[0].id]}
+        for q in large_survey.questions
+    ]
+    assert validate_ballot(large_survey, answers) is None
+    perf(lambda: validate_ballot(large_survey, answers))
+
+
+def test_assemble_survey_results(perf, large_survey):
+    votes = {o.id: (i * 7) % 50 for q in large_survey.questions for i, o in enumerate(q.options)}
+    respondents = {q.id: 100 for q in large_survey.questions}
+    results = assemble_survey_results(large_survey, votes, respondents, 1000)
+    SurveyResults.model_validate(results)
+    perf(lambda: assemble_survey_results(large_survey, votes, respondents, 1000), number=100)
+
+
+def test_serialize_survey_full_response(perf):
+    survey = build_compiled_survey(questions=100, options=8)
+    perf(lambda: SurveyFullResponse.model_validate(survey, from_attributes=True).model_dump_json(), number=20)
+
+
+def test_encode_survey_detail(perf):
+    survey = build_compiled_survey(questions=100, options=8)
+    perf(lambda: encode_survey_detail(survey, 1000), number=200)
+
+
+def test_encode_survey_results(perf, large_survey):
+    votes = {o.id: 3 for q in large_survey.questions for o in q.options}
+    results = assemble_survey_results(large_survey, votes, {}, 1000)
+    perf(lambda: dumps(results), number=200)
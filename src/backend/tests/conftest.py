@@ -9,12 +9,37 @@ import os
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
+# Тесты ходят с одного адреса; лимиты проверяются отдельно в test_rate_limit.py
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from main import app
 from src.database.connection import Base, get_db
+from src.core.query_accounting import instrument_engine
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks", "microbenchmarks (tests/benchmarks)")
+    group.addoption("--run-benchmarks", action="store_true", default=False,
+                    help="run tests marked as benchmark")
+    group.addoption("--benchmark-update-baseline", action="store_true", default=False,
+                    help="record measured timings as the new baseline instead of comparing")
+    group.addoption("--benchmark-threshold", type=float,
+                    default=float(os.getenv("BENCHMARK_REGRESSION_PCT", "25")),
+                    help="fail when a benchmark is slower than baseline by more than this percentage")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: microbenchmark compared against tests/benchmarks/baseline.json")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks run only with --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
 
 # Test database URL - use PostgreSQL from environment or default test DB
 TEST_DATABASE_URL = os.getenv(
@@ -35,6 +60,8 @@ def event_loop():
 async def test_db():
     """Create a test database and return session"""
     engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+    # Заголовки X-DB-Query-Count в ответах — для проверки бюджета запросов
+    instrument_engine(engine)
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -65,6 +92,14 @@ async def client(test_db):
     
     app.dependency_overrides.clear()
 
+@pytest.fixture
+def assert_query_budget():
+    """Assert that a response ran at most `budget` SQL statements"""
+    def check(response, budget: int):
+        used = int(response.headers["X-DB-Query-Count"])
+        assert used <= budget, f"{response.request.url.path} ran {used} queries, budget is {budget}"
+    return check
+
 @pytest_asyncio.fixture
 async def authenticated_client(client):
     """Create an authenticated test client"""
@@ -82,3 +117,38 @@ async def authenticated_client(client):
     client.headers.update({"Authorization": f"Bearer {token}"})
     
     return client
+
+@pytest_asyncio.fixture
+async def seeded_survey(test_db):
+    """Create an active survey with 2 questions x 3 options and no answers"""
+    import uuid
+    from datetime import datetime, timedelta, timezone
+    from src.models.poll import Survey, Question, QuestionOption
+
+    survey = Survey(
+        id=uuid.uuid4(),
+        title="Seeded survey",
+        status="active",
+        created_by=1,
+        end_date=datetime.now(timezone.utc) + timedelta(days=7),
+        responses_count=0,
+        is_anonymous=False,
+    )
+    for q in range(2):
+        question = Question(
+            id=uuid.uuid4(),
+            question_text=f"Question {q + 1}",
+            question_order=q,
+            allow_multiple_answers=(q == 1),
+        )
+        for o in range(3):
+            question.options.append(QuestionOption(
+                id=uuid.uuid4(),
+                option_text=f"Option {o + 1}",
+                option_order=o,
+            ))
+        survey.questions.append(question)
+
+    test_db.add(survey)
+    await test_db.commit()
+    return survey
@@ -0,0 +1,126 @@
+"""
+Minimal Redis-protocol (RESP2) stand-in for cache backend tests
+
+Supports what RedisCacheBackend uses: GET, SET (PX/EX/NX), DEL, PUBLISH,
+SUBSCRIBE, PING, plus CLIENT/SELECT/ECHO handshakes. Run as a separate
+process:
+
+    python tests/resp_standin.py --port 6390
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class RespStandin:
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+
+    @staticmethod
+    def encode(value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, bool):
+            return b"+OK\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if isinstance(value, Exception):
+            return b"-ERR " + str(value).encode() + b"\r\n"
+        return b"*%d\r\n" % len(value) + b"".join(RespStandin.encode(item) for item in value)
+
+    @staticmethod
+    async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: List[bytes], writer: asyncio.StreamWriter):
+        command = args[0].upper()
+        if command == b"PING":
+            return b"PONG" if len(args) == 1 else args[1]
+        if command in (b"CLIENT", b"SELECT"):
+            return True
+        if command == b"ECHO":
+            return args[1]
+        if command == b"GET":
+            return self.get(args[1])
+        if command == b"SET":
+            expires_at = None
+            options = [a.upper() for a in args[3:]]
+            if b"PX" in options:
+                expires_at = time.monotonic() + int(args[3 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                expires_at = time.monotonic() + int(args[3 + options.index(b"EX") + 1])
+            if b"NX" in options and self.get(args[1]) is not None:
+                return None
+            self.data[args[1]] = (args[2], expires_at)
+            return True
+        if command == b"DEL":
+            return sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+        if command == b"PUBLISH":
+            subscribers = self.channels.get(args[1], set())
+            for subscriber in list(subscribers):
+                subscriber.write(self.encode([b"message", args[1], args[2]]))
+            return len(subscribers)
+        if command == b"SUBSCRIBE":
+            replies = []
+            for channel in args[1:]:
+                self.channels.setdefault(channel, set()).add(writer)
+                replies.append([b"subscribe", channel, len(args) - 1])
+            return replies
+        return Exception(f"unknown command '{command.decode()}'")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await self.read_command(reader)
+                if not args:
+                    break
+                reply = self.execute(args, writer)
+                if args[0].upper() == b"SUBSCRIBE":
+                    writer.write(b"".join(self.encode(r) for r in reply))
+                else:
+                    writer.write(self.encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for subscribers in self.channels.values():
+                subscribers.discard(writer)
+            writer.close()
+
+
+async def serve(host: str, port: int):
+    standin = RespStandin()
+    server = await asyncio.start_server(standin.handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RESP stand-in server for tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
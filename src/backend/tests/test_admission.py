@@ -0,0 +1,84 @@
+"""
+Tests for the adaptive admission controller
+"""
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from src.core.admission import AdmissionController, AdmissionMiddleware
+
+
+@pytest.mark.asyncio
+async def test_votes_are_admitted_before_reads():
+    """Test that a queued vote gets the freed slot ahead of an earlier list request"""
+    controller = AdmissionController(max_limit=1, min_limit=1)
+    assert await controller.acquire(0, 1.0, 1) is None
+    order = []
+
+    async def request(name, priority):
+        assert await controller.acquire(priority, 1.0, 1) is None
+        order.append(name)
+        controller.release(None)
+
+    tasks = [asyncio.create_task(request("list", 2)), asyncio.create_task(request("vote", 0))]
+    await asyncio.sleep(0.01)
+    controller.release(None)
+    await asyncio.gather(*tasks)
+    assert order == ["vote", "list"]
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_reads_keep_headroom_for_votes():
+    """Test that a partial share sheds reads while votes still fit"""
+    controller = AdmissionController(max_limit=4, min_limit=1)
+    for _ in range(3):
+        assert await controller.acquire(2, 0.75, 0.01) is None
+    assert await controller.acquire(2, 0.75, 0.01) == "timeout"
+    assert await controller.acquire(0, 1.0, 0.01) is None
+
+
+@pytest.mark.asyncio
+async def test_limit_follows_db_latency():
+    """Test AIMD: slow windows cut the limit, healthy saturated windows raise it"""
+    controller = AdmissionController(max_limit=10, min_limit=2, window_samples=5, latency_floor_ms=0)
+
+    async def window(db_seconds, concurrency):
+        for _ in range(5):
+            for _ in range(concurrency):
+                await controller.acquire(0, 1.0, 0)
+            for _ in range(concurrency):
+                controller.release(db_seconds)
+
+    await window(0.002, 1)
+    assert controller.limit == 10
+    await window(0.050, 1)
+    assert controller.limit == 8
+    await window(0.002, 8)
+    assert controller.limit == 9
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_with_503():
+    """Test that an overloaded route class gets 503 with Retry-After"""
+    controller = AdmissionController(max_limit=1, min_limit=1)
+    release = asyncio.Event()
+
+    async def downstream(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    app = AdmissionMiddleware(downstream, controller=controller, enabled=True)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        slow = asyncio.create_task(client.get("/api/surveys/"))
+        await asyncio.sleep(0.01)
+        response = await client.get("/api/surveys/")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        release.set()
+        assert (await slow).status_code == 200
+
+    assert controller.shed == 1
+    assert controller.in_flight == 0
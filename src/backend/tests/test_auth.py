@@ -94,3 +94,47 @@ async def test_get_current_user(authenticated_client: AsyncClient):
     data = response.json()
     assert data["email"] == "test@example.com"
     assert data["username"] == "testuser"
+
+@pytest.mark.asyncio
+async def test_principal_cache_serves_repeat_requests(authenticated_client: AsyncClient):
+    """Test that a verified token is served from the principal cache"""
+    from src.auth.principal import principal_cache
+
+    await authenticated_client.get("/api/auth/me")
+    hits_before = principal_cache.hits
+    response = await authenticated_client.get("/api/auth/me")
+    assert response.status_code == 200
+    assert principal_cache.hits == hits_before + 1
+
+@pytest.mark.asyncio
+async def test_token_claims_authenticate_without_db(monkeypatch):
+    """Test that claims-carrying tokens resolve a principal from the token alone"""
+    from src.auth import security
+    from src.auth.principal import Principal
+
+    monkeypatch.setattr(security, "AUTH_TOKEN_CLAIMS", True)
+    token = security.create_user_token(42, username="claims", is_admin=False)
+    principal = Principal.from_claims(security.decode_token(token))
+    assert principal == Principal(id=42, username="claims", is_admin=False)
+
+@pytest.mark.asyncio
+async def test_token_claims_ignored_when_disabled(authenticated_client: AsyncClient, monkeypatch):
+    """Test that turning AUTH_TOKEN_CLAIMS off stops trusting claims of already issued tokens"""
+    from src.api import auth as auth_api
+    from src.auth import security
+
+    user_id = (await authenticated_client.get("/api/auth/me")).json()["id"]
+    # Токен выдан, пока пользователь был админом
+    monkeypatch.setattr(security, "AUTH_TOKEN_CLAIMS", True)
+    token = security.create_user_token(user_id, username="testuser", is_admin=True)
+    path = "/api/admin/surveys/11111111-1111-1111-1111-111111111111/definition/invalidate"
+    headers = {"Authorization": f"Bearer {token}"}
+
+    monkeypatch.setattr(auth_api, "AUTH_TOKEN_CLAIMS", True)
+    response = await authenticated_client.post(path, headers=headers)
+    assert response.status_code == 404
+    assert "not found" in response.json()["detail"]
+
+    monkeypatch.setattr(auth_api, "AUTH_TOKEN_CLAIMS", False)
+    response = await authenticated_client.post(path, headers=headers)
+    assert response.status_code == 403
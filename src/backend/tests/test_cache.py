@@ -0,0 +1,37 @@
+"""
+Unit tests for the in-process LRU/TTL cache
+"""
+import time
+
+from src.core.cache import LRUTTLCache
+
+
+def test_cache_hit_and_miss():
+    """Test hit/miss counters"""
+    cache = LRUTTLCache(max_entries=2, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    """Test LRU eviction when the cache is full"""
+    cache = LRUTTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_entry_expires():
+    """Test TTL expiration"""
+    cache = LRUTTLCache(max_entries=2, ttl_seconds=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
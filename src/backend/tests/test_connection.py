@@ -0,0 +1,129 @@
+"""
+Tests for the database connection pool settings and instrumentation
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.connection import InstrumentedAsyncQueuePool, parse_session_settings, pool_stats
+from tests.conftest import TEST_DATABASE_URL
+
+backend_dir = Path(__file__).parent.parent
+
+
+@pytest.fixture(autouse=True)
+def restore_pool_stats(monkeypatch):
+    """Счётчики пула глобальны: возвращаем их после теста (их читает HealthMonitor)"""
+    for name in vars(pool_stats):
+        monkeypatch.setattr(pool_stats, name, getattr(pool_stats, name))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_checkout_timeout_counted_as_timeout(test_db):
+    """Test that waiting past pool_timeout for a busy pool counts as a checkout timeout"""
+    engine = create_async_engine(
+        TEST_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2
+    )
+    timeouts, errors = pool_stats.checkout_timeouts, pool_stats.checkout_errors
+    try:
+        async with engine.connect() as held:
+            await held.execute(text("SELECT 1"))
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+    finally:
+        await engine.dispose()
+    assert pool_stats.checkout_timeouts == timeouts + 1
+    assert pool_stats.checkout_errors == errors
+
+
+@pytest.mark.asyncio
+async def test_connect_failure_not_counted_as_timeout():
+    """Test that an unreachable database is a checkout error, not pool saturation"""
+    engine = create_async_engine(
+        f"postgresql+asyncpg://nobody@127.0.0.1:{free_port()}/none",
+        poolclass=InstrumentedAsyncQueuePool, pool_size=1, max_overflow=0
+    )
+    timeouts, errors = pool_stats.checkout_timeouts, pool_stats.checkout_errors
+    try:
+        with pytest.raises(Exception):
+            async with engine.connect():
+                pass
+    finally:
+        await engine.dispose()
+    assert pool_stats.checkout_timeouts == timeouts
+    assert pool_stats.checkout_errors == errors + 1
+
+
+def test_parse_session_settings():
+    """Test the DB_SESSION_SETTINGS format: name=value pairs separated by semicolons"""
+    assert parse_session_settings("statement_timeout=5s; application_name=voting-backend;") == {
+        "statement_timeout": "5s",
+        "application_name": "voting-backend",
+    }
+    assert parse_session_settings("") == {}
+    assert parse_session_settings("broken;options=-c a=b") == {"options": "-c a=b"}
+
+
+def test_pool_settings_from_env():
+    """Test that the lazily created engine takes pool and session settings from the environment"""
+    script = (
+        "import json\n"
+        "from src.database import connection\n"
+        "engine = connection.get_engine()\n"
+        "pool = engine.sync_engine.pool\n"
+        "print(json.dumps({\n"
+        "    'pool': type(pool).__name__, 'size': pool.size(), 'timeout': pool.timeout(),\n"
+        "    'recycle': pool._recycle, 'pre_ping': pool._pre_ping, 'stats': connection.get_pool_stats(),\n"
+        "    'options': connection._connect_args()['options'],\n"
+        "    'sync_engine': connection.sync_engine is connection.get_sync_engine(),\n"
+        "}))\n"
+    )
+    env = {
+        **os.environ, "DB_POOL_SIZE": "3", "DB_MAX_OVERFLOW": "2", "DB_POOL_TIMEOUT": "1.5",
+        "DB_POOL_RECYCLE": "60", "DB_POOL_PRE_PING": "false",
+        "DB_SESSION_SETTINGS": "statement_timeout=5s;application_name=test",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=backend_dir, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    data = json.loads(result.stdout)
+    assert data["pool"] == "InstrumentedAsyncQueuePool"
+    assert (data["size"], data["timeout"], data["recycle"], data["pre_ping"]) == (3, 1.5, 60, False)
+    assert data["options"] == "-c statement_timeout=5s -c application_name=test"
+    assert data["sync_engine"]
+    assert data["stats"]["size"] == 3
+    assert data["stats"]["max_overflow"] == 2
+    assert data["stats"]["checked_out"] == 0 and data["stats"]["checkouts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_track_checkouts(test_db):
+    """Test that pool counters see checkouts and overflow through the instrumented pool"""
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, pool_size=1, max_overflow=1)
+    checkouts, overflow = pool_stats.checkouts, pool_stats.overflow_checkouts
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            stats = pool_stats.as_dict(engine.sync_engine.pool)
+            assert stats["checked_out"] == 2
+            assert stats["overflow"] == 1
+    finally:
+        await engine.dispose()
+    assert pool_stats.checkouts == checkouts + 2
+    assert pool_stats.overflow_checkouts == overflow + 1
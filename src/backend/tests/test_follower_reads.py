@@ -0,0 +1,60 @@
+"""
+Tests for follower-read routing of read-only endpoints
+"""
+import uuid
+
+import pytest
+
+from src.core.cache import BinaryCodec, SharedCache
+from src.core.cache_backends import MemoryCacheBackend
+from src.database.follower_reads import RecentWrites, as_of_clause, begin_read
+
+
+def test_recent_write_forces_fresh_reads_for_window():
+    """Test that a survey written within the window is reported as recently modified"""
+    writes = RecentWrites(max_entries=2)
+    survey_id = uuid.uuid4()
+    writes.note(survey_id, now=100.0)
+    assert writes.modified_within(survey_id, 5, now=104.0)
+    assert not writes.modified_within(survey_id, 5, now=106.0)
+    assert not writes.modified_within(uuid.uuid4(), 5, now=104.0)
+
+    writes.note("a", now=101.0)
+    writes.note("b", now=102.0)
+    assert len(writes) == 2
+    assert not writes.modified_within(survey_id, 5, now=104.0)
+
+
+def test_missed_invalidations_force_fresh_reads_for_all():
+    """Test that a backend reconnect (possible lost messages) makes every survey fresh"""
+    writes = RecentWrites()
+    writes.on_invalidation(None)
+    assert writes.modified_within(uuid.uuid4(), 0)
+
+
+def test_as_of_clause_uses_follower_timestamp_when_budget_allows():
+    """Test that budgets past the closed timestamp lag read from followers"""
+    assert as_of_clause(10) == "follower_read_timestamp()"
+    assert as_of_clause(2.5) == "'-2.5s'"
+
+
+@pytest.mark.asyncio
+async def test_remote_invalidation_marks_survey_written():
+    """Test that an invalidation from another replica reaches the recent-writes registry"""
+    backend = MemoryCacheBackend()
+    codec = BinaryCodec(lambda value: value, lambda value: value)
+    writer = SharedCache(name="results", max_entries=10, ttl_seconds=60, codec=codec, backend=backend, origin="a")
+    reader = SharedCache(name="results", max_entries=10, ttl_seconds=60, codec=codec, backend=backend, origin="b")
+    writes = RecentWrites()
+    reader.add_invalidation_listener(writes.on_invalidation)
+
+    survey_id = uuid.uuid4()
+    await writer.delete(survey_id)
+    assert writes.modified_within(survey_id, 5)
+
+
+@pytest.mark.asyncio
+async def test_non_cockroach_database_reads_fresh(test_db):
+    """Test that PostgreSQL (no AS OF SYSTEM TIME) gets a plain read transaction"""
+    assert await begin_read(test_db, "survey_detail", uuid.uuid4()) == "fresh"
+    assert not test_db.in_transaction()
@@ -0,0 +1,65 @@
+"""
+Unit tests for the bounded password hashing executor
+"""
+import asyncio
+import threading
+
+import pytest
+
+from src.auth.security import HashingExecutor, HashingPoolSaturated
+
+
+@pytest.mark.asyncio
+async def test_hashing_executor_runs_off_loop():
+    """Test that work runs in a pool thread and stats are updated"""
+    executor = HashingExecutor(workers=1, max_queue=0)
+    thread_name = await executor.run(lambda: threading.current_thread().name)
+    assert thread_name.startswith("bcrypt")
+    assert executor.stats()["completed"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hashing_executor_rejects_when_saturated():
+    """Test fail-fast when workers and queue are full"""
+    executor = HashingExecutor(workers=1, max_queue=1)
+    release = threading.Event()
+
+    running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(HashingPoolSaturated):
+        await executor.run(release.wait)
+    assert executor.stats()["rejected"] == 1
+
+    release.set()
+    await asyncio.gather(*running)
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_keeps_slot_until_hash_finishes():
+    """Test that cancelling the awaiting request does not free the slot of a still-running hash"""
+    executor = HashingExecutor(workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait()
+
+    request = asyncio.ensure_future(executor.run(blocking))
+    while not started.is_set():
+        await asyncio.sleep(0.01)
+    request.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await request
+    assert executor.in_flight == 1
+    with pytest.raises(HashingPoolSaturated):
+        await executor.run(lambda: None)
+
+    release.set()
+    while executor.in_flight:
+        await asyncio.sleep(0.01)
+    assert await executor.run(lambda: 42) == 42
+    assert executor.in_flight == 0
+    executor.shutdown()
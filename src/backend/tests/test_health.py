@@ -19,3 +19,32 @@ async def test_health_check(client: AsyncClient):
     assert response.status_code == 200
     data = response.json()
     assert data["status"] in ["healthy", "unhealthy"]
+
+@pytest.mark.asyncio
+async def test_liveness_and_readiness_before_first_probe(client: AsyncClient):
+    """Test that liveness is always 200 and readiness is 503 until a probe succeeds"""
+    response = await client.get("/api/health/live")
+    assert response.status_code == 200
+
+    response = await client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+@pytest.mark.asyncio
+async def test_readiness_needs_consecutive_failures(monkeypatch):
+    """Test readiness hysteresis: one bad probe is tolerated, two flip the pod"""
+    from src.database.health import HealthMonitor
+
+    monitor = HealthMonitor(unready_after=2)
+    results = iter([(1.0, None), (None, "refused"), (None, "refused"), (1.0, None)])
+
+    async def check_db():
+        return next(results)
+
+    monkeypatch.setattr(monitor, "_check_db", check_db)
+    states = []
+    for _ in range(4):
+        monitor.state = await monitor.probe(loop_lag_ms=0.0)
+        states.append(monitor.readiness().ready)
+    assert states == [True, True, False, True]
+    assert monitor.state.problems == ()
@@ -0,0 +1,164 @@
+"""
+Integration tests for batched vote ingest (BallotIngestQueue)
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database.models.counters import total_responses_expression
+from src.database.models.ingest import BallotIngestQueue
+from src.models.poll import Answer, Survey
+from tests.conftest import TEST_DATABASE_URL
+
+
+def make_ballot(survey, option: int = 0):
+    question = survey.questions[0]
+    return [{"question_id": question.id, "option_ids": [question.options[option].id]}]
+
+
+async def vote(session_factory, queue: BallotIngestQueue, survey_id, user_id: int, answers):
+    """Голос как в запросе: своя сессия, открытая до ответа"""
+    async with session_factory() as db:
+        return await queue.submit(db, survey_id, user_id, answers)
+
+
+@pytest_asyncio.fixture
+async def session_factory(test_db):
+    return async_sessionmaker(test_db.bind, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def ingest_queue(session_factory):
+    queue = BallotIngestQueue(max_batch=50, max_delay_ms=50, max_backlog=100)
+    queue.start(session_factory)
+    yield queue
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_batch_commits_ballots_and_counters(seeded_survey, test_db, session_factory, ingest_queue):
+    """Test that concurrent ballots share one transaction and land with exact counters"""
+    survey_id = seeded_survey.id
+    answers = make_ballot(seeded_survey)
+    results = await asyncio.gather(*(
+        vote(session_factory, ingest_queue, survey_id, user_id, answers) for user_id in range(1, 6)
+    ))
+    assert [r["error"] for r in results] == [0] * 5
+    assert ingest_queue.batches == 1
+    assert ingest_queue.max_batch_seen == 5
+
+    total = await test_db.execute(select(total_responses_expression()).where(Survey.id == survey_id))
+    assert total.scalar() == 5
+    answers_count = await test_db.execute(select(func.count(Answer.id)).where(Answer.question_id == answers[0]["question_id"]))
+    assert answers_count.scalar() == 5
+
+
+@pytest.mark.asyncio
+async def test_duplicate_in_queue_rejected(seeded_survey, session_factory, ingest_queue):
+    """Test that a second ballot of the same user waiting in the queue gets -3 without a DB round-trip"""
+    answers = make_ballot(seeded_survey)
+    results = await asyncio.gather(
+        vote(session_factory, ingest_queue, seeded_survey.id, 1, answers),
+        vote(session_factory, ingest_queue, seeded_survey.id, 1, answers)
+    )
+    assert sorted(r["error"] for r in results) == [-3, 0]
+    assert ingest_queue.duplicates == 1
+
+
+@pytest.mark.asyncio
+async def test_full_backlog_rejected(seeded_survey, session_factory):
+    """Test that a full queue answers -10 instead of growing"""
+    queue = BallotIngestQueue(max_batch=10, max_delay_ms=10, max_backlog=0)
+    queue.start(session_factory)
+    try:
+        result = await vote(session_factory, queue, seeded_survey.id, 1, make_ballot(seeded_survey))
+    finally:
+        await queue.stop()
+    assert result["error"] == -10
+    assert queue.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_to_single_commits(seeded_survey, session_factory, ingest_queue):
+    """Test that a failed batch transaction is retried ballot by ballot"""
+    original = ingest_queue._commit_batch
+    batch_sizes = []
+
+    async def flaky(db, batch):
+        batch_sizes.append(len(batch))
+        if len(batch) > 1:
+            raise RuntimeError("batch failed")
+        return await original(db, batch)
+
+    ingest_queue._commit_batch = flaky
+    answers = make_ballot(seeded_survey)
+    results = await asyncio.gather(*(
+        vote(session_factory, ingest_queue, seeded_survey.id, user_id, answers) for user_id in range(1, 4)
+    ))
+    assert [r["error"] for r in results] == [0] * 3
+    assert batch_sizes == [3, 1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_queued_ballots(seeded_survey, test_db, session_factory):
+    """Test that stop() commits ballots still waiting for their batch deadline"""
+    queue = BallotIngestQueue(max_batch=50, max_delay_ms=60_000, max_backlog=100)
+    queue.start(session_factory)
+    answers = make_ballot(seeded_survey)
+    voters = [
+        asyncio.ensure_future(vote(session_factory, queue, seeded_survey.id, user_id, answers))
+        for user_id in range(1, 4)
+    ]
+    while queue.ballots == 0 and len(queue._pending) < 3:
+        await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(queue.stop(), 5)
+    assert [(await voter)["error"] for voter in voters] == [0] * 3
+    assert not queue.running
+
+    total = await test_db.execute(select(total_responses_expression()).where(Survey.id == seeded_survey.id))
+    assert total.scalar() == 3
+
+
+@pytest.mark.asyncio
+async def test_waiting_voters_do_not_hold_pool_connections(seeded_survey, test_db):
+    """Test that more concurrent voters than pool connections still get their batch committed"""
+    engine = create_async_engine(TEST_DATABASE_URL, pool_size=2, max_overflow=0, pool_timeout=3)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    queue = BallotIngestQueue(max_batch=50, max_delay_ms=100, max_backlog=100)
+    queue.start(factory)
+    answers = make_ballot(seeded_survey)
+    try:
+        results = await asyncio.gather(*(
+            vote(factory, queue, seeded_survey.id, user_id, answers) for user_id in range(1, 7)
+        ))
+    finally:
+        await queue.stop()
+        await engine.dispose()
+    assert [r["error"] for r in results] == [0] * 6
+
+
+@pytest.mark.asyncio
+async def test_failing_results_listener_does_not_stall_queue(seeded_survey, test_db):
+    """Test that a raising post-commit listener still answers voters and keeps the queue running"""
+    from src.database.models.surveys import results_listeners
+
+    def broken(survey_id):
+        raise RuntimeError("listener failed")
+
+    factory = async_sessionmaker(test_db.bind, class_=AsyncSession, expire_on_commit=False)
+    queue = BallotIngestQueue(max_batch=10, max_delay_ms=10, max_backlog=100)
+    queue.start(factory)
+    results_listeners.append(broken)
+    try:
+        first = await asyncio.wait_for(vote(factory, queue, seeded_survey.id, 1, make_ballot(seeded_survey)), 5)
+        assert first["error"] == 0
+        assert queue.running
+        second = await asyncio.wait_for(vote(factory, queue, seeded_survey.id, 2, make_ballot(seeded_survey)), 5)
+        assert second["error"] == 0
+    finally:
+        results_listeners.remove(broken)
+        await queue.stop()
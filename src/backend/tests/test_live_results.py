@@ -0,0 +1,63 @@
+"""
+Tests for the live results hub (SSE)
+"""
+import json
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.models.live import LiveResultsHub, ResultsState, results_delta
+from tests.test_serialization import build_survey
+
+
+def parse_event(chunk: bytes):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_results_delta_only_changed_options():
+    """Test that a delta carries only touched options and their questions"""
+    survey = build_survey()
+    first, second = survey.questions
+    old = ResultsState(1, survey, {first.options[0].id: 1}, {first.id: 1}, 1)
+    new = ResultsState(2, survey, {first.options[0].id: 1, second.options[2].id: 2}, {first.id: 1, second.id: 2}, 2)
+
+    delta = results_delta(old, new)
+    assert delta["total_responses"] == 2
+    assert [o["option_id"] for o in delta["options"]] == [second.options[2].id]
+    assert delta["options"][0]["delta"] == 2
+    assert [q["question_id"] for q in delta["questions"]] == [second.id]
+
+
+@pytest.mark.asyncio
+async def test_stream_pushes_delta_after_vote(authenticated_client: AsyncClient, seeded_survey, test_db):
+    """Test snapshot on subscribe and a delta once a ballot is committed"""
+    hub = LiveResultsHub(poll_seconds=30, min_interval_ms=0, heartbeat_seconds=30, max_subscribers=10)
+    hub.start(async_sessionmaker(test_db.bind, class_=AsyncSession, expire_on_commit=False))
+    stream = hub.stream(seeded_survey.id)
+    try:
+        assert (await stream.__anext__()).startswith(b"retry:")
+        event, data = parse_event(await stream.__anext__())
+        assert event == "snapshot"
+        assert data["total_responses"] == 0
+
+        first, second = seeded_survey.questions
+        ballot = {
+            "survey_id": str(seeded_survey.id),
+            "answers": [{"question_id": str(first.id), "option_ids": [str(first.options[2].id)]}],
+        }
+        response = await authenticated_client.post(f"/api/surveys/{seeded_survey.id}/answer", json=ballot)
+        assert response.status_code == 200
+
+        event, data = parse_event(await stream.__anext__())
+        assert event == "delta"
+        assert data["total_responses"] == 1
+        assert data["options"] == [{
+            "option_id": str(first.options[2].id), "question_id": str(first.id), "votes_count": 1, "delta": 1,
+        }]
+        assert hub.stats()["subscribers"] == 1
+    finally:
+        await stream.aclose()
+        await hub.stop()
+    assert hub.stats()["subscribers"] == 0
@@ -0,0 +1,32 @@
+"""
+Smoke test for the load-test harness (in-process target)
+"""
+import pytest
+
+import main
+from loadtest.harness import run_scenario
+from src.database.connection import get_engine
+from src.database.health import health_monitor
+from src.database.models.ingest import vote_ingest_queue
+from tests.conftest import TEST_DATABASE_URL
+
+
+@pytest.mark.asyncio
+async def test_run_scenario_runs_app_lifespan(test_db, monkeypatch):
+    """Test that an in-process run starts the lifespan and batched ingest commits every ballot"""
+    monkeypatch.setattr(main, "VOTE_INGEST_MODE", "batched")
+    # lifespan при остановке переводит общий монитор в stopping
+    monkeypatch.setattr(health_monitor, "state", health_monitor.state)
+    engine_before = get_engine()
+    batches_before = vote_ingest_queue.batches
+
+    report = await run_scenario(
+        "vote_burst", TEST_DATABASE_URL, concurrency=4, duration=10.0, users=8, questions=2, options=2
+    )
+
+    assert report["endpoints"]["POST /surveys/{id}/answer"]["statuses"] == {"200": 8}
+    assert report["total"]["error_rate"] == 0.0
+    assert report["answers_rows_after_run"] == 8 * 2
+    assert vote_ingest_queue.batches > batches_before
+    assert not vote_ingest_queue.running
+    assert get_engine() is engine_before
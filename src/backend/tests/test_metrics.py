@@ -0,0 +1,38 @@
+"""
+Tests for the Prometheus metrics endpoint and primitives
+"""
+import pytest
+from httpx import AsyncClient
+
+from src.core.metrics import Counter, Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test histogram exposition format"""
+    histogram = Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+    lines = histogram.collect()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+
+
+def test_counter_escapes_label_values():
+    """Test label escaping"""
+    counter = Counter("test_total", "Test", ("code",))
+    counter.inc('-1"')
+    assert 'test_total{code="-1\\""} 1' in counter.collect()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_latency(client: AsyncClient):
+    """Test that requests are recorded under their route template"""
+    await client.get("/api/")
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/",status="200"}' in response.text
+    assert "http_requests_in_flight" in response.text
@@ -0,0 +1,43 @@
+"""
+Tests for SQL statement normalization, N+1 detection and per-request accounting
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from src.core.query_accounting import RequestDbStats, count_queries, normalize_statement
+
+
+def test_normalize_statement_collapses_parameters():
+    """Test that parameters and VALUES lists normalize to one shape"""
+    one = normalize_statement("INSERT INTO answers (id) VALUES (%(id_m0)s)")
+    many = normalize_statement("INSERT INTO answers (id) VALUES (%(id_m0)s), (%(id_m1)s)")
+    assert one == many == "INSERT INTO answers (id) VALUES (?)"
+
+
+def test_repeated_statements_over_threshold():
+    """Test that a per-row query loop is reported"""
+    stats = RequestDbStats()
+    for _ in range(5):
+        stats.record("SELECT count(answers.id) FROM answers WHERE answers.option_id = %(option_id_1)s", 0.001)
+    stats.record("SELECT surveys.id FROM surveys", 0.001)
+
+    assert stats.repeated_statements(threshold=10) == {}
+    repeated = stats.repeated_statements(threshold=3)
+    assert list(repeated.values()) == [5]
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_is_counted_and_leaves_no_state(test_db):
+    """Test that a failing statement is recorded and does not leak timing state onto the pooled connection"""
+    with count_queries() as stats:
+        with pytest.raises(DBAPIError):
+            await test_db.execute(text("SELECT 1 / 0"))
+        await test_db.rollback()
+        await test_db.execute(text("SELECT 1"))
+        connection = await test_db.connection()
+        info = (await connection.get_raw_connection()).info
+    assert stats.statements >= 2
+    assert stats.by_statement["SELECT 1 / 0"] == 1
+    assert stats.by_statement["SELECT 1"] == 1
+    assert "query_start" not in info
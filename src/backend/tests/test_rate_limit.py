@@ -0,0 +1,85 @@
+"""
+Tests for token-bucket rate limiting
+"""
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from src.auth.security import create_user_token
+from src.core.rate_limit import RateLimiter, RateLimitMiddleware, TokenBucketStore, client_ip
+
+
+async def downstream(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def make_client(limits, forwarded_hops=0):
+    app = RateLimitMiddleware(downstream, limiter=RateLimiter(limits), enabled=True, forwarded_hops=forwarded_hops)
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_bucket_allows_burst_then_refills():
+    """Test that a bucket admits its burst, rejects with a wait time, then refills"""
+    store = TokenBucketStore(rate=2, burst=3)
+    now = store._rotated_at
+    assert [store.acquire("a", now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.acquire("a", now) == pytest.approx(0.5)
+    assert store.acquire("b", now) == 0.0
+    assert store.acquire("a", now + 0.5) == 0.0
+
+
+def test_idle_buckets_are_dropped():
+    """Test that buckets untouched for a full refill period leave memory"""
+    store = TokenBucketStore(rate=1, burst=2)
+    now = store._rotated_at
+    store.acquire("idle", now)
+    store.acquire("busy", now)
+    store.acquire("busy", now + 2)
+    assert len(store) == 2
+    store.acquire("busy", now + 4.5)
+    assert len(store) == 1
+    store.acquire("other", now + 10)
+    assert len(store) == 1
+
+
+def test_max_keys_bounds_memory():
+    """Test that the store never holds more than max_keys buckets"""
+    store = TokenBucketStore(rate=1, burst=1000, max_keys=10)
+    for i in range(100):
+        store.acquire(f"k{i}")
+    assert len(store) <= 10
+    assert store.early_rotations > 0
+
+
+def test_client_ip_uses_trusted_forwarded_hop():
+    """Test that only the proxy-appended X-Forwarded-For entry is trusted"""
+    scope = {"client": ("10.0.0.5", 1234), "headers": [(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7")]}
+    assert client_ip(scope, 0) == "10.0.0.5"
+    assert client_ip(scope, 1) == "203.0.113.7"
+    assert client_ip(scope, 5) == "6.6.6.6"
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_gets_429_with_retry_after():
+    """Test that an empty bucket yields 429 and never calls the app"""
+    async with make_client({"auth": (1, 2)}) as client:
+        for _ in range(2):
+            response = await client.post("/api/auth/login")
+            assert response.status_code == 200
+        response = await client.post("/api/auth/login")
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+
+        response = await client.get("/api/surveys/")
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_authenticated_clients_have_separate_buckets():
+    """Test that vote limits key on the token user, not the shared address"""
+    first = {"Authorization": f"Bearer {create_user_token(1, 'first', False)}"}
+    second = {"Authorization": f"Bearer {create_user_token(2, 'second', False)}"}
+    async with make_client({"vote": (1, 1)}) as client:
+        assert (await client.post("/api/surveys/x/answer", headers=first)).status_code == 200
+        assert (await client.post("/api/surveys/x/answer", headers=first)).status_code == 429
+        assert (await client.post("/api/surveys/x/answer", headers=second)).status_code == 200
@@ -0,0 +1,75 @@
+"""
+Tests for the pre-encoded JSON response path
+"""
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from src.core.serialization import dumps
+from src.database.models.definitions import compile_survey, encode_survey_detail
+from src.database.models.surveys import assemble_survey_results
+from src.models.poll import Survey, Question, QuestionOption
+from src.schemas.survey import SurveyFullResponse, SurveyResults
+
+
+def build_survey():
+    now = datetime.now(timezone.utc)
+    survey = Survey(
+        id=uuid.uuid4(), title="Serialization", description=None, status="active",
+        created_by=1, created_at=now, updated_at=now, end_date=now + timedelta(days=1),
+        responses_count=3, is_anonymous=True,
+    )
+    for q in range(2):
+        question = Question(id=uuid.uuid4(), question_text=f"Q{q}", question_order=q, allow_multiple_answers=bool(q))
+        for o in range(3):
+            question.options.append(QuestionOption(id=uuid.uuid4(), option_text=f"O{o}", option_order=o))
+        survey.questions.append(question)
+    return compile_survey(survey)
+
+
+def test_survey_detail_bytes_match_pydantic():
+    """Test that the fast detail path produces the same JSON as SurveyFullResponse"""
+    survey = build_survey()
+    expected = SurveyFullResponse.model_validate(survey, from_attributes=True).model_dump(mode="json")
+    expected["responses_count"] = 7
+
+    assert json.loads(encode_survey_detail(survey, 7)) == expected
+
+
+def test_survey_results_bytes_match_pydantic():
+    """Test that encoded results validate as SurveyResults unchanged"""
+    survey = build_survey()
+    votes = {survey.questions[0].options[0].id: 2, survey.questions[0].options[1].id: 1}
+    results = assemble_survey_results(survey, votes, {survey.questions[0].id: 3}, 3)
+
+    encoded = json.loads(dumps(results))
+    assert SurveyResults.model_validate(encoded).model_dump(mode="json") == encoded
+
+
+class DriverUUID(uuid.UUID):
+    """Как asyncpg.pgproto.UUID: подкласс, который orjson не кодирует нативно"""
+
+
+def test_dumps_encodes_uuid_subclasses_and_decimals():
+    """Test that driver-specific UUID subclasses and NUMERIC aggregates encode like their plain values"""
+    value = uuid.uuid4()
+    assert dumps({"id": DriverUUID(str(value))}) == dumps({"id": value})
+    assert json.loads(dumps({"total": Decimal(7), "avg": Decimal("1.5")})) == {"total": 7, "avg": 1.5}
+
+
+def test_compiled_survey_ids_are_plain_uuids():
+    """Test that a survey loaded through asyncpg compiles to the same snapshot as through psycopg"""
+    now = datetime.now(timezone.utc)
+    survey = Survey(
+        id=DriverUUID(str(uuid.uuid4())), title="Driver", status="active", created_by=1,
+        created_at=now, updated_at=now, end_date=now, responses_count=0, is_anonymous=False,
+    )
+    question = Question(id=DriverUUID(str(uuid.uuid4())), question_text="Q", question_order=0, allow_multiple_answers=False)
+    question.options.append(QuestionOption(id=DriverUUID(str(uuid.uuid4())), option_text="O", option_order=0))
+    survey.questions.append(question)
+
+    compiled = compile_survey(survey)
+    assert type(compiled.id) is uuid.UUID
+    assert {type(option_id) for option_id in compiled.questions[0].option_ids} == {uuid.UUID}
+    assert json.loads(compiled.questions_json)[0]["options"][0]["id"] == str(question.options[0].id)
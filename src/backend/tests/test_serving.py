@@ -0,0 +1,65 @@
+"""
+Tests for the production serving profile (Dockerfile CMD, gunicorn.conf.py, chart env)
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+backend_dir = Path(__file__).parent.parent
+chart_dir = backend_dir.parent.parent / "charts" / "voting-system"
+
+
+def image_cmd():
+    """CMD из Dockerfile; gunicorn запускается текущим интерпретатором"""
+    dockerfile = (backend_dir / "Dockerfile").read_text()
+    cmd = json.loads(re.search(r"^CMD (\[.*\])\s*$", dockerfile, re.M).group(1))
+    assert cmd[0] == "gunicorn"
+    return [sys.executable, "-m", "gunicorn", *cmd[1:]]
+
+
+def chart_configmap():
+    """data ConfigMap'а из helm template: файл CHART_CONFIGMAP (CI) или helm из PATH"""
+    yaml = pytest.importorskip("yaml")
+    rendered = os.getenv("CHART_CONFIGMAP")
+    if rendered:
+        text = Path(rendered).read_text()
+    elif shutil.which("helm"):
+        text = subprocess.run(
+            ["helm", "template", "voting", str(chart_dir), "--show-only", "templates/configmap.yaml"],
+            capture_output=True, text=True, check=True
+        ).stdout
+    else:
+        pytest.skip("helm is not installed and CHART_CONFIGMAP is not set")
+    return next(doc["data"] for doc in yaml.safe_load_all(text) if doc and doc.get("kind") == "ConfigMap")
+
+
+def run_gunicorn(env, *args):
+    pytest.importorskip("gunicorn")
+    base = {k: v for k, v in os.environ.items() if k != "WEB_CONCURRENCY"}
+    return subprocess.run(
+        [*image_cmd(), *args], cwd=backend_dir, env={**base, **env},
+        capture_output=True, text=True, timeout=120
+    )
+
+
+def test_image_cmd_starts_with_chart_env():
+    """Test that the image CMD loads the app with the env the chart puts into the pod (envFrom)"""
+    result = run_gunicorn(chart_configmap(), "--check-config")
+    assert result.returncode == 0, result.stderr
+
+
+def test_worker_count_from_env():
+    """Test that WEB_CONCURRENCY overrides the CPU-based default"""
+    result = run_gunicorn({"WEB_CONCURRENCY": "3"}, "--print-config")
+    assert result.returncode == 0, result.stderr
+    assert re.search(r"^workers\s+= 3$", result.stdout, re.M)
+
+    result = run_gunicorn({}, "--print-config")
+    assert result.returncode == 0, result.stderr
+    assert re.search(r"^workers\s+= [1-8]$", result.stdout, re.M)
@@ -0,0 +1,213 @@
+"""
+Tests for the two-level shared cache (codec, single-flight, invalidation, RESP backend)
+"""
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from src.core.cache import BinaryCodec, SharedCache, renew_replica_id
+from src.core.cache_backends import MemoryCacheBackend
+from src.database.models.definitions import _CacheEntry, survey_definitions_cache
+from tests.test_serialization import build_survey
+
+codec = BinaryCodec(lambda value: value, lambda value: value, compress_min_bytes=64)
+
+
+def make_cache(backend, origin):
+    return SharedCache(name="test", max_entries=10, ttl_seconds=60, codec=codec, backend=backend, origin=origin)
+
+
+async def wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def test_binary_codec_compresses_large_values():
+    """Test that large values are zlib-compressed and round-trip"""
+    value = {"rows": ["same text"] * 100}
+    encoded = codec.encode(value)
+    assert encoded[:1] == b"z"
+    assert len(encoded) < 200
+    assert codec.decode(encoded) == value
+    assert codec.encode({"a": 1})[:1] == b"j"
+
+
+def test_compiled_survey_codec_roundtrip():
+    """Test that a compiled survey survives the shared-cache encoding"""
+    survey = build_survey()
+    decoded = survey_definitions_cache.codec.decode(survey_definitions_cache.codec.encode(_CacheEntry(survey, 0.0)))
+    assert decoded.survey == survey
+    assert decoded.survey.questions_json == survey.questions_json
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    """Test single-flight: concurrent misses for one key share a single load"""
+    cache = make_cache(MemoryCacheBackend(), "a")
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(10)))
+    assert results == [{"value": 42}] * 10
+    assert calls == 1
+    assert cache.coalesced == 9
+
+
+@pytest.mark.asyncio
+async def test_delete_invalidates_other_replicas():
+    """Test that delete on one replica drops the key from another replica's local level"""
+    backend = MemoryCacheBackend()
+    first, second = make_cache(backend, "a"), make_cache(backend, "b")
+
+    await first.set("key", {"v": 1})
+    assert await second.get("key") == {"v": 1}
+    assert second.remote_hits == 1
+
+    await first.delete("key")
+    assert second.invalidations_received == 1
+    assert await second.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_load_invalidated_midway_is_not_cached():
+    """Test that a value loaded across an invalidation is returned but not cached"""
+    cache = make_cache(MemoryCacheBackend(), "a")
+
+    async def loader():
+        await cache.delete("key")
+        return {"v": "stale"}
+
+    assert await cache.get_or_load("key", loader) == {"v": "stale"}
+    assert await cache.get("key") is None
+
+
+def test_origin_follows_renewed_replica_id():
+    """Test that caches built before fork use the worker's id after renew_replica_id"""
+    cache = make_cache(MemoryCacheBackend(), None)
+    before = cache.origin
+    after = renew_replica_id()
+    assert after != before
+    assert cache.origin == after
+    assert make_cache(MemoryCacheBackend(), "a").origin == "a"
+
+
+
+@pytest.mark.asyncio
+async def test_uncacheable_value_reaches_waiters():
+    """Test that a value rejected by cacheable is shared with waiters but not stored"""
+    cache = make_cache(MemoryCacheBackend(), "a")
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"error": -10}
+
+    results = await asyncio.gather(*(
+        cache.load("key", loader, cacheable=lambda value: value["error"] == 0) for _ in range(3)
+    ))
+    assert results == [{"error": -10}] * 3
+    assert calls == 1
+    assert await cache.get("key") is None
+
+@pytest.fixture
+def resp_server():
+    """Local RESP stand-in process on a free port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / "resp_standin.py"), "--port", str(port)]
+    )
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            break
+        except OSError:
+            assert time.monotonic() < deadline, "RESP stand-in did not start"
+            time.sleep(0.05)
+    yield f"redis://127.0.0.1:{port}/0"
+    process.terminate()
+    process.wait()
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_shares_and_invalidates(resp_server):
+    """Test RedisCacheBackend against the stand-in: shared values and pub/sub invalidation"""
+    pytest.importorskip("redis")
+    from src.core.cache_backends import RedisCacheBackend
+
+    backend_a = RedisCacheBackend(resp_server, channel="test:invalidate", timeout_ms=500)
+    backend_b = RedisCacheBackend(resp_server, channel="test:invalidate", timeout_ms=500)
+    first, second = make_cache(backend_a, "a"), make_cache(backend_b, "b")
+    await backend_a.start()
+    await backend_b.start()
+    try:
+        await asyncio.sleep(0.2)  # подписки установлены
+        await first.set("key", {"v": [1, 2, 3]})
+        assert await second.get("key") == {"v": [1, 2, 3]}
+
+        await first.delete("key")
+        await wait_for(lambda: second.invalidations_received == 1)
+        assert await second.get("key") is None
+        assert first.remote_errors == second.remote_errors == 0
+    finally:
+        await backend_a.close()
+        await backend_b.close()
+
+
+@pytest.mark.asyncio
+async def test_load_started_before_remote_delete_does_not_reach_shared_level():
+    """Test that a value loaded before another replica's delete stays out of L2 even without the invalidation"""
+    backend = MemoryCacheBackend()
+    loader_replica, writer = make_cache(backend, "a"), make_cache(backend, "b")
+    # Сообщение об инвалидации ещё не дошло до загружающей реплики
+    backend._listeners.clear()
+
+    async def stale_loader():
+        await writer.delete("key")
+        return {"v": "stale"}
+
+    assert await loader_replica.get_or_load("key", stale_loader) == {"v": "stale"}
+    assert await writer.get("key") is None
+
+    async def fresh_loader():
+        return {"v": "fresh"}
+
+    assert await writer.get_or_load("key", fresh_loader) == {"v": "fresh"}
+    assert await make_cache(backend, "c").get("key") == {"v": "fresh"}
+
+
+def test_definitions_shared_ttl_capped_at_recheck_interval():
+    """Test that a definitions copy in L2 cannot outlive the updated_at recheck interval"""
+    from src.database.models.definitions import SURVEY_DEFINITION_RECHECK_SECONDS
+
+    assert survey_definitions_cache._remote_ttl(None) == SURVEY_DEFINITION_RECHECK_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_generations_kept_only_for_keys_being_read():
+    """Test that invalidating many keys does not grow per-key bookkeeping"""
+    cache = make_cache(MemoryCacheBackend(), "a")
+
+    async def loader():
+        return {"v": 1}
+
+    for key in range(100):
+        await cache.get_or_load(key, loader)
+        await cache.delete(key)
+    assert cache._generations == {} and cache._readers == {}
@@ -1,6 +1,8 @@
 """
 Integration tests for survey endpoints
 """
+import uuid
+
 import pytest
 from httpx import AsyncClient
 
@@ -29,3 +31,377 @@ async def test_unauthorized_start_survey(client: AsyncClient):
     fake_survey_id = "11111111-1111-1111-1111-111111111111"
     response = await client.post(f"/api/surveys/{fake_survey_id}/start")
     assert response.status_code in [401, 403]  # Unauthorized or Forbidden
+
+@pytest.mark.asyncio
+async def test_survey_results_not_found(client: AsyncClient):
+    """Test results for a survey that does not exist"""
+    fake_survey_id = "11111111-1111-1111-1111-111111111111"
+    response = await client.get(f"/api/surveys/{fake_survey_id}/results")
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_survey_results_counts_votes(authenticated_client: AsyncClient, seeded_survey):
+    """Test that results include zero-vote options and count submitted ballots"""
+    first, second = seeded_survey.questions
+    ballot = {
+        "survey_id": str(seeded_survey.id),
+        "answers": [
+            {"question_id": str(first.id), "option_ids": [str(first.options[0].id)]},
+            {"question_id": str(second.id), "option_ids": [str(o.id) for o in second.options[:2]]},
+        ],
+    }
+    response = await authenticated_client.post(f"/api/surveys/{seeded_survey.id}/answer", json=ballot)
+    assert response.status_code == 200
+
+    response = await authenticated_client.get(f"/api/surveys/{seeded_survey.id}/results")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_responses"] == 1
+
+    q1, q2 = data["questions"]
+    assert [o["votes_count"] for o in q1["options"]] == [1, 0, 0]
+    assert q1["options"][0]["percentage"] == 100.0
+    assert q2["total_answers"] == 2
+    assert q2["respondents_count"] == 1
+    assert [o["votes_count"] for o in q2["options"]] == [1, 1, 0]
+
+@pytest.mark.asyncio
+async def test_get_survey_detail(client: AsyncClient, seeded_survey):
+    """Test survey detail returns ordered questions and options"""
+    response = await client.get(f"/api/surveys/{seeded_survey.id}")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["responses_count"] == 0
+    assert [q["question_order"] for q in data["questions"]] == [0, 1]
+    assert [o["option_order"] for o in data["questions"][0]["options"]] == [0, 1, 2]
+
+@pytest.mark.asyncio
+async def test_submit_rejects_foreign_option(authenticated_client: AsyncClient, seeded_survey):
+    """Test that an option from another question is rejected"""
+    first, second = seeded_survey.questions
+    ballot = {
+        "survey_id": str(seeded_survey.id),
+        "answers": [{"question_id": str(first.id), "option_ids": [str(second.options[0].id)]}],
+    }
+    response = await authenticated_client.post(f"/api/surveys/{seeded_survey.id}/answer", json=ballot)
+    assert response.status_code == 400
+    assert "does not belong" in response.json()["detail"]
+
+@pytest.mark.asyncio
+async def test_total_responses_survives_counter_fold(authenticated_client: AsyncClient, seeded_survey, test_db):
+    """Test that sharded counters and their fold keep total_responses exact"""
+    from src.database.models.counters import fold_response_counters
+
+    first, second = seeded_survey.questions
+    ballot = {
+        "survey_id": str(seeded_survey.id),
+        "answers": [{"question_id": str(first.id), "option_ids": [str(first.options[1].id)]}],
+    }
+    response = await authenticated_client.post(f"/api/surveys/{seeded_survey.id}/answer", json=ballot)
+    assert response.status_code == 200
+
+    response = await authenticated_client.get(f"/api/surveys/{seeded_survey.id}")
+    assert response.json()["responses_count"] == 1
+
+    folded = await fold_response_counters(test_db)
+    assert folded == {seeded_survey.id: 1}
+
+    response = await authenticated_client.get(f"/api/surveys/{seeded_survey.id}")
+    assert response.json()["responses_count"] == 1
+
+@pytest.mark.asyncio
+async def test_counter_fold_batches_and_skips_locked_surveys(seeded_survey, test_db):
+    """Test that the fold goes survey batch by batch and leaves surveys folded elsewhere alone"""
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from src.database.models.counters import fold_response_counters, increment_response_counter
+    from src.models.poll import Survey
+
+    other_ids = [uuid.uuid4() for _ in range(2)]
+    for survey_id in other_ids:
+        test_db.add(Survey(
+            id=survey_id, title="Other", status="active", created_by=1,
+            end_date=datetime.now(timezone.utc) + timedelta(days=1)
+        ))
+    await test_db.commit()
+    for survey_id in [seeded_survey.id, *other_ids]:
+        await increment_response_counter(test_db, survey_id, 2)
+    await test_db.commit()
+
+    # Другой воркер держит блокировку строки анкеты — её шарды остаются на месте
+    async with AsyncSession(test_db.bind) as other_worker:
+        await other_worker.execute(select(Survey.id).where(Survey.id == other_ids[0]).with_for_update())
+        folded = await fold_response_counters(test_db, batch_size=1)
+        await other_worker.rollback()
+    assert folded == {seeded_survey.id: 2, other_ids[1]: 2}
+
+    assert await fold_response_counters(test_db) == {other_ids[0]: 2}
+    counts = await test_db.execute(select(Survey.id, Survey.responses_count).where(Survey.id.in_(other_ids)))
+    assert dict(counts.all()) == {other_ids[0]: 2, other_ids[1]: 2}
+
+
+@pytest.mark.asyncio
+async def test_counter_fold_lock_does_not_block_votes(seeded_survey, test_db):
+    """Test that the fold's row lock (FOR NO KEY UPDATE) lets vote inserts through their foreign keys"""
+    import asyncio
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from src.database.models.surveys import claim_survey_completions
+    from src.models.poll import Survey
+
+    survey_id = seeded_survey.id
+    async with AsyncSession(test_db.bind) as folder, AsyncSession(test_db.bind) as voter:
+        await folder.execute(
+            select(Survey.id).where(Survey.id == survey_id).with_for_update(skip_locked=True, key_share=True)
+        )
+        claimed = await asyncio.wait_for(claim_survey_completions(voter, [(survey_id, 1)]), 5)
+        await voter.commit()
+        await folder.rollback()
+    assert claimed == {(survey_id, 1)}
+
+@pytest.mark.asyncio
+async def test_get_surveys_keyset_pagination(client: AsyncClient, seeded_survey, test_db):
+    """Test that pages follow X-Next-Cursor without gaps or repeats"""
+    import uuid
+    from datetime import datetime, timedelta, timezone
+    from src.models.poll import Survey
+
+    for i in range(2):
+        test_db.add(Survey(
+            id=uuid.uuid4(),
+            title=f"Extra survey {i}",
+            status="active",
+            created_by=1,
+            created_at=datetime.now(timezone.utc) - timedelta(days=i + 1),
+            end_date=datetime.now(timezone.utc) + timedelta(days=7),
+            responses_count=0,
+            is_anonymous=False,
+        ))
+    await test_db.commit()
+
+    first = await client.get("/api/surveys/?limit=2")
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = await client.get(f"/api/surveys/?limit=2&cursor={cursor}")
+    assert second.status_code == 200
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+
+    seen = [s["id"] for s in first.json() + second.json()]
+    assert len(set(seen)) == 3
+
+@pytest.mark.asyncio
+async def test_get_surveys_rejects_bad_cursor(client: AsyncClient):
+    """Test that a malformed cursor is a client error"""
+    response = await client.get("/api/surveys/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_survey_query_budgets(client: AsyncClient, seeded_survey, assert_query_budget):
+    """Test per-endpoint SQL budgets once the survey definition is cached"""
+    await client.get(f"/api/surveys/{seeded_survey.id}")
+
+    response = await client.get(f"/api/surveys/{seeded_survey.id}")
+    assert_query_budget(response, 1)
+
+    response = await client.get(f"/api/surveys/{seeded_survey.id}/results")
+    assert_query_budget(response, 3)
+
+    response = await client.get("/api/surveys/")
+    assert_query_budget(response, 1)
+
+@pytest.mark.asyncio
+async def test_conditional_get_returns_304(client: AsyncClient, seeded_survey):
+    """Test that a current ETag yields 304 on list, detail and results"""
+    for path in ("/api/surveys/", f"/api/surveys/{seeded_survey.id}", f"/api/surveys/{seeded_survey.id}/results"):
+        response = await client.get(path)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        response = await client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+@pytest.mark.asyncio
+async def test_results_etag_changes_after_vote(authenticated_client: AsyncClient, seeded_survey):
+    """Test that a vote invalidates the results and detail ETags"""
+    results_path = f"/api/surveys/{seeded_survey.id}/results"
+    detail_path = f"/api/surveys/{seeded_survey.id}"
+    results_etag = (await authenticated_client.get(results_path)).headers["ETag"]
+    detail_etag = (await authenticated_client.get(detail_path)).headers["ETag"]
+
+    first, second = seeded_survey.questions
+    ballot = {
+        "survey_id": str(seeded_survey.id),
+        "answers": [{"question_id": str(first.id), "option_ids": [str(first.options[1].id)]}],
+    }
+    response = await authenticated_client.post(f"/api/surveys/{seeded_survey.id}/answer", json=ballot)
+    assert response.status_code == 200
+
+    response = await authenticated_client.get(results_path, headers={"If-None-Match": results_etag})
+    assert response.status_code == 200
+    assert response.json()["total_responses"] == 1
+    response = await authenticated_client.get(detail_path, headers={"If-None-Match": detail_etag})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_results_etag_computed_with_cached_counts(
+    authenticated_client: AsyncClient, test_db, seeded_survey, monkeypatch
+):
+    """Test that a vote committed after the If-None-Match check does not cache a stale ETag"""
+    from src.database.models import surveys
+
+    survey_id = seeded_survey.id
+    first, _ = seeded_survey.questions
+    ballot = {
+        "survey_id": str(survey_id),
+        "answers": [{"question_id": str(first.id), "option_ids": [str(first.options[0].id)]}],
+    }
+    response = await authenticated_client.post(f"/api/surveys/{survey_id}/answer", json=ballot)
+    assert response.status_code == 200
+
+    # Первое чтение счётчика «до голоса» — как если бы голос закоммитили
+    # между проверкой If-None-Match и подсчётом агрегатов
+    real_count = surveys.get_survey_responses_count
+    calls = []
+
+    async def count_before_vote(db, survey_id):
+        calls.append(survey_id)
+        count = await real_count(db, survey_id)
+        return count - 1 if len(calls) == 1 else count
+
+    monkeypatch.setattr(surveys, "get_survey_responses_count", count_before_vote)
+    etag, entry = await surveys._get_results_entry(test_db, survey_id, if_none_match='"stale"')
+    assert entry.data["total_responses"] == 1
+    compiled = await surveys.get_compiled_survey(test_db, survey_id)
+    assert etag == entry.etag == surveys.survey_results_etag(compiled, 1)
+
+
+@pytest.mark.asyncio
+async def test_repeat_ballot_rejected(authenticated_client: AsyncClient, seeded_survey):
+    """Test that the completion key rejects a second ballot from the same user"""
+    # Отклонённый голос откатывает общую сессию и expire'ит seeded_survey:
+    # id берём до запросов, а не ленивой загрузкой после
+    survey_id = seeded_survey.id
+    first, second = seeded_survey.questions
+    ballot = {
+        "survey_id": str(survey_id),
+        "answers": [{"question_id": str(first.id), "option_ids": [str(first.options[0].id)]}],
+    }
+    response = await authenticated_client.post(f"/api/surveys/{survey_id}/answer", json=ballot)
+    assert response.status_code == 200
+
+    response = await authenticated_client.post(f"/api/surveys/{survey_id}/answer", json=ballot)
+    assert response.status_code == 400
+    assert "already completed" in response.json()["detail"]
+
+    response = await authenticated_client.post(f"/api/surveys/{survey_id}/start")
+    assert response.status_code == 400
+
+    response = await authenticated_client.get(f"/api/surveys/{survey_id}/results")
+    assert response.json()["total_responses"] == 1
+
+@pytest.mark.asyncio
+async def test_idempotency_key_replays_original_response(authenticated_client: AsyncClient, seeded_survey):
+    """Test that a retried submit with the same Idempotency-Key gets the stored response"""
+    first, second = seeded_survey.questions
+    path = f"/api/surveys/{seeded_survey.id}/answer"
+    ballot = {
+        "survey_id": str(seeded_survey.id),
+        "answers": [{"question_id": str(first.id), "option_ids": [str(first.options[0].id)]}],
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    response = await authenticated_client.post(path, json=ballot, headers=headers)
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+    original = response.json()
+
+    response = await authenticated_client.post(path, json=ballot, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert response.json() == original
+
+    changed = {**ballot, "answers": [{"question_id": str(first.id), "option_ids": [str(first.options[1].id)]}]}
+    response = await authenticated_client.post(path, json=changed, headers=headers)
+    assert response.status_code == 422
+
+    response = await authenticated_client.get(f"/api/surveys/{seeded_survey.id}/results")
+    assert response.json()["total_responses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_replays_across_workers(authenticated_client: AsyncClient, seeded_survey):
+    """Test that a retry landing on another worker (empty idempotency cache) gets the stored response"""
+    from src.database.models.idempotency import idempotency_cache
+
+    first, _ = seeded_survey.questions
+    survey_id, question_id = seeded_survey.id, first.id
+    option_ids = [option.id for option in first.options]
+    path = f"/api/surveys/{survey_id}/answer"
+    ballot = {
+        "survey_id": str(survey_id),
+        "answers": [{"question_id": str(question_id), "option_ids": [str(option_ids[0])]}],
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    response = await authenticated_client.post(path, json=ballot, headers=headers)
+    assert response.status_code == 200
+
+    idempotency_cache.local.clear()
+    response = await authenticated_client.post(path, json=ballot, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Idempotent-Replayed"] == "true"
+
+    idempotency_cache.local.clear()
+    changed = {**ballot, "answers": [{"question_id": str(question_id), "option_ids": [str(option_ids[1])]}]}
+    response = await authenticated_client.post(path, json=changed, headers=headers)
+    assert response.status_code == 422
+
+    idempotency_cache.local.clear()
+    response = await authenticated_client.post(path, json=ballot, headers={"Idempotency-Key": str(uuid.uuid4())})
+    assert response.status_code == 400
+
+    response = await authenticated_client.get(f"/api/surveys/{survey_id}/results")
+    assert response.json()["total_responses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ballot_sees_definition_changes_without_recheck_interval(
+    authenticated_client: AsyncClient, seeded_survey, test_db
+):
+    """Test that closing a survey and editing its options reach the write path of a warm snapshot"""
+    from sqlalchemy import insert, update
+    from src.database.models.definitions import touch_survey_definition
+    from src.models.poll import QuestionOption, Survey
+
+    first, _ = seeded_survey.questions
+    survey_id, question_id = seeded_survey.id, first.id
+    path = f"/api/surveys/{survey_id}/answer"
+    response = await authenticated_client.get(f"/api/surveys/{survey_id}")
+    assert response.status_code == 200
+
+    # Новый вариант, добавленный в БД, принимается после touch_survey_definition
+    option_id = uuid.uuid4()
+    await test_db.execute(insert(QuestionOption).values(
+        id=option_id, question_id=question_id, option_text="Added", option_order=3
+    ))
+    await test_db.commit()
+    assert await touch_survey_definition(test_db, survey_id)
+
+    # Закрытие в обход ORM (updated_at не меняется) действует сразу
+    await test_db.execute(update(Survey).where(Survey.id == survey_id).values(status="closed", updated_at=Survey.updated_at))
+    await test_db.commit()
+    ballot = {"survey_id": str(survey_id), "answers": [{"question_id": str(question_id), "option_ids": [str(option_id)]}]}
+    response = await authenticated_client.post(path, json=ballot)
+    assert response.status_code == 400
+    assert "not active" in response.json()["detail"]
+
+    await test_db.execute(update(Survey).where(Survey.id == survey_id).values(status="active", updated_at=Survey.updated_at))
+    await test_db.commit()
+    response = await authenticated_client.post(path, json=ballot)
+    assert response.status_code == 200
@@ -101,6 +101,7 @@ export interface QuestionResult {
   question_id: string;
   question_text: string;
   total_answers: number;
+  respondents_count: number;
   options: OptionResult[];
 }
 